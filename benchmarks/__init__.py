@@ -0,0 +1,11 @@
+"""The DBUtils benchmarks package.
+
+The benchmarks measure the overhead of the DBUtils pools and steady
+connections, using fake database drivers with configurable latency
+which are built on the mock modules used by the tests.
+
+Run them with "python -m benchmarks" from the root of the project,
+and use "python -m benchmarks --help" to see the available options.
+The results are printed as JSON, so that they can be saved and compared
+between different versions of DBUtils.
+"""
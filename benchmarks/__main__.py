@@ -0,0 +1,118 @@
+"""Run the DBUtils benchmarks and print the results as JSON."""
+
+import json
+import platform
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+
+from dbutils import __version__
+
+from .pool_benchmarks import (
+    PG_POOLS,
+    POOLS,
+    checkout_latency,
+    execute_overhead,
+    executemany_throughput,
+    fetch_throughput,
+    proxy_overhead,
+    reconnect_storm,
+    throughput,
+)
+
+BENCHMARKS = (
+    'checkout', 'throughput', 'execute', 'proxy', 'executemany', 'fetch',
+    'storm')
+
+# only these pools recover from lost connections
+RECOVERING_POOLS = (
+    'PooledDB', 'PooledDB(affinity)', 'PooledDB(breaker)', 'StripedPooledDB',
+    'PersistentDB', 'PooledPg')
+
+
+def main(args=None):
+    """Run the benchmarks with the given command line arguments."""
+    parser = ArgumentParser(
+        prog='python -m benchmarks', description=__doc__)
+    parser.add_argument(
+        'benchmarks', nargs='*',
+        help=f"the benchmarks to run ({', '.join(BENCHMARKS)}; default: all)")
+    parser.add_argument(
+        '--pools', default=','.join((*POOLS, *PG_POOLS)),
+        help='comma separated names of the pools to benchmark')
+    parser.add_argument(
+        '--threads', default='1,2,4,8,16',
+        help='comma separated numbers of threads for the throughput')
+    parser.add_argument(
+        '--iterations', type=int, default=10000,
+        help='number of iterations for measuring latencies')
+    parser.add_argument(
+        '--rows', type=int, default=100000,
+        help='number of rows for measuring executemany()')
+    parser.add_argument(
+        '--chunksize', type=int, default=1000,
+        help='chunksize for executemany() and batch size for fetching')
+    parser.add_argument(
+        '--duration', type=float, default=0.5,
+        help='seconds for measuring the throughput per number of threads')
+    parser.add_argument(
+        '--execute-latency', type=float, default=0,
+        help='seconds the fake database needs for executing a query')
+    parser.add_argument(
+        '--downtime', type=float, default=0.1,
+        help='seconds the fake database is down in the reconnect storm')
+    parser.add_argument(
+        '--output', help='write the results to this file instead of stdout')
+    args = parser.parse_args(args)
+    benchmarks = args.benchmarks or BENCHMARKS
+    for name in benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f'unknown benchmark: {name}')
+    pools = [name for name in args.pools.split(',') if name]
+    for name in pools:
+        if name not in POOLS and name not in PG_POOLS:
+            parser.error(f'unknown pool: {name}')
+    threads = [int(n) for n in args.threads.split(',') if n]
+    results = {
+        'dbutils': __version__,
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'parameters': {
+            'iterations': args.iterations, 'duration': args.duration,
+            'rows': args.rows, 'chunksize': args.chunksize,
+            'execute_latency': args.execute_latency,
+            'downtime': args.downtime},
+    }
+    if 'checkout' in benchmarks:
+        results['checkout'] = {
+            name: checkout_latency(name, args.iterations) for name in pools}
+    if 'throughput' in benchmarks:
+        results['throughput'] = {
+            name: throughput(
+                name, threads, args.duration, args.execute_latency)
+            for name in pools}
+    if 'execute' in benchmarks:
+        results['execute'] = execute_overhead(args.iterations)
+    if 'proxy' in benchmarks:
+        results['proxy'] = {
+            name: proxy_overhead(name, args.iterations) for name in pools}
+    if 'executemany' in benchmarks:
+        results['executemany'] = executemany_throughput(
+            args.rows, args.chunksize)
+    if 'fetch' in benchmarks:
+        results['fetch'] = fetch_throughput(args.rows, args.chunksize)
+    if 'storm' in benchmarks:
+        results['storm'] = {
+            name: reconnect_storm(
+                name, max(threads), args.downtime)
+            for name in pools if name in RECOVERING_POOLS}
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n', encoding='utf-8')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
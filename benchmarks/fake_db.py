@@ -0,0 +1,107 @@
+"""A fake DB-API 2 database module with configurable latency.
+
+This is built on the mock DB-API 2 module used by the tests.  Every instance
+of FakeDB behaves like a database module with its own simulated database
+server, which can be given a latency for opening connections and executing
+statements, and which can be restarted in order to simulate an outage.
+"""
+
+from time import monotonic, sleep
+
+from tests import mock_db
+
+__all__ = ['FakeDB']
+
+
+class FakeDB:
+    """A fake DB-API 2 database module with configurable latency."""
+
+    threadsafety = 2
+
+    Error = mock_db.Error
+    DatabaseError = mock_db.DatabaseError
+    OperationalError = mock_db.OperationalError
+    InterfaceError = mock_db.InterfaceError
+    InternalError = mock_db.InternalError
+    ProgrammingError = mock_db.ProgrammingError
+
+    def __init__(self, connect_latency=0, execute_latency=0):
+        """Create a fake database module.
+
+        connect_latency: seconds needed for opening a connection
+        execute_latency: seconds needed for executing a statement
+        """
+        self.connect_latency = connect_latency
+        self.execute_latency = execute_latency
+        self.generation = 0  # increased when the server is restarted
+        self.down_until = 0  # server is down until this time
+
+    def connect(self, database=None, user=None):
+        """Open a connection to the fake database server."""
+        if self.connect_latency:
+            sleep(self.connect_latency)
+        if self.down():
+            raise self.OperationalError
+        return FakeConnection(self, database, user)
+
+    def down(self):
+        """Check whether the fake database server is down."""
+        return self.down_until and monotonic() < self.down_until
+
+    def restart(self, downtime=0):
+        """Restart the fake database server.
+
+        All connections are lost and no new connections can be opened
+        during the given number of seconds.
+        """
+        self.down_until = monotonic() + downtime
+        self.generation += 1
+
+
+class FakeConnection(mock_db.Connection):
+    """A connection to the fake database server."""
+
+    def __init__(self, db, database=None, user=None):
+        """Open a connection."""
+        self.db = db
+        self.generation = db.generation
+        super().__init__(database, user)
+
+    def alive(self):
+        """Check whether the connection is still alive."""
+        return self.valid and self.generation == self.db.generation
+
+    def ping(self):
+        """Check the connection."""
+        if not self.alive():
+            raise self.db.OperationalError
+
+    def cursor(self, name=None):
+        """Get a cursor."""
+        if not self.alive():
+            raise self.db.OperationalError
+        return FakeCursor(self, name)
+
+
+class FakeCursor(mock_db.Cursor):
+    """A cursor of a connection to the fake database server."""
+
+    def execute(self, operation):
+        """Execute a statement."""
+        con = self.con
+        if con.db.execute_latency:
+            sleep(con.db.execute_latency)
+        if not con.alive():
+            raise con.db.OperationalError
+        super().execute(operation)
+
+    def executemany(self, operation, seq_of_parameters):  # noqa: ARG002
+        """Execute a statement for a sequence of parameters."""
+        con = self.con
+        if con.db.execute_latency:
+            sleep(con.db.execute_latency)
+        if not con.alive():
+            raise con.db.OperationalError
+        # the rows are only counted, so that they do not use up memory
+        con.num_uses += 1
+        self.rowcount = len(seq_of_parameters)
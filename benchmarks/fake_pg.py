@@ -0,0 +1,91 @@
+"""A fake classic PyGreSQL module with configurable latency.
+
+This is built on the mock pg module used by the tests, which is installed
+as the pg module when importing it, so this module must be imported before
+importing the DBUtils modules for the classic PyGreSQL variant.  Since the
+mock pg module opens its connections with a global function, there is only
+one simulated database server for the pg module, which is installed by
+calling the install() function.
+"""
+
+from time import monotonic, sleep
+
+from tests import mock_pg
+
+__all__ = ['FakePg', 'install']
+
+
+class FakePg:
+    """A fake PostgreSQL server with configurable latency."""
+
+    def __init__(self, connect_latency=0, query_latency=0):
+        """Create a fake database server.
+
+        connect_latency: seconds needed for opening a connection
+        query_latency: seconds needed for executing a query
+        """
+        self.connect_latency = connect_latency
+        self.query_latency = query_latency
+        self.generation = 0  # increased when the server is restarted
+        self.down_until = 0  # server is down until this time
+
+    def connect(self, dbname=None, user=None):
+        """Open a connection to the fake database server."""
+        if self.connect_latency:
+            sleep(self.connect_latency)
+        if self.down():
+            raise mock_pg.InternalError
+        return FakePgConnection(self, dbname, user)
+
+    def down(self):
+        """Check whether the fake database server is down."""
+        return self.down_until and monotonic() < self.down_until
+
+    def restart(self, downtime=0):
+        """Restart the fake database server.
+
+        All connections are lost and no new connections can be opened
+        during the given number of seconds.
+        """
+        self.down_until = monotonic() + downtime
+        self.generation += 1
+
+
+class FakePgConnection(mock_pg.PgConnection):
+    """A connection to the fake database server."""
+
+    def __init__(self, server, dbname=None, user=None):
+        """Open a connection."""
+        self.server = server
+        self.generation = server.generation
+        super().__init__(dbname, user)
+
+    def reset(self):
+        """Reset the connection."""
+        server = self.server
+        if server.connect_latency:
+            sleep(server.connect_latency)
+        if server.down():
+            raise mock_pg.InternalError
+        self.generation = server.generation
+        super().reset()
+
+    def query(self, qstr):
+        """Execute a query."""
+        server = self.server
+        if server.query_latency:
+            sleep(server.query_latency)
+        if self.generation != server.generation:
+            self.status = False
+            raise mock_pg.InternalError
+        return super().query(qstr)
+
+
+def install(connect_latency=0, query_latency=0):
+    """Install a fake database server for the mock pg module.
+
+    Returns the installed fake database server.
+    """
+    server = FakePg(connect_latency, query_latency)
+    mock_pg.connect = server.connect
+    return server
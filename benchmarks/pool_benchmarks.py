@@ -0,0 +1,389 @@
+"""Benchmarks for the DBUtils pools and steady connections.
+
+All benchmarks return plain dicts and lists, so that the results
+can be dumped as JSON.  Times are reported in microseconds.
+"""
+
+from threading import Event, Thread
+from time import monotonic, perf_counter, sleep
+from tracemalloc import get_traced_memory, start, stop
+
+from . import fake_pg  # must be imported before the pg modules
+from .fake_db import FakeDB
+
+__all__ = [
+    'POOLS', 'PG_POOLS',
+    'checkout_latency', 'throughput', 'execute_overhead', 'proxy_overhead',
+    'executemany_throughput', 'fetch_throughput', 'reconnect_storm',
+]
+
+
+def pooled_db(db, size):
+    """Create a PooledDB instance."""
+    from dbutils.pooled_db import PooledDB  # noqa: PLC0415
+    return PooledDB(db, size, maxconnections=size, blocking=True)
+
+
+def pooled_db_affinity(db, size):
+    """Create a PooledDB instance with thread affinity."""
+    from dbutils.pooled_db import PooledDB  # noqa: PLC0415
+    return PooledDB(
+        db, size, maxconnections=size, blocking=True, affinity=True)
+
+
+def pooled_db_breaker(db, size):
+    """Create a PooledDB instance with a circuit breaker."""
+    from dbutils.pooled_db import PooledDB  # noqa: PLC0415
+    return PooledDB(
+        db, size, maxconnections=size, blocking=True, breaker=True)
+
+
+def striped_pooled_db(db, size):
+    """Create a StripedPooledDB instance."""
+    from dbutils.striped_pooled_db import StripedPooledDB  # noqa: PLC0415
+    return StripedPooledDB(db, size, maxconnections=size, blocking=True)
+
+
+def persistent_db(db, size):  # noqa: ARG001
+    """Create a PersistentDB instance."""
+    from dbutils.persistent_db import PersistentDB  # noqa: PLC0415
+    return PersistentDB(db)
+
+
+def simple_pooled_db(db, size):
+    """Create a SimplePooledDB instance."""
+    from dbutils.simple_pooled_db import PooledDB  # noqa: PLC0415
+    return PooledDB(db, size)
+
+
+def pooled_pg(server, size):  # noqa: ARG001
+    """Create a PooledPg instance."""
+    from dbutils.pooled_pg import PooledPg  # noqa: PLC0415
+    return PooledPg(size, maxconnections=size, blocking=True)
+
+
+def simple_pooled_pg(server, size):  # noqa: ARG001
+    """Create a SimplePooledPg instance."""
+    from dbutils.simple_pooled_pg import PooledPg  # noqa: PLC0415
+    return PooledPg(size)
+
+
+# the pools for the DB-API 2 variant
+POOLS = {
+    'PooledDB': pooled_db,
+    'PooledDB(affinity)': pooled_db_affinity,
+    'PooledDB(breaker)': pooled_db_breaker,
+    'StripedPooledDB': striped_pooled_db,
+    'PersistentDB': persistent_db,
+    'SimplePooledDB': simple_pooled_db,
+}
+
+# the pools for the classic PyGreSQL variant
+PG_POOLS = {
+    'PooledPg': pooled_pg,
+    'SimplePooledPg': simple_pooled_pg,
+}
+
+
+def percentiles(values):
+    """Get the mean and some percentiles of the given times in seconds."""
+    values = sorted(values)
+    n = len(values)
+
+    def percentile(p):
+        return values[min(n - 1, int(p * n))] * 1e6
+
+    return {
+        'mean_us': sum(values) / n * 1e6,
+        'p50_us': percentile(0.5),
+        'p90_us': percentile(0.9),
+        'p99_us': percentile(0.99),
+        'max_us': values[-1] * 1e6,
+    }
+
+
+def query(con):
+    """Run a simple query on a DB-API 2 or classic PyGreSQL connection."""
+    try:
+        cursor = con.cursor
+    except AttributeError:  # classic PyGreSQL connection
+        con.query('select test')
+    else:
+        cursor = cursor()
+        cursor.execute('select test')
+        cursor.fetchone()
+        cursor.close()
+
+
+def create_pool(name, size, connect_latency=0, execute_latency=0):
+    """Create the pool with the given name and a fake database."""
+    if name in PG_POOLS:
+        server = fake_pg.install(connect_latency, execute_latency)
+        return PG_POOLS[name](server, size), server
+    db = FakeDB(connect_latency, execute_latency)
+    return POOLS[name](db, size), db
+
+
+def checkout_latency(name, iterations=10000):
+    """Measure the time for getting a connection and returning it.
+
+    The pool is used by a single thread.
+    """
+    pool, _db = create_pool(name, 1)
+    query(pool.connection())  # warm up
+    times = []
+    for _i in range(iterations):
+        start = perf_counter()
+        pool.connection().close()
+        times.append(perf_counter() - start)
+    return percentiles(times)
+
+
+def throughput(name, threads=(1, 2, 4, 8), duration=0.5,
+               execute_latency=0):
+    """Measure the number of queries per second for several threads.
+
+    Every thread gets a connection, runs a query and returns the
+    connection in a loop.  The pool has as many connections as threads.
+    """
+    results = []
+    for num_threads in threads:
+        pool, _db = create_pool(
+            name, num_threads, execute_latency=execute_latency)
+        counts = [0] * num_threads
+        start, stop = Event(), Event()
+
+        def run(i, pool=pool, counts=counts, start=start, stop=stop):
+            start.wait()
+            n = 0
+            while not stop.is_set():
+                con = pool.connection()
+                query(con)
+                con.close()
+                n += 1
+            counts[i] = n
+
+        workers = [Thread(target=run, args=(i,), daemon=True)
+                   for i in range(num_threads)]
+        for worker in workers:
+            worker.start()
+        begin = perf_counter()
+        start.set()
+        sleep(duration)
+        stop.set()
+        for worker in workers:
+            worker.join()
+        elapsed = perf_counter() - begin
+        results.append({
+            'threads': num_threads,
+            'queries': sum(counts),
+            'queries_per_second': sum(counts) / elapsed})
+    return results
+
+
+def execute_overhead(iterations=10000):
+    """Measure the overhead of the steady connections per query.
+
+    The time needed for a query with a raw connection of the fake driver
+    is compared with the time needed with the steady connection wrapping
+    it and with a connection that has been taken from a PooledDB pool.
+    """
+    from dbutils.pooled_db import PooledDB  # noqa: PLC0415
+    from dbutils.steady_db import connect  # noqa: PLC0415
+    from dbutils.steady_pg import SteadyPgConnection  # noqa: PLC0415
+
+    def measure(obj, name):
+        # the method is looked up on every call, as in real code
+        getattr(obj, name)('select test')  # warm up
+        start = perf_counter()
+        for _i in range(iterations):
+            getattr(obj, name)('select test')
+        return (perf_counter() - start) / iterations * 1e6
+
+    db = FakeDB()
+    raw = db.connect().cursor()
+    steady = connect(db).cursor()
+    pool = PooledDB(db, 1)
+    pooled_con = pool.connection()
+    pooled = pooled_con.cursor()
+    fake_pg.install()
+    raw_pg = fake_pg.mock_pg.DB()
+    steady_pg = SteadyPgConnection()
+    results = {
+        'raw_cursor_us': measure(raw, 'execute'),
+        'steady_cursor_us': measure(steady, 'execute'),
+        'pooled_cursor_us': measure(pooled, 'execute'),
+        'raw_pg_us': measure(raw_pg, 'query'),
+        'steady_pg_us': measure(steady_pg, 'query'),
+    }
+    results['steady_cursor_overhead_us'] = (
+        results['steady_cursor_us'] - results['raw_cursor_us'])
+    results['pooled_cursor_overhead_us'] = (
+        results['pooled_cursor_us'] - results['raw_cursor_us'])
+    results['steady_pg_overhead_us'] = (
+        results['steady_pg_us'] - results['raw_pg_us'])
+    return results
+
+
+def proxy_overhead(name, iterations=10000, connections=100):
+    """Measure the cost of calls and the memory per checkout of a proxy.
+
+    A method is called on the connection handed out by the pool and on
+    the connection wrapped by it, and the time per call is compared.
+    The memory per checkout is the memory allocated when the given number
+    of connections are checked out at once, divided by this number.
+    """
+    pool, _db = create_pool(name, connections)
+    con = pool.connection()
+    if name in PG_POOLS:
+        def call(con):
+            return con.query('select test')
+    else:
+        def call(con):
+            return con.commit()
+
+    def measure(con):
+        call(con)  # warm up
+        begin = perf_counter()
+        for _i in range(iterations):
+            call(con)
+        return (perf_counter() - begin) / iterations * 1e6
+
+    results = {'proxy_us': measure(con), 'wrapped_us': measure(con._con)}
+    results['proxy_overhead_us'] = results['proxy_us'] - results['wrapped_us']
+    con.close()
+    start()
+    try:
+        before = get_traced_memory()[0]
+        cons = [pool.connection() for _i in range(connections)]
+        after = get_traced_memory()[0]
+    finally:
+        stop()
+    for con in cons:
+        con.close()
+    results['bytes_per_checkout'] = (after - before) / connections
+    return results
+
+
+def executemany_throughput(rows=100000, chunksize=1000):
+    """Measure the rows per second and the memory of executemany().
+
+    The parameters are generated on the fly and passed once as a list
+    to the plain executemany() and once as a generator to executemany()
+    with the given chunksize.  The peak memory is the maximum memory
+    allocated while executing, divided by the number of rows.
+    """
+    from dbutils.steady_db import connect  # noqa: PLC0415
+
+    cursor = connect(FakeDB()).cursor()
+
+    def parameters():
+        for row in range(rows):
+            yield (row, f'row {row}')
+
+    def measure(chunked):
+        start()
+        try:
+            begin = perf_counter()
+            if chunked:
+                cursor.executemany(
+                    'insert', parameters(), chunksize=chunksize)
+            else:
+                cursor.executemany('insert', list(parameters()))
+            elapsed = perf_counter() - begin
+            peak = get_traced_memory()[1]
+        finally:
+            stop()
+        return {
+            'rows_per_second': rows / elapsed,
+            'peak_bytes_per_row': peak / rows,
+        }
+
+    return {
+        'rows': rows, 'chunksize': chunksize,
+        'list': measure(False), 'chunked': measure(True),
+    }
+
+
+def fetch_throughput(rows=100000, batch_size=1000):
+    """Measure the rows per second when iterating over a steady cursor.
+
+    The rows are fetched one by one with fetchone(), by iterating over
+    the cursor with an arraysize of batch_size and with stream().
+    """
+    from dbutils.steady_db import connect  # noqa: PLC0415
+
+    cursor = connect(FakeDB()).cursor()
+
+    def measure(iterate):
+        cursor.execute(f'rows {rows}')
+        begin = perf_counter()
+        count = sum(1 for _row in iterate())
+        elapsed = perf_counter() - begin
+        if count != rows:
+            raise ValueError(f'Fetched {count} instead of {rows} rows.')
+        return rows / elapsed
+
+    cursor.arraysize = 1
+    results = {'fetchone_rows_per_second': measure(
+        lambda: iter(cursor.fetchone, None))}
+    cursor.arraysize = batch_size
+    results['iter_rows_per_second'] = measure(lambda: iter(cursor))
+    results['stream_rows_per_second'] = measure(
+        lambda: cursor.stream(batch_size))
+    return results
+
+
+def reconnect_storm(name, threads=8, downtime=0.1, connect_latency=0.001,
+                    timeout=10):
+    """Measure the time to recover after the database has been restarted.
+
+    Several threads are running queries in a loop when the database server
+    is restarted, losing all connections and refusing new connections for
+    the given downtime.  The recovery time is the time from the end of
+    the downtime until every thread has successfully run a query again.
+    """
+    pool, db = create_pool(name, threads, connect_latency)
+    recovered = [None] * threads
+    errors = [0] * threads
+    restarted, stop = Event(), Event()
+
+    def run(i):
+        while not stop.is_set():
+            try:
+                con = pool.connection()
+                try:
+                    query(con)
+                finally:
+                    con.close()
+            except Exception:
+                errors[i] += 1
+                sleep(0.001)
+            else:
+                if restarted.is_set() and recovered[i] is None and (
+                        not db.down()):
+                    recovered[i] = monotonic()
+                sleep(0.0001)
+
+    workers = [Thread(target=run, args=(i,), daemon=True)
+               for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    sleep(0.05)
+    db.restart(downtime)
+    up = db.down_until
+    restarted.set()
+    deadline = monotonic() + downtime + timeout
+    while monotonic() < deadline and None in recovered:
+        sleep(0.001)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    done = [t for t in recovered if t is not None]
+    return {
+        'threads': threads,
+        'downtime_us': downtime * 1e6,
+        'recovered_threads': len(done),
+        'recovery_time_us': (max(done) - up) * 1e6 if done else None,
+        'errors': sum(errors),
+    }
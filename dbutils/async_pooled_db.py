@@ -0,0 +1,601 @@
+"""AsyncPooledDB - pooling for DB-API 2 connections in asyncio applications.
+
+Implements a pool of steady cached connections to a database which can be
+used from coroutines running in an asyncio event loop, using an arbitrary
+DB-API 2 compliant database interface module.
+
+Like PooledDB, this module uses "hardened" SteadyDB connections, so that
+connections which have been lost will be transparently reopened.  Since
+DB-API 2 database modules are blocking, all calls to the database are run
+in a bounded thread pool executor, so that the event loop is not blocked.
+But waiting for a free connection in a pool that has reached its maximum
+size happens in the event loop itself and does not cost any thread.
+
+Connections are always dedicated, they are never shared between tasks.
+A connection is used by only one task at a time, but successive calls
+may be run in different worker threads of the executor.  This is fine for
+most database modules, but some may need to be told that this is allowed,
+e.g. you need to pass check_same_thread=False when using sqlite3.
+
+For the Python DB-API 2 specification, see:
+    https://www.python.org/dev/peps/pep-0249/
+For information on Webware for Python, see:
+    https://webwareforpython.github.io/w4py/
+
+
+Usage:
+
+First you need to set up the database connection pool by creating
+an instance of AsyncPooledDB, passing the following parameters:
+
+    creator: either an arbitrary function returning new DB-API 2
+        connection objects or a DB-API 2 compliant database module
+    mincached: the initial number of idle connections in the pool
+        (the default of 0 means no connections are made at startup)
+    maxcached: the maximum number of idle connections in the pool
+        (the default value of 0 or None means unlimited pool size)
+    maxconnections: maximum number of connections generally allowed
+        (the default value of 0 or None means any number of connections)
+    blocking: determines behavior when exceeding the maximum
+        (if this is set to true, wait until the number of connections
+        decreases, but by default an error will be reported)
+        Waiting tasks are served in the order of their arrival.
+    maxusage: maximum number of reuses of a single connection
+        (the default of 0 or None means unlimited reuse)
+        When this maximum usage number of the connection is reached,
+        the connection is automatically reset (closed and reopened).
+    setsession: an optional list of SQL commands that may serve to
+        prepare the session, e.g. ["set datestyle to german", ...]
+    reset: how connections should be reset when returned to the pool
+        (False or None to rollback transactions started with begin(),
+        the default value True always issues a rollback for safety's sake)
+    failures: an optional exception class or a tuple of exceptions
+        for which the connection failover mechanism shall be applied,
+        if the default (OperationalError, InterfaceError, InternalError)
+        is not adequate for the used database module
+    ping: an optional flag controlling when connections are checked
+        with the ping() method if such a method is available
+        (0 = None = never, 1 = default = whenever fetched from the pool,
+        2 = when a cursor is created, 4 = when a query is executed,
+        7 = always, and all other bit combinations of these values)
+
+    The following parameters can only be passed as keyword arguments:
+
+    executor: an optional concurrent.futures executor that shall be used
+        for running the blocking database calls (by default, the pool
+        creates its own thread pool executor and shuts it down on close)
+    max_workers: the maximum number of worker threads of the executor
+        created by the pool (the default value of None means using the
+        value of maxconnections or the default of ThreadPoolExecutor)
+    checkout_timeout: the default number of seconds a blocking pool
+        waits for a connection before an error will be reported
+        (the default value of None means waiting indefinitely)
+    maxwaiters: the maximum number of tasks that may wait for
+        a connection in a blocking pool before further requests
+        will be rejected immediately with an error
+        (the default value of 0 or None means any number of tasks)
+
+    The creator function or the connect function of the DB-API 2 compliant
+    database module specified as the creator will receive any additional
+    parameters such as the host, database, user, password etc.  You may
+    choose some or all of these parameters in your own creator function,
+    allowing for sophisticated failover and load-balancing mechanisms.
+
+For instance, if you are using pgdb as your DB-API 2 database module and
+want a pool of at least five connections to your local database 'mydb':
+
+    import pgdb  # import used DB-API 2 module
+    from dbutils.async_pooled_db import AsyncPooledDB
+    pool = AsyncPooledDB(pgdb, 5, database='mydb')
+
+The initial connections are opened when the pool is created, so you
+should create the pool when starting up the application.
+
+Once you have set up the connection pool you can request
+database connections from that pool inside a coroutine:
+
+    db = await pool.connection()
+
+The methods of these connections and the cursors created by them are
+coroutines which need to be awaited.  They are run in the executor:
+
+    cur = await db.cursor()
+    await cur.execute(...)
+    res = await cur.fetchone()
+    await cur.close()
+    await db.close()  # return the connection to the pool
+
+Other attributes of the connections and cursors such as the description
+and rowcount of a cursor can be accessed directly.
+
+If you don't need the connection anymore, you should immediately return
+it to the pool by awaiting db.close().  You can also use asynchronous
+context managers, which will do this automatically:
+
+    async with pool.connection() as db:
+        async with await db.cursor() as cur:
+            await cur.execute(...)
+            res = await cur.fetchone()
+
+Note that pool.connection() is not a coroutine function, it returns an
+awaitable object.  If you want to get a connection in a separate task,
+you need to wrap it with asyncio.ensure_future() instead of passing it
+to asyncio.create_task(), which only accepts coroutines.
+
+Note that you need to explicitly start transactions by calling the
+begin() method, as with the other pools.
+
+If a blocking pool has reached its maximum size, you can also specify
+how many seconds a task shall wait for a connection at most:
+
+    db = await pool.connection(timeout=2.5)
+
+Closing the pool with pool.close() will close all idle connections
+and shut down the executor if it has been created by the pool.
+
+
+Copyright, credits and license:
+
+* Based on the PooledDB module contributed as supplement for
+  Webware for Python and PyGreSQL by Christoph Zwerschke in September 2005
+
+Licensed under the MIT license.
+"""
+
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from functools import partial
+
+from . import __version__
+from .steady_db import connect
+
+__all__ = [
+    'AsyncPooledDB', 'AsyncPooledDBCheckout',
+    'AsyncPooledDBConnection', 'AsyncPooledDBCursor',
+    'AsyncPooledDBError', 'InvalidConnectionError',
+    'NotSupportedError', 'TooManyConnectionsError',
+]
+
+
+class AsyncPooledDBError(Exception):
+    """General AsyncPooledDB error."""
+
+
+class InvalidConnectionError(AsyncPooledDBError):
+    """Database connection is invalid."""
+
+
+class NotSupportedError(AsyncPooledDBError):
+    """DB-API module not supported by AsyncPooledDB."""
+
+
+class TooManyConnectionsError(AsyncPooledDBError):
+    """Too many database connections were opened."""
+
+
+class AsyncPooledDB:
+    """Pool for DB-API 2 connections used in asyncio applications.
+
+    After you have created the connection pool, you can await
+    connection() to get pooled, steady DB-API 2 connections.
+    """
+
+    version = __version__
+
+    def __init__(  # noqa: PLR0913
+            self, creator, mincached=0, maxcached=0,
+            maxconnections=0, blocking=False,
+            maxusage=None, setsession=None, reset=True,
+            failures=None, ping=1,
+            *args, executor=None, max_workers=None,
+            checkout_timeout=None, maxwaiters=None, **kwargs):
+        """Set up the asynchronous DB-API 2 connection pool.
+
+        creator: either an arbitrary function returning new DB-API 2
+            connection objects or a DB-API 2 compliant database module
+        mincached: initial number of idle connections in the pool
+            (0 means no connections are made at startup)
+        maxcached: maximum number of idle connections in the pool
+            (0 or None means unlimited pool size)
+        maxconnections: maximum number of connections generally allowed
+            (0 or None means an arbitrary number of connections)
+        blocking: determines behavior when exceeding the maximum
+            (if this is set to true, wait until the number of
+            connections decreases, otherwise an error will be reported)
+            Waiting tasks are served in the order of their arrival.
+        maxusage: maximum number of reuses of a single connection
+            (0 or None means unlimited reuse)
+            When this maximum usage number of the connection is reached,
+            the connection is automatically reset (closed and reopened).
+        setsession: optional list of SQL commands that may serve to prepare
+            the session, e.g. ["set datestyle to ...", "set time zone ..."]
+        reset: how connections should be reset when returned to the pool
+            (False or None to rollback transactions started with begin(),
+            True to always issue a rollback for safety's sake)
+        failures: an optional exception class or a tuple of exception classes
+            for which the connection failover mechanism shall be applied,
+            if the default (OperationalError, InterfaceError, InternalError)
+            is not adequate for the used database module
+        ping: determines when the connection should be checked with ping()
+            (0 = None = never, 1 = default = whenever fetched from the pool,
+            2 = when a cursor is created, 4 = when a query is executed,
+            7 = always, and all other bit combinations of these values)
+        executor: executor for running the blocking database calls
+            (None means creating a thread pool executor for the pool)
+        max_workers: maximum number of threads of the created executor
+            (None means maxconnections or the default of the executor)
+        checkout_timeout: default number of seconds a blocking pool waits
+            for a connection (None means waiting indefinitely)
+        maxwaiters: maximum number of tasks waiting for a connection
+            (0 or None means an arbitrary number of tasks)
+        args, kwargs: the parameters that shall be passed to the creator
+            function or the connection constructor of the DB-API 2 module
+        """
+        try:
+            threadsafety = creator.threadsafety
+        except AttributeError:
+            try:
+                threadsafety = creator.dbapi.threadsafety
+            except AttributeError:
+                try:
+                    if not callable(creator.connect):
+                        raise AttributeError
+                except AttributeError:
+                    threadsafety = 1
+                else:
+                    threadsafety = 0
+        if not threadsafety:
+            raise NotSupportedError("Database module is not thread-safe.")
+        self._creator = creator
+        self._args, self._kwargs = args, kwargs
+        self._blocking = blocking
+        self._maxusage = maxusage
+        self._setsession = setsession
+        self._reset = reset
+        self._failures = failures
+        self._ping = ping
+        self._timeout = checkout_timeout
+        self._maxwaiters = maxwaiters or 0
+        if mincached is None:
+            mincached = 0
+        if maxcached is None:
+            maxcached = 0
+        if maxconnections is None:
+            maxconnections = 0
+        if maxcached:
+            maxcached = max(maxcached, mincached)
+        self._maxcached = maxcached
+        if maxconnections:
+            maxconnections = max(maxconnections, maxcached)
+        self._maxconnections = maxconnections
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers or maxconnections or None,
+                thread_name_prefix='AsyncPooledDB')
+            self._own_executor = True
+        else:
+            self._own_executor = False
+        self._executor = executor
+        # the pool state is only changed from within the event loop,
+        # so that no lock is needed for protecting it
+        self._loop = None  # the event loop the pool is used in
+        self._idle_cache = deque()  # the actual pool of idle connections
+        self._connections = 0  # connections in use or being opened
+        self._waiters = deque()  # futures of tasks waiting for a connection
+        self._tasks = set()  # tasks returning garbage collected connections
+        # Establish an initial number of idle database connections:
+        self._idle_cache.extend(
+            self.steady_connection() for _i in range(mincached))
+
+    def steady_connection(self):
+        """Get a steady, unpooled DB-API 2 connection.
+
+        Note that this is a blocking call.
+        """
+        return connect(
+            self._creator, self._maxusage, self._setsession,
+            self._failures, self._ping, True, *self._args, **self._kwargs)
+
+    def connection(self, timeout=None):
+        """Get a steady, cached DB-API 2 connection from the pool.
+
+        The result can be awaited or used as an asynchronous context
+        manager which returns the connection to the pool when exited.
+        Note that it is not a coroutine, so it must be wrapped with
+        asyncio.ensure_future() if it shall be run as a separate task.
+
+        If the pool is blocking, the timeout specifies how many seconds
+        to wait at most for a connection before an error is reported
+        (None means using the default timeout set for the pool).
+        """
+        return AsyncPooledDBCheckout(self._checkout(timeout))
+
+    dedicated_connection = connection
+
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking function in the executor of the pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(func, *args, **kwargs))
+
+    async def _checkout(self, timeout=None):
+        """Check out a connection, waiting for a free slot if necessary."""
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        if self._waiters or (
+                self._maxconnections
+                and self._connections >= self._maxconnections):
+            con = await self._wait(loop, timeout)
+        else:
+            self._connections += 1
+            con = self._idle_cache.popleft() if self._idle_cache else None
+        try:
+            if con is None:
+                con = await self._connect(loop)
+            elif con._ping & 1:  # avoid using a thread if not needed
+                await self.run(con._ping_check)
+        except BaseException:
+            if con is not None:
+                with suppress(Exception):
+                    con._close()
+            self._release()
+            raise
+        return AsyncPooledDBConnection(self, con)
+
+    async def _connect(self, loop):
+        """Open a new connection in the executor.
+
+        If the task is cancelled while the connection is being opened,
+        the connection is closed as soon as it has been opened.
+        """
+        future = loop.run_in_executor(self._executor, self.steady_connection)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            future.add_done_callback(self._close_late)
+            raise
+
+    def _close_late(self, future):
+        """Close a connection that has been opened for a cancelled task."""
+        if future.cancelled() or future.exception() is not None:
+            return
+        con = future.result()
+        try:
+            self._executor.submit(con.close)
+        except RuntimeError:  # the executor has been shut down
+            con.close()
+
+    async def _wait(self, loop, timeout):
+        """Wait until a connection or a free slot is handed over."""
+        if not self._blocking or (
+                self._maxwaiters
+                and len(self._waiters) >= self._maxwaiters):
+            raise TooManyConnectionsError
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        if timeout is None:
+            timeout = self._timeout
+        timer = None if timeout is None else loop.call_later(
+            max(timeout, 0), self._expire, waiter)
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            if waiter.cancelled():
+                with suppress(ValueError):
+                    self._waiters.remove(waiter)
+            elif waiter.exception() is None:  # granted in the meantime
+                self._giveback(waiter.result())
+            raise
+        finally:
+            if timer:
+                timer.cancel()
+
+    def _expire(self, waiter):
+        """Let a waiting task give up after its timeout."""
+        if not waiter.done():
+            self._waiters.remove(waiter)
+            waiter.set_exception(TooManyConnectionsError())
+
+    def _handover(self, con):
+        """Hand over a connection or a free slot to the next waiting task.
+
+        Returns whether there has been a task waiting.
+        """
+        waiters = self._waiters
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(con)
+                return True
+        return False
+
+    def _giveback(self, con):
+        """Give back a connection or a free slot that has not been used."""
+        if con is None:
+            self._release()
+        elif not self._handover(con):
+            self._connections -= 1
+            self._idle_cache.appendleft(con)
+
+    def _release(self):
+        """Release a slot that has not been used."""
+        if not self._handover(None):
+            self._connections -= 1
+
+    async def cache(self, con):
+        """Put a dedicated connection back into the idle cache.
+
+        If tasks are waiting, the connection is directly handed over
+        to the one that has been waiting for the longest time.
+        """
+        try:
+            # rollback possible transaction
+            await self.run(con._reset, force=self._reset)
+        except BaseException:
+            self._release()
+            raise
+        if self._handover(con):
+            return
+        self._connections -= 1
+        if self._maxcached and len(self._idle_cache) >= self._maxcached:
+            # the idle cache is already full, so close the connection
+            await self.run(con.close)
+        else:
+            self._idle_cache.append(con)
+
+    def _collect(self, con):
+        """Return a connection that has been garbage collected."""
+        # keep a reference to the task so that it cannot get lost
+        task = self._loop.create_task(self.cache(con))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def close(self):
+        """Close all idle connections and shut down the executor.
+
+        Note that this is a blocking call.
+        """
+        while self._idle_cache:  # close all idle connections
+            con = self._idle_cache.popleft()
+            with suppress(Exception):
+                con.close()
+        while self._waiters:  # let all waiting tasks give up
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(TooManyConnectionsError())
+        if self._own_executor:
+            self._executor.shutdown(wait=False)
+
+    def __del__(self):
+        """Delete the pool."""
+        # builtins (including Exceptions) might not exist anymore
+        try:  # noqa: SIM105
+            self.close()
+        except:  # noqa: E722, S110
+            pass
+
+
+# Auxiliary classes for pooled connections
+
+class AsyncPooledDBCheckout:
+    """Auxiliary class for checking out a connection from the pool.
+
+    The checkout can be awaited or used as asynchronous context manager.
+    """
+
+    def __init__(self, coro):
+        """Create a checkout.
+
+        coro: the coroutine checking out the connection
+        """
+        self._coro = coro
+        self._con = None
+
+    def __await__(self):
+        """Get the connection."""
+        return self._coro.__await__()
+
+    async def __aenter__(self):
+        """Enter a runtime context for the connection."""
+        self._con = await self._coro
+        return self._con
+
+    async def __aexit__(self, *exc):
+        """Exit a runtime context for the connection."""
+        await self._con.close()
+
+
+class AsyncPooledDBConnection:
+    """Auxiliary proxy class for asynchronous pooled connections."""
+
+    def __init__(self, pool, con):
+        """Create an asynchronous pooled connection.
+
+        pool: the corresponding AsyncPooledDB instance
+        con: the underlying SteadyDB connection
+        """
+        self._pool = pool
+        self._con = con
+
+    async def close(self):
+        """Close the pooled connection."""
+        # Instead of actually closing the connection,
+        # return it to the pool for future reuse.
+        con = self._con
+        if con:
+            self._con = None
+            await self._pool.cache(con)
+
+    async def cursor(self, *args, **kwargs):
+        """Return a new cursor object using the connection."""
+        if not self._con:
+            raise InvalidConnectionError
+        return AsyncPooledDBCursor(
+            self._pool, await self._pool.run(
+                self._con.cursor, *args, **kwargs))
+
+    def __getattr__(self, name):
+        """Proxy all members of the class.
+
+        Methods are turned into coroutine functions that are run
+        in the executor, other attributes are returned directly.
+        """
+        if self._con:
+            attr = getattr(self._con, name)
+            if callable(attr):
+                return partial(self._pool.run, attr)
+            return attr
+        raise InvalidConnectionError
+
+    def __del__(self):
+        """Delete the pooled connection."""
+        # builtins (including Exceptions) might not exist anymore
+        try:
+            if self._con:
+                loop = self._pool._loop
+                loop.call_soon_threadsafe(self._pool._collect, self._con)
+                self._con = None
+        except:  # noqa: E722, S110
+            pass
+
+    async def __aenter__(self):
+        """Enter a runtime context for the connection."""
+        return self
+
+    async def __aexit__(self, *exc):
+        """Exit a runtime context for the connection."""
+        await self.close()
+
+
+class AsyncPooledDBCursor:
+    """Auxiliary proxy class for asynchronous cursors."""
+
+    def __init__(self, pool, cursor):
+        """Create an asynchronous cursor.
+
+        pool: the corresponding AsyncPooledDB instance
+        cursor: the underlying SteadyDB cursor
+        """
+        self._pool = pool
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        """Proxy all members of the class.
+
+        Methods are turned into coroutine functions that are run
+        in the executor, other attributes are returned directly.
+        """
+        attr = getattr(self._cursor, name)
+        if callable(attr):
+            return partial(self._pool.run, attr)
+        return attr
+
+    async def __aenter__(self):
+        """Enter a runtime context for the cursor."""
+        return self
+
+    async def __aexit__(self, *exc):
+        """Exit a runtime context for the cursor."""
+        await self.close()
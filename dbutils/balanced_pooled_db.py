@@ -0,0 +1,304 @@
+"""BalancedPooledDB - load-balanced pooling for DB-API 2 connections.
+
+Implements a pool of steady, thread-safe cached connections to several
+database hosts, e.g. the read replicas of a database, which balances
+the connections among the hosts, using an arbitrary DB-API 2 compliant
+database interface module.
+
+The pool consists of one PooledDB instance for each host.  Every time a
+connection is requested, the hosts are ordered either by their number of
+outstanding connections, i.e. connections in use or being opened, or by
+their observed latency, i.e. the average time it took to get a connection
+from them, including checking the connection with ping() if this is enabled.
+The connection is then taken from the first host which can provide it
+without waiting.  If opening or checking a connection to a host fails,
+the host is dropped out of the rotation for a while, and the connection
+is taken from the next host instead.  When this time has passed, the host
+gets back into the rotation and will be tried again.  Note that idle
+connections to a host which has died can only be detected if pinging
+is enabled.
+
+For the Python DB-API 2 specification, see:
+    https://www.python.org/dev/peps/pep-0249/
+For information on Webware for Python, see:
+    https://webwareforpython.github.io/w4py/
+
+
+Usage:
+
+BalancedPooledDB takes the same parameters as PooledDB, except that
+the first parameter is a list of hosts instead of a creator:
+
+    hosts: a list of the hosts, where every host can be specified as a
+        creator, i.e. either an arbitrary function returning new DB-API 2
+        connection objects or a DB-API 2 compliant database module, or
+        as a dict with the connection parameters which shall be passed
+        to the creator in addition to the common connection parameters
+
+The other parameters such as mincached and maxconnections apply to every
+host, i.e. they set the connection budget per host.  The following
+parameters can only be passed as keyword arguments:
+
+    creator: the common creator which shall be used for all hosts
+        that are specified as dicts of connection parameters
+    balance: how to choose the host for a connection
+        ('connections' = default = the host with the least outstanding
+        connections, 'latency' = the host with the lowest latency)
+    retry_interval: the number of seconds a failing host is kept out of
+        the rotation (the default is 5 seconds)
+
+All other keyword arguments are passed on to the PooledDB instances.
+If a circuit breaker is requested with breaker=True, every host gets its
+own circuit breaker, so that a failing host does not affect the others.
+
+For instance, if you are using pgdb as your DB-API 2 database module and
+want a pool of at most ten connections to each of three replicas:
+
+    import pgdb  # import used DB-API 2 module
+    from dbutils.balanced_pooled_db import BalancedPooledDB
+    pool = BalancedPooledDB(
+        [{'host': 'replica1'}, {'host': 'replica2'}, {'host': 'replica3'}],
+        maxconnections=10, creator=pgdb, database='mydb')
+
+Once you have set up the connection pool you can request database
+connections from that pool in the same way as with PooledDB:
+
+    db = pool.connection()
+
+If the pool is blocking and no host can provide a connection, the thread
+waits for a connection of the first host in the rotation.  If all hosts
+are out of the rotation, they are tried anyway, in case they are back.
+
+Note that opening the initial mincached connections fails if a host is not
+available when the pool is created, unless you pass warmup='background'.
+
+
+Copyright, credits and license:
+
+* Based on the PooledDB module contributed as supplement for
+  Webware for Python and PyGreSQL by Christoph Zwerschke in September 2005
+
+Licensed under the MIT license.
+"""
+
+from itertools import count
+from time import monotonic
+
+from . import __version__
+from .pool_stats import sum_stats
+from .pooled_db import PooledDB, TooManyConnectionsError
+
+__all__ = ['BalancedPooledDB', 'BalancedPooledDBHost']
+
+
+class BalancedPooledDBHost:
+    """A host of a balanced pool with its own PooledDB instance."""
+
+    # weight of a new latency measurement in the moving average
+    smoothing = 0.2
+
+    def __init__(self, pool):
+        """Create a host for the given pool."""
+        self.pool = pool
+        self.latency = 0  # moving average of checkout times in seconds
+        self.down_until = 0  # host is out of the rotation until this time
+        self.failures = 0  # number of failures of the host
+
+    @property
+    def outstanding(self):
+        """Get the number of connections in use or being opened."""
+        return self.pool._connections
+
+    def down(self, now=None):
+        """Check whether the host is out of the rotation."""
+        return self.down_until and (now or monotonic()) < self.down_until
+
+    def try_connection(self, shareable, retry_interval):
+        """Get a connection from the host if possible without waiting.
+
+        Returns None if the host has no connection available.  If the
+        connection fails, the host is dropped out of the rotation.
+        """
+        start = monotonic()
+        try:
+            # raises an error if an idle connection turns out to be dead
+            con = self.pool._try_connection(shareable, check=True)
+        except Exception:
+            self.failures += 1
+            self.down_until = monotonic() + retry_interval
+            raise
+        if con is not None:
+            now = monotonic()
+            self.down_until = 0
+            self.latency += self.smoothing * (now - start - self.latency)
+        return con
+
+    def stats(self):
+        """Get statistics of the host."""
+        stats = self.pool.stats()
+        stats['latency'] = self.latency
+        stats['failures'] = self.failures
+        stats['down'] = bool(self.down())
+        return stats
+
+
+class BalancedPooledDB:
+    """Pool for DB-API 2 connections balanced among several hosts.
+
+    After you have created the connection pool, you can use
+    connection() to get pooled, steady DB-API 2 connections.
+    """
+
+    version = __version__
+
+    def __init__(  # noqa: PLR0913
+            self, hosts, mincached=0, maxcached=0,
+            maxshared=0, maxconnections=0, blocking=False,
+            maxusage=None, setsession=None, reset=True,
+            failures=None, ping=1,
+            *args, creator=None, balance='connections', retry_interval=5,
+            **kwargs):
+        """Set up the balanced DB-API 2 connection pool.
+
+        hosts: list of the hosts, given as creators or as dicts
+            with additional parameters for the common creator
+        mincached: initial number of idle connections per host
+        maxcached: maximum number of idle connections per host
+        maxshared: maximum number of shared connections per host
+        maxconnections: maximum number of connections per host
+        blocking: determines behavior when exceeding the maximum
+        maxusage: maximum number of reuses of a single connection
+        setsession: optional list of SQL commands that may serve to prepare
+            the session, e.g. ["set datestyle to ...", "set time zone ..."]
+        reset: how connections should be reset when returned to the pool
+        failures: an optional exception class or a tuple of exception classes
+            for which the connection failover mechanism shall be applied
+        ping: determines when the connection should be checked with ping()
+        creator: the common creator for hosts given as dicts
+        balance: how to choose the host ('connections' or 'latency')
+        retry_interval: number of seconds a failing host is dropped
+        args, kwargs: the parameters that shall be passed to the creator
+            function or the connection constructor of the DB-API 2 module
+            and the keyword-only parameters of PooledDB
+
+        See the PooledDB class for a more detailed description
+        of the parameters, which apply to every host.
+        """
+        if not hosts:
+            raise ValueError("No hosts have been specified.")
+        if balance not in ('connections', 'latency'):
+            raise ValueError(
+                "'balance' must be 'connections' or 'latency'.")
+        self._by_latency = balance == 'latency'
+        self._retry_interval = retry_interval
+        limits = (
+            mincached, maxcached, maxshared, maxconnections, blocking,
+            maxusage, setsession, reset, failures, ping)
+        pools = []
+        for host in hosts:
+            if isinstance(host, dict):
+                if creator is None:
+                    raise ValueError(
+                        "A creator is needed for hosts given as dicts.")
+                pool = PooledDB(
+                    creator, *limits, *args, **kwargs, **host)
+            else:
+                pool = PooledDB(host, *limits, *args, **kwargs)
+            pools.append(pool)
+        self._hosts = [BalancedPooledDBHost(pool) for pool in pools]
+        self._rotation = count()
+
+    @property
+    def hosts(self):
+        """Get the hosts of the pool."""
+        return tuple(self._hosts)
+
+    def _order(self):
+        """Get the hosts in the order they shall be tried.
+
+        The hosts in the rotation come first, ordered by their number of
+        outstanding connections or their latency.  Hosts that are equally
+        good are rotated, so that they are used in turn.  Hosts that are
+        out of the rotation come last, ordered by their time of recovery.
+        """
+        hosts = self._hosts
+        n = len(hosts)
+        if n > 1:
+            index = next(self._rotation) % n
+            hosts = hosts[index:] + hosts[:index]
+        now = monotonic()
+        up = [host for host in hosts if not host.down(now)]
+        if len(up) < n:
+            down = [host for host in hosts if host.down(now)]
+            down.sort(key=lambda host: host.down_until)
+        else:
+            down = []
+        up.sort(key=(lambda host: host.latency) if self._by_latency
+                else (lambda host: host.outstanding))
+        return up + down
+
+    def steady_connection(self):
+        """Get a steady, unpooled DB-API 2 connection to the best host."""
+        return self._order()[0].pool.steady_connection()
+
+    def connection(self, shareable=True, timeout=None):
+        """Get a steady, cached DB-API 2 connection from the pool.
+
+        The connection is taken from the best host which can provide it
+        without waiting.  Hosts out of the rotation are only tried if no
+        host is in the rotation.  If no host can provide a connection, the
+        thread waits for a connection of the best host if the pool is
+        blocking and the timeout specifies how many seconds to wait at
+        most (None means using the default timeout set for the pool).
+        If connecting to the hosts fails, the last error is raised.
+        """
+        error = None
+        hosts = self._order()
+        retry_interval = self._retry_interval
+        busy = False  # whether a host in the rotation is busy
+        for host in hosts:
+            if busy and host.down():
+                break  # do not try the hosts out of the rotation
+            try:
+                con = host.try_connection(shareable, retry_interval)
+            except Exception as e:
+                error = e
+                continue
+            if con is not None:
+                return con
+            busy = True
+        if error is not None and all(host.down() for host in hosts):
+            raise error
+        for host in hosts:
+            if not host.down():
+                return host.pool.connection(shareable, timeout)
+        raise TooManyConnectionsError
+
+    def dedicated_connection(self, timeout=None):
+        """Alias for connection(shareable=False)."""
+        return self.connection(False, timeout)
+
+    def maintain(self):
+        """Maintain the idle connections of all hosts."""
+        for host in self._hosts:
+            host.pool.maintain()
+
+    def stats(self):
+        """Get statistics of the pool.
+
+        Returns the sum of the statistics of all hosts and a list
+        with the statistics of every host, including its latency,
+        number of failures and whether it is out of the rotation.
+        """
+        hosts = [host.stats() for host in self._hosts]
+        stats = sum_stats(
+            {name: value for name, value in host.items()
+             if name not in ('latency', 'failures', 'down')}
+            for host in hosts)
+        stats['hosts'] = hosts
+        return stats
+
+    def close(self):
+        """Close all connections to all hosts."""
+        for host in self._hosts:
+            host.pool.close()
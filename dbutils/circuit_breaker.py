@@ -0,0 +1,184 @@
+"""CircuitBreaker - protecting databases against reconnect storms.
+
+Implements a circuit breaker which can be shared by all SteadyDB connections
+of a connection pool such as PooledDB or PersistentDB, in order to limit
+the attempts to open connections while the database is unavailable.
+
+When the database goes down, every connection of a pool notices this when
+it is checked out, pinged or used, and tries to reopen itself immediately.
+Without a circuit breaker, a server that is just recovering would then be
+hammered with connection attempts from all threads at once.
+
+The circuit breaker is closed as long as opening connections succeeds.
+When a given number of consecutive attempts to open a connection have
+failed, the circuit is opened, and all further attempts fail fast with
+a CircuitOpenError, without trying to contact the database.  After a
+backoff time, the circuit becomes half-open and lets one probe attempt
+through, while the other attempts still fail fast.  If the probe succeeds,
+the circuit is closed again; if it fails, the circuit is reopened and
+the backoff time is doubled, up to a given maximum.  The backoff times
+are spread by a random jitter, so that several pools do not retry in
+lockstep.  While the circuit is closed, the overhead of the circuit
+breaker is negligible, since no lock needs to be taken.
+
+
+Usage:
+
+Pass breaker=True to PooledDB or PersistentDB in order to protect the pool
+with a circuit breaker using the default settings, or pass an instance of
+CircuitBreaker created with the following parameters:
+
+    threshold: the number of consecutive failed attempts to open
+        a connection after which the circuit is opened (default is 3)
+    backoff: the number of seconds the circuit stays open after
+        it has been opened for the first time (default is 0.1)
+    max_backoff: the maximum number of seconds the circuit stays open
+        after failed probes have doubled the backoff (default is 30)
+
+For instance, if you are using pgdb as your DB-API 2 database module:
+
+    import pgdb  # import used DB-API 2 module
+    from dbutils.circuit_breaker import CircuitBreaker
+    from dbutils.pooled_db import PooledDB
+    breaker = CircuitBreaker(threshold=5, backoff=0.5, max_backoff=10)
+    pool = PooledDB(pgdb, 5, database='mydb', breaker=breaker)
+
+The state and counters of the circuit breaker can be retrieved as a dict
+with pool.breaker.stats().
+
+
+Copyright, credits and license:
+
+* Based on the PooledDB module contributed as supplement for
+  Webware for Python and PyGreSQL by Christoph Zwerschke in September 2005
+
+Licensed under the MIT license.
+"""
+
+from random import random
+from threading import Lock
+from time import monotonic
+
+__all__ = ['CircuitBreaker', 'CircuitOpenError']
+
+
+class CircuitOpenError(Exception):
+    """Connection attempt rejected since the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Circuit breaker for the attempts to open database connections."""
+
+    def __init__(self, threshold=3, backoff=0.1, max_backoff=30):
+        """Set up the circuit breaker.
+
+        threshold: number of consecutive failed attempts to open
+            a connection after which the circuit is opened
+        backoff: initial number of seconds the circuit stays open
+        max_backoff: maximum number of seconds the circuit stays open
+        """
+        self._threshold = max(threshold or 1, 1)
+        self._backoff = backoff
+        self._max_backoff = max(max_backoff or 0, backoff)
+        self._lock = Lock()
+        self._failures = 0  # consecutive failed attempts
+        self._trips = 0  # consecutive times the circuit has been opened
+        self._open_until = None  # None means the circuit is closed
+        self._probing = False  # whether a probe attempt is running
+        self._opened = 0  # number of times the circuit has been opened
+        self._rejected = 0  # number of attempts that failed fast
+
+    @property
+    def state(self):
+        """Get the state of the circuit ('closed', 'open' or 'half-open')."""
+        open_until = self._open_until
+        if open_until is None:
+            return 'closed'
+        if self._probing or monotonic() >= open_until:
+            return 'half-open'
+        return 'open'
+
+    def call(self, func, *args, **kwargs):
+        """Call a function opening a connection through the breaker.
+
+        Raises CircuitOpenError without calling the function if the circuit
+        is open or if it is half-open and the probe is already running.
+        """
+        probe = self._open_until is not None and self._admit()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self._failed(probe)
+            raise
+        except BaseException:  # e.g. interrupted, not a failed attempt
+            if probe:
+                with self._lock:
+                    self._probing = False  # let the next attempt probe
+            raise
+        if probe or self._failures:
+            self._succeeded()
+        return result
+
+    def _admit(self):
+        """Check whether an attempt may pass while the circuit is open.
+
+        Returns whether the attempt is the probe of the half-open circuit.
+        """
+        with self._lock:
+            open_until = self._open_until
+            if open_until is None:  # closed in the meantime
+                return False
+            if self._probing or monotonic() < open_until:
+                self._rejected += 1
+                raise CircuitOpenError("The circuit breaker is open.")
+            self._probing = True
+            return True
+
+    def _failed(self, probe):
+        """Note that an attempt to open a connection has failed."""
+        with self._lock:
+            if probe:
+                self._probing = False
+            if self._open_until is None:
+                self._failures += 1
+                if self._failures >= self._threshold:
+                    self._trip()
+            elif probe:
+                self._trip()
+
+    def _succeeded(self):
+        """Note that a connection has been opened, closing the circuit."""
+        with self._lock:
+            self._failures = self._trips = 0
+            self._open_until = None
+            self._probing = False
+
+    def _trip(self):
+        """Open the circuit for the current backoff time."""
+        backoff = min(
+            self._backoff * 2 ** min(self._trips, 32), self._max_backoff)
+        self._trips += 1
+        # spread the backoff, so that several pools do not retry in lockstep
+        backoff *= 0.5 + 0.5 * random()  # noqa: S311
+        self._open_until = monotonic() + backoff
+        self._opened += 1
+
+    def reset(self):
+        """Close the circuit, e.g. when the database is known to be back."""
+        self._succeeded()
+
+    def stats(self):
+        """Get the state and the counters of the circuit breaker.
+
+        Returns a dict with the state of the circuit (state), the number of
+        consecutive failed attempts (failures), the number of times the
+        circuit has been opened (opened) and the number of attempts that
+        failed fast because the circuit was open (rejected).
+        """
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self._failures,
+                'opened': self._opened,
+                'rejected': self._rejected,
+            }
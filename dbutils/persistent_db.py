@@ -55,6 +55,38 @@ by creating an instance of PersistentDB, passing the following parameters:
         that will be used instead of our Python implementation
         (threading.local is faster, but cannot be used in all cases)
 
+    The following parameters can only be passed as keyword arguments:
+
+    max_lifetime: the maximum number of seconds a connection may live
+        before it is reopened (0 or None means unlimited lifetime)
+    idle_timeout: the maximum number of seconds a connection may be idle
+        before it is reopened (0 or None means no timeout)
+        Expired connections are reopened when they are requested
+        again, unless they are inside a transaction.  To avoid
+        reconnection storms, both limits are shortened by a random
+        jitter of up to ten percent for every connection.
+    ping_interval: if set to a number of seconds, connections that have
+        been used successfully within this interval will be trusted
+        without being checked with ping(), saving a round-trip
+        (the default value of 0 or None means always checking them)
+    breaker: if set to true, the connections share a circuit breaker,
+        so that attempts to open connections fail fast while the database
+        is unavailable, and only one probe connection is tried after an
+        exponentially growing backoff time with random jitter
+        (you can also pass a CircuitBreaker instance with your settings,
+        by default there is no circuit breaker)
+    statement_cache_size: if set to a number, every connection keeps an LRU
+        cache of up to this number of cursors prepared with its prepare()
+        method, which survives checkouts from the pool and is cleared when
+        the connection is reopened, so that statements executed frequently
+        are only prepared once per connection (by default, there is no
+        statement cache, and closed prepared cursors are really closed)
+    cursor_cache_size: if set to a number, every connection keeps up to this
+        number of cursors of the driver from closed cursors and reuses them
+        when a cursor is requested, saving the creation of a new cursor by
+        the driver (by default, there is no cursor cache, and cursors are
+        really closed; closed cursors can never be used again)
+
     The creator function or the connect function of the DB-API 2 compliant
     database module specified as the creator will receive any additional
     parameters such as the host, database, user, password etc.  You may
@@ -93,6 +125,10 @@ connections may become a bit faster, but this may not work in all
 environments (for instance, mod_wsgi is known to cause problems
 since it clears the threading.local data between requests).
 
+You can get statistics such as the number of checkouts and opened
+connections as a dict with persist.stats().  The counters are described
+in the pool_stats module.
+
 
 Ideas for improvement:
 
@@ -111,8 +147,12 @@ Copyright, credits and license:
 Licensed under the MIT license.
 """
 
+from time import monotonic
+
 from . import __version__
-from .steady_db import connect
+from .circuit_breaker import CircuitBreaker
+from .pool_stats import PoolStats
+from .steady_db import SteadyDBStatementCache, connect
 
 try:
     # Prefer the pure Python version of threading.local.
@@ -143,10 +183,13 @@ class PersistentDB:
 
     version = __version__
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
             self, creator,
             maxusage=None, setsession=None, failures=None, ping=1,
-            closeable=False, threadlocal=None, *args, **kwargs):
+            closeable=False, threadlocal=None, *args,
+            max_lifetime=None, idle_timeout=None, ping_interval=None,
+            breaker=None, statement_cache_size=None, cursor_cache_size=None,
+            **kwargs):
         """Set up the persistent DB-API 2 connection generator.
 
         creator: either an arbitrary function returning new DB-API 2
@@ -169,6 +212,19 @@ class PersistentDB:
         threadlocal: an optional class for representing thread-local data
             that will be used instead of our Python implementation
             (threading.local is faster, but cannot be used in all cases)
+        max_lifetime: maximum number of seconds a connection may live
+            (0 or None means unlimited lifetime)
+        idle_timeout: maximum number of seconds a connection may be idle
+            (0 or None means no timeout)
+        ping_interval: number of seconds after the last use of
+            a connection in which it is not checked with ping()
+            (0 or None means always checking the connection)
+        breaker: whether connections shall share a circuit breaker
+            (True or a CircuitBreaker instance, see circuit_breaker)
+        statement_cache_size: maximum number of cursors prepared with
+            prepare() that are cached per connection (0 or None = no cache)
+        cursor_cache_size: maximum number of closed cursors that are kept
+            per connection for reuse (0 or None means no cursor cache)
         args, kwargs: the parameters that shall be passed to the creator
             function or the connection constructor of the DB-API 2 module
         """
@@ -193,15 +249,38 @@ class PersistentDB:
         self._failures = failures
         self._ping = ping
         self._closeable = closeable
+        self._max_lifetime = max_lifetime or 0
+        self._idle_timeout = idle_timeout or 0
+        self._ping_interval = ping_interval or 0
         self._args, self._kwargs = args, kwargs
+        self._stats = PoolStats()
+        # the circuit breaker shared by all connections
+        self.breaker = CircuitBreaker() if breaker is True else (
+            breaker or None)
+        self._statement_cache_size = statement_cache_size or 0
+        self._cursor_cache_size = cursor_cache_size or 0
         self.thread = (threadlocal or local)()
 
     def steady_connection(self):
         """Get a steady, non-persistent DB-API 2 connection."""
-        return connect(
-            self._creator, self._maxusage, self._setsession,
-            self._failures, self._ping, self._closeable,
-            *self._args, **self._kwargs)
+        start = monotonic()
+        breaker = self.breaker
+        args = (self._creator, self._maxusage, self._setsession,
+                self._failures, self._ping, self._closeable, *self._args)
+        if breaker is None:
+            con = connect(*args, **self._kwargs)
+        else:  # fail fast while the database is unavailable
+            con = breaker.call(connect, *args, **self._kwargs)
+            con._breaker = breaker
+        if self._statement_cache_size:
+            con._statements = SteadyDBStatementCache(
+                self._statement_cache_size)
+        if self._cursor_cache_size:
+            con._new_cursor_cache(self._cursor_cache_size)
+        con._stats = self._stats
+        con._ping_interval = self._ping_interval
+        self._stats.record().add_created(monotonic() - start)
+        return con
 
     def connection(self, shareable=False):  # noqa: ARG002
         """Get a steady, persistent DB-API 2 connection.
@@ -218,9 +297,32 @@ class PersistentDB:
                 raise NotSupportedError(
                     "Database module is not thread-safe.") from error
             self.thread.connection = con
+        else:
+            if (self._max_lifetime or self._idle_timeout) and not (
+                    con._transaction) and con._expired(
+                        self._max_lifetime, self._idle_timeout):
+                try:  # reopen the expired connection
+                    new_con = con._create()
+                except Exception:  # noqa: S110
+                    pass  # database may be unavailable, keep the old one
+                else:
+                    con._close()
+                    con._store(new_con)
+                    self._stats.record().checkouts += 1
+                    return con
         con._ping_check()
+        self._stats.record().checkouts += 1
         return con
 
     def dedicated_connection(self):
         """Alias for connection(shareable=False)."""
         return self.connection()
+
+    def stats(self):
+        """Get statistics of the connections.
+
+        Returns a dict with the counters and histograms described in
+        the pool_stats module.  Since persistent connections are never
+        waited for, the wait counters will always be zero.
+        """
+        return self._stats.snapshot()
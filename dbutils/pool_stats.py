@@ -0,0 +1,192 @@
+"""PoolStats - statistics for the DBUtils connection pools.
+
+Implements the counters and latency histograms which are collected by the
+connection pools PooledDB, PooledPg and PersistentDB and can be retrieved
+by calling the stats() method of the pool.
+
+In order to not add another lock to the hot path of the pools, every
+thread updates its own record of counters, which is registered with the
+statistics object when the thread uses the pool for the first time.
+Only when the statistics are requested, these records are summed up.
+The records of threads that have ended are then merged into one record.
+
+The statistics returned by the stats() method of the pools are a dict
+with the following counters:
+
+    checkouts: number of connections that have been handed out
+    waits: number of checkouts that had to wait for a connection
+    wait_time: total number of seconds spent waiting for connections
+    timeouts: number of checkouts that gave up waiting for a connection
+    created: number of connections that have been opened by the pool
+    create_time: total number of seconds spent opening connections
+    failovers: number of connections that have been transparently
+        reopened by SteadyDB or SteadyPg after they had been lost,
+        reached their usage limit or expired
+    pings: number of checks whether connections are still alive
+    rollbacks: number of rollbacks when connections were reset
+    skipped_rollbacks: number of rollbacks that were not necessary when
+        connections were reset, since nothing had been executed, i.e.
+        the number of round-trips to the database that have been saved
+    affinity_hits: number of checkouts in which PooledDB with thread
+        affinity handed out the connection that the requesting thread
+        had returned last, without taking the lock of the pool
+    statement_hits: number of statements prepared with prepare() that
+        were found in the statement cache of the connection
+    statement_misses: number of statements prepared with prepare() that
+        were not found in the statement cache of the connection
+
+Furthermore, it contains the following histograms as lists of pairs of the
+upper bound of a bucket in seconds and the number of values in this bucket:
+
+    wait_histogram: the time spent by checkouts that had to wait
+    create_histogram: the time spent for opening connections
+
+The pools also add the current number of their idle and used connections
+(idle, used) and PooledDB also the number of shared connections (shared).
+
+Pools made of several PooledDB instances return the sum of their statistics,
+which can be computed with the sum_stats() function.
+
+
+Copyright, credits and license:
+
+* Based on the PooledDB module contributed as supplement for
+  Webware for Python and PyGreSQL by Christoph Zwerschke in September 2005
+
+Licensed under the MIT license.
+"""
+
+from bisect import bisect_left
+from math import inf
+from threading import Lock, current_thread, local
+
+__all__ = ['PoolStats', 'PoolStatsRecord', 'BUCKETS', 'COUNTERS', 'sum_stats']
+
+# upper bounds of the buckets of the latency histograms in seconds
+BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1, 2.5, 5, 10, inf)
+
+# names of the counters collected for the pools
+COUNTERS = (
+    'checkouts', 'waits', 'wait_time', 'timeouts', 'created', 'create_time',
+    'failovers', 'pings', 'rollbacks', 'skipped_rollbacks', 'affinity_hits',
+    'statement_hits', 'statement_misses')
+
+
+# minimum number of records at which the records of ended threads are merged
+RETIRE_AT = 64
+
+
+class PoolStatsRecord:
+    """Counters and histograms collected by one thread."""
+
+    __slots__ = (*COUNTERS, 'thread', 'wait_histogram', 'create_histogram')
+
+    def __init__(self, thread=None):
+        """Create an empty record for the given thread."""
+        self.thread = thread
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        self.wait_histogram = [0] * len(BUCKETS)
+        self.create_histogram = [0] * len(BUCKETS)
+
+    def add_wait(self, duration, timeout=False):
+        """Count a checkout that had to wait for the given duration."""
+        self.waits += 1
+        self.wait_time += duration
+        self.wait_histogram[bisect_left(BUCKETS, duration)] += 1
+        if timeout:
+            self.timeouts += 1
+
+    def add_created(self, duration):
+        """Count a connection that took the given duration to open."""
+        self.created += 1
+        self.create_time += duration
+        self.create_histogram[bisect_left(BUCKETS, duration)] += 1
+
+    def merge(self, other):
+        """Add the counters and histograms of another record."""
+        for name in COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for i, n in enumerate(other.wait_histogram):
+            self.wait_histogram[i] += n
+        for i, n in enumerate(other.create_histogram):
+            self.create_histogram[i] += n
+
+    def as_dict(self):
+        """Get the counters and histograms as a dict."""
+        stats = {name: getattr(self, name) for name in COUNTERS}
+        stats['wait_histogram'] = list(zip(BUCKETS, self.wait_histogram))
+        stats['create_histogram'] = list(zip(BUCKETS, self.create_histogram))
+        return stats
+
+
+class PoolStats:
+    """Statistics collected by a connection pool."""
+
+    def __init__(self):
+        """Create empty statistics."""
+        self._local = local()
+        self._records = []  # the records of all threads
+        self._retired = PoolStatsRecord()  # merged records of ended threads
+        # the number of records at which those of ended threads are merged
+        self._retire_at = RETIRE_AT
+        # the lock is only needed when registering records or reading them
+        self._lock = Lock()
+
+    def record(self):
+        """Get the record of the current thread for updating it."""
+        try:
+            return self._local.record
+        except AttributeError:
+            record = self._local.record = PoolStatsRecord(current_thread())
+            with self._lock:
+                self._records.append(record)
+                if len(self._records) >= self._retire_at:
+                    # do not keep the records of many short-lived threads
+                    self._retire()
+                    self._retire_at = max(
+                        2 * len(self._records), RETIRE_AT)
+            return record
+
+    def _retire(self):
+        """Merge the records of ended threads.
+
+        This must be called while holding the lock.
+        """
+        records = self._records
+        alive = []
+        for record in records:
+            if record.thread.is_alive():
+                alive.append(record)
+            else:
+                self._retired.merge(record)
+        if len(alive) < len(records):
+            self._records = alive
+
+    def snapshot(self):
+        """Get the sum of all records as a dict."""
+        total = PoolStatsRecord()
+        with self._lock:
+            self._retire()
+            total.merge(self._retired)
+            for record in self._records:
+                total.merge(record)
+        return total.as_dict()
+
+
+def sum_stats(stats):
+    """Get the sum of the statistics returned by several pools."""
+    total = {}
+    for pool_stats in stats:
+        for name, value in pool_stats.items():
+            if name not in total:
+                total[name] = value
+            elif name.endswith('_histogram'):
+                total[name] = [
+                    (bound, n + m) for (bound, n), (_bound, m)
+                    in zip(total[name], value)]
+            else:
+                total[name] += value
+    return total
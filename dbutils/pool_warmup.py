@@ -0,0 +1,99 @@
+"""PoolWarmup - opening the initial connections of the DBUtils pools.
+
+Implements the warm-up of the connection pools PooledDB, SimplePooledDB
+and SimplePooledPg, i.e. the opening of the connections that the pools
+establish when they are created.
+
+Since opening a connection usually means waiting for several round-trips
+to the database, the connections are opened in parallel, using a bounded
+pool of threads.  The pools accept the following warm-up modes:
+
+    serial: open the connections one after another
+    parallel: open the connections in parallel and return when all
+        of them have been opened (this is the default mode)
+    background: return immediately and open the connections in parallel
+        in a background thread, filling the pool asynchronously
+
+In any case, the pools provide an event as their "ready" attribute which
+is set when the warm-up is finished, so that callers can wait for it.
+If opening connections fails in the serial or parallel mode, the error
+is raised after all the other connections have been added to the pool.
+In the background mode, errors are ignored, and the event is set anyway.
+
+
+Copyright, credits and license:
+
+* Based on the PooledDB module contributed as supplement for
+  Webware for Python and PyGreSQL by Christoph Zwerschke in September 2005
+
+Licensed under the MIT license.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import suppress
+from threading import Event, Thread
+
+__all__ = ['warm_up', 'MAX_WORKERS', 'WARMUP_MODES']
+
+# the maximum number of threads opening connections in parallel
+MAX_WORKERS = 8
+
+# the supported warm-up modes
+WARMUP_MODES = ('serial', 'parallel', 'background')
+
+
+def warm_up(connect, add, count, mode='parallel', max_workers=MAX_WORKERS):
+    """Open connections and add them to a pool.
+
+    connect: the function opening a new connection
+    add: the function adding an open connection to the pool
+    count: the number of connections to be opened
+    mode: the warm-up mode ('serial', 'parallel' or 'background')
+    max_workers: the maximum number of threads opening connections
+
+    Returns an event that is set when the warm-up is finished.
+    """
+    if mode not in WARMUP_MODES:
+        raise ValueError(
+            "'warmup' must be 'serial', 'parallel' or 'background'.")
+    ready = Event()
+    if mode == 'serial':
+        max_workers = 1
+    if mode == 'background' and count > 0:
+
+        def run():
+            with suppress(Exception):  # the pool will open them on demand
+                _open(connect, add, count, max_workers)
+            ready.set()
+
+        Thread(target=run, name='PoolWarmup', daemon=True).start()
+    else:
+        try:
+            _open(connect, add, count, max_workers)
+        finally:
+            ready.set()
+    return ready
+
+
+def _open(connect, add, count, max_workers):
+    """Open the given number of connections and add them to the pool."""
+    if count <= 0:
+        return
+    if count == 1 or max_workers <= 1:
+        for _i in range(count):
+            add(connect())
+        return
+    error = None
+    workers = min(count, max_workers)
+    with ThreadPoolExecutor(workers, 'PoolWarmup') as executor:
+        futures = [executor.submit(connect) for _i in range(count)]
+        for future in as_completed(futures):
+            try:
+                con = future.result()
+            except Exception as e:
+                if error is None:
+                    error = e
+            else:
+                add(con)
+    if error is not None:
+        raise error
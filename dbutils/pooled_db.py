@@ -46,6 +46,7 @@ an instance of PooledDB, passing the following parameters:
     blocking: determines behavior when exceeding the maximum
         (if this is set to true, block and wait until the number of
         connections decreases, but by default an error will be reported)
+        Waiting threads are served in the order of their arrival.
     maxusage: maximum number of reuses of a single connection
         (the default of 0 or None means unlimited reuse)
         When this maximum usage number of the connection is reached,
@@ -55,6 +56,8 @@ an instance of PooledDB, passing the following parameters:
     reset: how connections should be reset when returned to the pool
         (False or None to rollback transactions started with begin(),
         the default value True always issues a rollback for safety's sake)
+        The rollback is skipped if no cursor has been used since the
+        last commit or rollback, saving a round-trip to the database.
     failures: an optional exception class or a tuple of exception classes
         for which the connection failover mechanism shall be applied,
         if the default (OperationalError, InterfaceError, InternalError)
@@ -65,6 +68,76 @@ an instance of PooledDB, passing the following parameters:
         2 = when a cursor is created, 4 = when a query is executed,
         7 = always, and all other bit combinations of these values)
 
+    The following parameters can only be passed as keyword arguments:
+
+    checkout_order: the order in which idle connections are handed out
+        ('fifo' = default = the connection idle for the longest time,
+        'lifo' = the most recently used connection, keeping hot
+        connections hot and letting surplus connections age out)
+    checkout_timeout: the default number of seconds a blocking pool
+        waits for a connection before an error will be reported
+        (the default value of None means waiting indefinitely)
+    maxwaiters: the maximum number of threads that may wait for
+        a connection in a blocking pool before further requests
+        will be rejected immediately with an error
+        (the default value of 0 or None means any number of threads)
+    maintenance_interval: if set to a number of seconds, a background
+        thread will maintain the pool in this interval, checking and
+        reopening idle connections that have not been used recently
+        or have reached their usage limit, and refilling the pool
+        up to mincached connections (the default value of 0 or None
+        means that no such thread will be started)
+    max_lifetime: the maximum number of seconds a connection may live
+        before it is reopened (0 or None means unlimited lifetime)
+    idle_timeout: the maximum number of seconds a connection may be idle
+        before it is reopened or closed (0 or None means no timeout)
+        Expired connections are reopened when they are fetched from the
+        pool.  The maintenance thread also reopens expired connections
+        and closes idle ones as long as more than mincached are left.
+        To avoid reconnection storms, both limits are shortened by
+        a random jitter of up to ten percent for every connection.
+    ping_interval: if set to a number of seconds, connections that have
+        been used successfully within this interval will be trusted
+        without being checked with ping(), saving a round-trip
+        (the default value of 0 or None means always checking them)
+    reset_worker: if set to true, connections returned to the pool will
+        be reset by a background thread, so that closing them returns
+        immediately and they re-enter the pool once they are clean
+        (by default, they are reset by the returning thread, but
+        always outside of the lock of the pool)
+    warmup: how the initial mincached connections are opened
+        ('parallel' = default = in parallel using a bounded pool of
+        threads, 'serial' = one after another, 'background' = return
+        immediately and fill the pool in a background thread)
+        The pool provides a threading.Event as its "ready" attribute
+        which is set when all initial connections have been opened.
+    affinity: if set to true, a dedicated connection returned to the pool
+        is kept for the returning thread, which gets it back without
+        taking the lock of the pool when it requests the next dedicated
+        connection, keeping server-side caches and prepared statements
+        warm like PersistentDB while still respecting maxconnections
+        (kept connections are handed to other threads when the pool has
+        reached maxconnections and no other idle connections are left,
+        they count as idle connections for maxcached, and they are moved
+        to the idle cache when their threads have ended)
+    breaker: if set to true, the connections of the pool share a circuit
+        breaker, so that attempts to open connections fail fast while the
+        database is unavailable, and only one probe connection is tried
+        after an exponentially growing backoff time with random jitter
+        (you can also pass a CircuitBreaker instance with your settings,
+        by default there is no circuit breaker)
+    statement_cache_size: if set to a number, every connection keeps an LRU
+        cache of up to this number of cursors prepared with its prepare()
+        method, which survives checkouts from the pool and is cleared when
+        the connection is reopened, so that statements executed frequently
+        are only prepared once per connection (by default, there is no
+        statement cache, and closed prepared cursors are really closed)
+    cursor_cache_size: if set to a number, every connection keeps up to this
+        number of cursors of the driver from closed cursors and reuses them
+        when a cursor is requested, saving the creation of a new cursor by
+        the driver (by default, there is no cursor cache, and cursors are
+        really closed; closed cursors can never be used again)
+
     The creator function or the connect function of the DB-API 2 compliant
     database module specified as the creator will receive any additional
     parameters such as the host, database, user, password etc.  You may
@@ -128,11 +201,14 @@ with other threads, that the transparent reopening will be suspended
 until the end of the transaction, and that the connection will be rolled
 back before being given back to the connection pool.
 
+You can get statistics of the pool such as the number of checkouts,
+waits and opened connections and histograms of the time spent waiting
+for connections and opening connections as a dict with pool.stats().
+The counters are described in the pool_stats module.
+
 
 Ideas for improvement:
 
-* Add a thread for monitoring, restarting (or closing) bad or expired
-  connections (similar to DBConnectionPool/ResourcePool by Warren Smith).
 * Optionally log usage, bad connections and exceeding of limits.
 
 
@@ -146,16 +222,35 @@ Copyright, credits and license:
 Licensed under the MIT license.
 """
 
+from collections import deque
 from contextlib import suppress
 from functools import total_ordering
-from threading import Condition
+from heapq import heappop, heappush
+from itertools import count
+from queue import SimpleQueue
+from threading import (
+    Event,
+    Lock,
+    RLock,
+    Thread,
+    active_count,
+    current_thread,
+    get_ident,
+)
+from time import monotonic
+from weakref import ref
 
 from . import __version__
-from .steady_db import connect
+from .circuit_breaker import CircuitBreaker
+from .pool_stats import PoolStats
+from .pool_warmup import warm_up
+from .steady_db import SteadyDBStatementCache, connect
 
 __all__ = [
-    'PooledDB', 'PooledDedicatedDBConnection',
-    'SharedDBConnection', 'PooledSharedDBConnection',
+    'PooledDB', 'PooledDBMaintenance', 'PooledDBResetWorker',
+    'PooledDBWaiter',
+    'PooledDBConnectionProxy', 'PooledDedicatedDBConnection',
+    'SharedDBConnection', 'SharedDBCache', 'PooledSharedDBConnection',
     'PooledDBError', 'InvalidConnectionError',
     'NotSupportedError', 'TooManyConnectionsError',
 ]
@@ -191,12 +286,17 @@ class PooledDB:
 
     version = __version__
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
             self, creator, mincached=0, maxcached=0,
             maxshared=0, maxconnections=0, blocking=False,
             maxusage=None, setsession=None, reset=True,
             failures=None, ping=1,
-            *args, **kwargs):
+            *args, checkout_order='fifo', checkout_timeout=None,
+            maxwaiters=None, maintenance_interval=None,
+            max_lifetime=None, idle_timeout=None, ping_interval=None,
+            reset_worker=False, warmup='parallel', affinity=False,
+            breaker=None, statement_cache_size=None, cursor_cache_size=None,
+            **kwargs):
         """Set up the DB-API 2 connection pool.
 
         creator: either an arbitrary function returning new DB-API 2
@@ -214,6 +314,7 @@ class PooledDB:
         blocking: determines behavior when exceeding the maximum
             (if this is set to true, block and wait until the number of
             connections decreases, otherwise an error will be reported)
+            Waiting threads are served in the order of their arrival.
         maxusage: maximum number of reuses of a single connection
             (0 or None means unlimited reuse)
             When this maximum usage number of the connection is reached,
@@ -222,7 +323,8 @@ class PooledDB:
             the session, e.g. ["set datestyle to ...", "set time zone ..."]
         reset: how connections should be reset when returned to the pool
             (False or None to rollback transactions started with begin(),
-            True to always issue a rollback for safety's sake)
+            True to always issue a rollback for safety's sake,
+            unless no cursor has been used since the last one)
         failures: an optional exception class or a tuple of exception classes
             for which the connection failover mechanism shall be applied,
             if the default (OperationalError, InterfaceError, InternalError)
@@ -231,6 +333,35 @@ class PooledDB:
             (0 = None = never, 1 = default = whenever fetched from the pool,
             2 = when a cursor is created, 4 = when a query is executed,
             7 = always, and all other bit combinations of these values)
+        checkout_order: the order in which idle connections are handed out
+            ('fifo' = the connection idle for the longest time,
+            'lifo' = the most recently used connection)
+        checkout_timeout: default number of seconds a blocking pool waits
+            for a connection (None means waiting indefinitely)
+        maxwaiters: maximum number of threads waiting for a connection
+            (0 or None means an arbitrary number of threads)
+        maintenance_interval: number of seconds between the runs of
+            a background thread maintaining the pool
+            (0 or None means no background maintenance)
+        max_lifetime: maximum number of seconds a connection may live
+            (0 or None means unlimited lifetime)
+        idle_timeout: maximum number of seconds a connection may be idle
+            (0 or None means no timeout)
+        ping_interval: number of seconds after the last use of
+            a connection in which it is not checked with ping()
+            (0 or None means always checking the connection)
+        reset_worker: whether returned connections shall be reset
+            in a background thread instead of the returning thread
+        warmup: how the initial connections are opened
+            ('parallel', 'serial' or 'background')
+        affinity: whether a thread shall preferably get back
+            the connection it has returned last
+        breaker: whether connections shall share a circuit breaker
+            (True or a CircuitBreaker instance)
+        statement_cache_size: maximum number of cursors prepared with
+            prepare() that are cached per connection (0 or None = no cache)
+        cursor_cache_size: maximum number of closed cursors that are kept
+            per connection for reuse (0 or None means no cursor cache)
         args, kwargs: the parameters that shall be passed to the creator
             function or the connection constructor of the DB-API 2 module
         """
@@ -257,12 +388,21 @@ class PooledDB:
         self._reset = reset
         self._failures = failures
         self._ping = ping
+        self._ping_interval = ping_interval or 0
+        if checkout_order not in ('fifo', 'lifo'):
+            raise ValueError("'checkout_order' must be 'fifo' or 'lifo'.")
+        self._lifo = checkout_order == 'lifo'
+        self._timeout = checkout_timeout
+        self._maxwaiters = maxwaiters or 0
+        self._max_lifetime = max_lifetime or 0
+        self._idle_timeout = idle_timeout or 0
         if mincached is None:
             mincached = 0
         if maxcached is None:
             maxcached = 0
         if maxconnections is None:
             maxconnections = 0
+        self._mincached = mincached
         if maxcached:
             maxcached = max(maxcached, mincached)
             self._maxcached = maxcached
@@ -270,7 +410,8 @@ class PooledDB:
             self._maxcached = 0
         if threadsafety > 1 and maxshared:
             self._maxshared = maxshared
-            self._shared_cache = []  # the cache for shared connections
+            # the cache for shared connections
+            self._shared_cache = SharedDBCache()
         else:
             self._maxshared = 0
         if maxconnections:
@@ -279,114 +420,600 @@ class PooledDB:
             self._maxconnections = maxconnections
         else:
             self._maxconnections = 0
-        self._idle_cache = []  # the actual pool of idle connections
-        self._lock = Condition()
-        self._connections = 0
+        self._idle_cache = deque()  # the actual pool of idle connections
+        # the lock must be reentrant since returning a connection
+        # may be triggered by garbage collection while holding it
+        self._lock = RLock()
+        self._connections = 0  # connections in use or being opened
+        self._pending_shared = 0  # shared connections being opened
+        # waiting threads for dedicated and for shared connections
+        self._waiters = (deque(), deque())
+        self._arrivals = count()
+        self._stats = PoolStats()
+        self._reset_worker = None
+        self._maintenance = None
+        # connections kept for the threads that returned them last,
+        # with weak references to these threads, by thread identifier;
+        # these still hold their slots and are counted as being in use
+        self._parked = {} if affinity else None
+        # the circuit breaker shared by all connections of the pool
+        self.breaker = CircuitBreaker() if breaker is True else (
+            breaker or None)
+        self._statement_cache_size = statement_cache_size or 0
+        self._cursor_cache_size = cursor_cache_size or 0
         # Establish an initial number of idle database connections:
-        idle = [self.dedicated_connection() for i in range(mincached)]
-        while idle:
-            idle.pop().close()
+        try:
+            self.ready = warm_up(
+                self.steady_connection, self._add_idle, mincached, warmup)
+        except Exception:
+            self.close()  # close the connections opened so far
+            raise
+        # Start a background thread for resetting connections if requested:
+        if reset_worker:
+            self._reset_worker = PooledDBResetWorker(self)
+            self._reset_worker.start()
+        # Start a background thread for maintaining the pool if requested:
+        self._maintenance_interval = maintenance_interval or 0
+        if maintenance_interval:
+            self._maintenance = PooledDBMaintenance(
+                self, maintenance_interval)
+            self._maintenance.start()
 
     def steady_connection(self):
         """Get a steady, unpooled DB-API 2 connection."""
-        return connect(
-            self._creator, self._maxusage, self._setsession,
-            self._failures, self._ping, True, *self._args, **self._kwargs)
+        start = monotonic()
+        breaker = self.breaker
+        args = (self._creator, self._maxusage, self._setsession,
+                self._failures, self._ping, True, *self._args)
+        if breaker is None:
+            con = connect(*args, **self._kwargs)
+        else:  # fail fast while the database is unavailable
+            con = breaker.call(connect, *args, **self._kwargs)
+            con._breaker = breaker
+        if self._statement_cache_size:
+            con._statements = SteadyDBStatementCache(
+                self._statement_cache_size)
+        if self._cursor_cache_size:
+            con._new_cursor_cache(self._cursor_cache_size)
+        con._stats = self._stats
+        con._ping_interval = self._ping_interval
+        self._stats.record().add_created(monotonic() - start)
+        return con
 
-    def connection(self, shareable=True):
+    def connection(self, shareable=True, timeout=None):
         """Get a steady, cached DB-API 2 connection from the pool.
 
         If shareable is set and the underlying DB-API 2 allows it,
         then the connection may be shared with other threads.
+
+        If the pool is blocking, the timeout specifies how many seconds
+        to wait at most for a connection before an error is reported
+        (None means using the default timeout set for the pool).
         """
-        if shareable and self._maxshared:
-            with self._lock:
-                while (not self._shared_cache and self._maxconnections
-                        and self._connections >= self._maxconnections):
-                    self._wait_lock()
-                if len(self._shared_cache) < self._maxshared:
-                    # shared cache is not full, get a dedicated connection
-                    try:  # first try to get it from the idle cache
-                        con = self._idle_cache.pop(0)
-                    except IndexError:  # else get a fresh connection
-                        con = self.steady_connection()
+        shareable = bool(shareable and self._maxshared)
+        if self._parked is not None and not shareable:
+            con = self._reclaim()
+            if con is not None:
+                return con
+        with self._lock:
+            if self._waiters[0] or self._waiters[1]:
+                # queue up behind the threads which are already waiting
+                granted, con = False, None
+            else:
+                granted, con = self._grant(shareable)
+            if not granted:
+                waiter = self._enqueue(shareable)
+                self._serve()
+        if not granted:
+            if timeout is None:
+                timeout = self._timeout
+            start = monotonic()
+            if not waiter.wait(timeout):
+                with self._lock:
+                    try:
+                        self._waiters[shareable].remove(waiter)
+                    except ValueError:  # granted in the meantime
+                        pass
                     else:
-                        con._ping_check()  # check this connection
-                    con = SharedDBConnection(con)
-                    self._connections += 1
-                else:  # shared cache full or no more connections allowed
-                    self._shared_cache.sort()  # least shared connection first
-                    con = self._shared_cache.pop(0)  # get it
-                    while con.con._transaction:
-                        # do not share connections which are in a transaction
-                        self._shared_cache.insert(0, con)
-                        self._wait_lock()
-                        self._shared_cache.sort()
-                        con = self._shared_cache.pop(0)
-                    con.con._ping_check()  # check the underlying connection
-                    con.share()  # increase share of this connection
-                # put the connection (back) into the shared cache
-                self._shared_cache.append(con)
-                self._lock.notify()
-            con = PooledSharedDBConnection(self, con)
-        else:  # try to get a dedicated connection
-            with self._lock:
-                while (self._maxconnections
-                        and self._connections >= self._maxconnections):
-                    self._wait_lock()
-                # connection limit not reached, get a dedicated connection
-                try:  # first try to get it from the idle cache
-                    con = self._idle_cache.pop(0)
-                except IndexError:  # else get a fresh connection
-                    con = self.steady_connection()
-                else:
-                    con._ping_check()  # check connection
-                con = PooledDedicatedDBConnection(self, con)
-                self._connections += 1
+                        self._stats.record().add_wait(
+                            monotonic() - start, timeout=True)
+                        raise TooManyConnectionsError
+                waiter.wait()
+            self._stats.record().add_wait(monotonic() - start)
+            con = waiter.con
+        con = self._checkout(con, shareable)
+        self._stats.record().checkouts += 1
         return con
 
-    def dedicated_connection(self):
+    def dedicated_connection(self, timeout=None):
         """Alias for connection(shareable=False)."""
-        return self.connection(False)
+        return self.connection(False, timeout)
+
+    def _reclaim(self):
+        """Get back the connection kept for the current thread if any.
+
+        This does not take the lock, since the slot is still held
+        by the connection.  Returns None if there is no such connection.
+        """
+        con = self._parked.pop(get_ident(), None)
+        if con is not None:
+            con = self._checkout(con[1], False)
+            record = self._stats.record()
+            record.checkouts += 1
+            record.affinity_hits += 1
+        return con
+
+    def _try_connection(self, shareable=True, check=False):
+        """Get a connection only if this is possible without waiting.
+
+        Returns None if the pool has reached its maximum size or other
+        threads are already waiting.  This is used by StripedPooledDB
+        for stealing connections from the other stripes.  If check is set,
+        an error is raised instead of returning a connection which did not
+        respond to ping() and could not be reopened, which is used by
+        BalancedPooledDB for detecting failing hosts.
+        """
+        shareable = bool(shareable and self._maxshared)
+        if self._parked is not None and not shareable:
+            con = self._reclaim()
+            if con is not None:
+                return con
+        with self._lock:
+            if self._waiters[0] or self._waiters[1]:
+                return None
+            granted, con = self._grant(shareable)
+        if not granted:
+            return None
+        con = self._checkout(con, shareable, check)
+        self._stats.record().checkouts += 1
+        return con
+
+    def _grant(self, shareable):
+        """Try to grant a connection or a slot for a new one.
+
+        This must be called while holding the lock.
+        Returns a tuple of a flag telling whether something has been
+        granted and the shared or idle connection, which is None if a
+        new connection needs to be opened in the reserved slot.
+        """
+        available = not (self._maxconnections
+                         and self._connections >= self._maxconnections)
+        if not available and self._parked and not self._idle_cache:
+            # no more connections allowed, so take a kept connection
+            available = self._unpark()
+        if shareable:
+            if available and (len(self._shared_cache) + self._pending_shared
+                              < self._maxshared):
+                # shared cache is not full, get a dedicated connection
+                self._pending_shared += 1
+                return True, self._reserve()
+            # shared cache full or no more connections allowed
+            # do not share connections which are in a transaction
+            con = self._shared_cache.least_shared()
+            if con:
+                # increase share of this connection
+                self._shared_cache.share(con)
+                return True, con
+        elif available:
+            # connection limit not reached, get a dedicated connection
+            return True, self._reserve()
+        return False, None
+
+    def _reserve(self):
+        """Reserve a slot for a connection and get an idle one if possible.
+
+        This must be called while holding the lock.  The connection,
+        if any, still needs to be checked outside of the lock.
+        """
+        self._connections += 1
+        idle = self._idle_cache
+        if idle:  # first try to get it from the idle cache
+            return idle.pop() if self._lifo else idle.popleft()
+        return None  # else a fresh connection must be opened
+
+    def _unpark(self, key=None):
+        """Move a connection kept for a thread into the idle cache.
+
+        This must be called while holding the lock.  If no key is given,
+        the connection kept for an arbitrary thread is taken.  Returns
+        whether a connection has been moved, which may not be the case
+        if its thread has taken it back in the meantime.
+        """
+        parked = self._parked
+        try:
+            con = (parked.popitem()[1] if key is None else parked.pop(key))[1]
+        except KeyError:
+            return False
+        self._idle_cache.append(con)
+        self._connections -= 1  # release the slot held by the connection
+        return True
+
+    def _unpark_dead(self):
+        """Release the connections kept for threads which have ended.
+
+        The connections are moved into the idle cache as long as it is
+        not full, otherwise they are closed.
+        """
+        surplus = []
+        with self._lock:
+            parked, idle = self._parked, self._idle_cache
+            maxcached = self._maxcached
+            for key, item in list(parked.items()):
+                thread, con = item[0](), item[1]
+                if thread is None or not thread.is_alive():
+                    if parked.get(key) is not item:
+                        continue  # taken back in the meantime
+                    del parked[key]
+                    self._connections -= 1
+                    if maxcached and len(idle) + len(parked) >= maxcached:
+                        surplus.append(con)
+                    else:
+                        idle.append(con)
+            self._serve()
+        for con in surplus:
+            with suppress(Exception):
+                con.close()
+
+    def _enqueue(self, shareable):
+        """Add a waiter for the current thread or report an error.
+
+        This must be called while holding the lock.
+        """
+        if not self._blocking:
+            raise TooManyConnectionsError
+        if self._maxwaiters and (
+                len(self._waiters[0]) + len(self._waiters[1])
+                >= self._maxwaiters):
+            raise TooManyConnectionsError  # too many threads already waiting
+        waiter = PooledDBWaiter(shareable, next(self._arrivals))
+        self._waiters[shareable].append(waiter)
+        return waiter
+
+    def _serve(self):
+        """Hand over connections or free slots to waiting threads.
+
+        This must be called while holding the lock whenever connections
+        or slots may have become available.  The threads are served in
+        the order of their arrival, but a thread waiting for a shared
+        connection does not hold up a thread waiting for a dedicated one
+        or vice versa.  The served threads do not need to check again.
+        """
+        dedicated, shared = self._waiters
+        while dedicated or shared:
+            if dedicated and shared:
+                queues = ((dedicated, shared)
+                          if dedicated[0].arrival < shared[0].arrival
+                          else (shared, dedicated))
+            else:
+                queues = (dedicated or shared,)
+            for queue in queues:
+                granted, con = self._grant(queue is shared)
+                if granted:
+                    queue.popleft().grant(con)
+                    break
+            else:
+                break
+
+    def _checkout(self, con, shareable, check=False):
+        """Check out a granted connection or open a new one.
+
+        This is called outside of the lock so that slow connection
+        establishment and pinging do not block other threads.
+        If check is set, an error is raised if the connection is dead.
+        """
+        if isinstance(con, SharedDBConnection):
+            # check the underlying connection
+            if con.con._ping_check() is False and check:
+                failure = con.con._failure
+                self._discard(con)
+                raise failure
+            return PooledSharedDBConnection(self, con)
+        try:
+            con = self._open(con, check)
+            if not shareable:
+                return PooledDedicatedDBConnection(self, con)
+        except Exception:
+            with self._lock:
+                if shareable:
+                    self._pending_shared -= 1
+                self._connections -= 1  # release the reserved slot
+                self._serve()
+            raise
+        with self._lock:
+            self._pending_shared -= 1
+            # put the connection into the shared cache
+            con = SharedDBConnection(con)
+            self._shared_cache.add(con)
+            self._serve()  # others may share this connection now
+        return PooledSharedDBConnection(self, con)
+
+    def _open(self, con=None, check=False):
+        """Check an idle connection or open a new one.
+
+        If check is set, an idle connection which did not respond to ping()
+        and could not be reopened is closed and an error is raised.
+        """
+        if con is None:
+            return self.steady_connection()
+        if (self._max_lifetime or self._idle_timeout) and con._expired(
+                self._max_lifetime, self._idle_timeout):
+            try:  # reopen the expired connection
+                new_con = con._create()
+            except Exception:  # noqa: S110
+                pass  # database may be unavailable, keep the old one
+            else:
+                con._close()
+                con._store(new_con)
+                return con
+        if con._ping_check() is False and check:  # check this connection
+            con._close()
+            raise con._failure
+        return con
 
     def unshare(self, con):
         """Decrease the share of a connection in the shared cache."""
         with self._lock:
-            con.unshare()
-            shared = con.shared
-            if not shared:  # connection is idle
-                # try to remove it from shared cache
-                with suppress(ValueError):  # if pool has already been closed
+            if con in self._shared_cache:
+                self._shared_cache.unshare(con)
+                shared = con.shared
+                if not shared:  # connection is idle
                     self._shared_cache.remove(con)
+            else:  # if pool has already been closed
+                con.unshare()
+                shared = con.shared
+            self._serve()
         if not shared:  # connection has become idle,
-            self.cache(con.con)  # so add it to the idle cache
+            if con.con._closed:  # but it has been discarded
+                with self._lock:
+                    self._connections -= 1
+                    self._serve()
+            else:
+                self.cache(con.con)  # so add it to the idle cache
+
+    def _discard(self, con):
+        """Discard a dead connection from the shared cache.
+
+        The connection is closed and not shared any more.  Its slot is
+        released when the threads still sharing it have given it back.
+        """
+        with self._lock:
+            if con in self._shared_cache:
+                self._shared_cache.remove(con)
+            con.unshare()
+            if not con.shared:
+                self._connections -= 1
+                self._serve()
+        with suppress(Exception):
+            con.con.close()
 
     def cache(self, con):
-        """Put a dedicated connection back into the idle cache."""
+        """Put a dedicated connection back into the idle cache.
+
+        If the pool has a reset worker, the connection is handed over
+        to the worker and will re-enter the pool once it has been reset.
+        """
+        if self._parked is not None and self._park(con):
+            return
+        worker = self._reset_worker
+        if not (worker and worker.put(con)):
+            self._checkin(con)
+
+    def _park(self, con):
+        """Reset a returned connection and keep it for the current thread.
+
+        This does not take the lock of the pool.  Returns whether the
+        connection could be kept, which is not the case if the thread
+        already has a kept connection, other threads are waiting or
+        the idle and kept connections have reached maxcached.
+        """
+        key = get_ident()
+        parked, waiters = self._parked, self._waiters
+        if key in parked or waiters[0] or waiters[1]:
+            return False
+        if parked and len(parked) >= active_count():
+            self._unpark_dead()  # some of the threads must have ended
+        maxcached = self._maxcached
+        if maxcached and len(parked) + len(self._idle_cache) >= maxcached:
+            return False
+        self._clean(con)
+        parked[key] = (ref(current_thread()), con)
+        if waiters[0] or waiters[1]:
+            # a thread started waiting in the meantime and may have missed
+            # the kept connection, so hand it over to the waiting threads
+            with self._lock:
+                self._unpark(key)
+                self._serve()
+        return True
+
+    def _clean(self, con):
+        """Reset a returned connection outside of the lock."""
+        # rollback possible transaction, unless the connection is clean
+        if con._reset(force=self._reset):
+            self._stats.record().rollbacks += 1
+        elif self._reset:
+            self._stats.record().skipped_rollbacks += 1
+
+    def _checkin(self, con):
+        """Reset a returned connection and put it into the idle cache.
+
+        The reset is done outside of the lock so that returning threads
+        are not serialized by the round-trip to the database.  If threads
+        are waiting, the connection is directly handed over to the one
+        that has been waiting for the longest time.
+        """
+        self._clean(con)
         with self._lock:
-            if not self._maxcached or len(self._idle_cache) < self._maxcached:
-                con._reset(force=self._reset)  # rollback possible transaction
+            maxcached = self._maxcached
+            # the connections kept for threads also count as idle ones
+            full = maxcached and len(self._idle_cache) + (
+                len(self._parked) if self._parked else 0) >= maxcached
+            if not full:
                 # the idle cache is not full, so put it there
                 self._idle_cache.append(con)  # append it to the idle cache
-            else:  # if the idle cache is already full,
-                con.close()  # then close the connection
             self._connections -= 1
-            self._lock.notify()
+            self._serve()
+        if full:  # if the idle cache is already full,
+            con.close()  # then close the connection
+
+    def maintain(self):
+        """Maintain the idle connections in the pool.
+
+        Idle connections that have exceeded the idle timeout are closed
+        as long as more than mincached idle connections are left.  Idle
+        connections that have not been used within the maintenance
+        interval are checked with ping() if pinging is enabled.  If they
+        are not alive, have expired or reached their usage limit, they are
+        reopened or closed if this is not possible.  While they are being
+        checked, they still count against maxconnections.  Then the pool
+        is refilled up to mincached idle connections, but not beyond
+        maxconnections.  The lock is not held while doing this,
+        so requesting threads will not be blocked.
+
+        Since connections are returned to the right end of the idle cache,
+        only connections from its left end need to be taken out and
+        checked, so the whole cache does not need to be scanned.
+
+        This is called periodically by the maintenance thread,
+        but you can also call it yourself.
+        """
+        if self._parked:
+            self._unpark_dead()
+        # take out the idle connections which need to be checked
+        now = monotonic()
+        since = now - self._maintenance_interval
+        idle_timeout = self._idle_timeout
+        expired, stale = [], []
+        with self._lock:
+            idle = self._idle_cache
+            if idle_timeout:
+                while len(idle) > self._mincached and idle[0]._expired(
+                        idle_timeout=idle_timeout, now=now):
+                    expired.append(idle.popleft())
+            while idle and idle[0]._last_used <= since:
+                stale.append(idle.popleft())
+            # the connections being checked still hold their slots
+            self._connections += len(stale)
+        # close surplus connections and check the others
+        for con in expired:
+            with suppress(Exception):
+                con.close()
+        checked = len(stale)
+        stale = [con for con in stale if self._refresh(con)]
+        surplus = []
+        with self._lock:
+            self._connections -= checked
+            idle = self._idle_cache
+            maxcached = self._maxcached
+            if maxcached:
+                room = max(maxcached - len(idle) - (
+                    len(self._parked) if self._parked else 0), 0)
+                surplus = stale[room:]
+                stale = stale[:room]
+            # these connections have not been used for the longest time
+            idle.extendleft(reversed(stale))
+            self._serve()
+        for con in surplus:
+            with suppress(Exception):
+                con.close()
+        # refill the pool up to the minimum number of idle connections
+        while True:
+            with self._lock:
+                idle = len(self._idle_cache)
+                if idle >= self._mincached or (
+                        self._maxconnections and self._connections + idle
+                        >= self._maxconnections):
+                    break
+            try:
+                con = self.steady_connection()
+            except Exception:  # database may be unavailable
+                break
+            if not self._add_idle(con):
+                break
+
+    def _add_idle(self, con):
+        """Add a newly opened connection to the idle cache.
+
+        The connection is closed instead if the idle cache is full
+        or the maximum number of connections has been reached.
+        Returns whether the connection has been added.
+        """
+        with self._lock:
+            idle = self._idle_cache
+            full = (self._maxcached and len(idle) >= self._maxcached) or (
+                self._maxconnections and
+                self._connections + len(idle) >= self._maxconnections)
+            if not full:
+                idle.append(con)
+                self._serve()
+        if full:
+            con.close()
+        return not full
+
+    def _refresh(self, con):
+        """Check an idle connection and reopen it if necessary.
+
+        Returns whether the connection can still be used.
+        """
+        if (con._maxusage and con._usage >= con._maxusage) or (
+                self._max_lifetime and con._expired(self._max_lifetime)):
+            alive = False
+        else:
+            # only ping if pinging is enabled at all
+            alive = con._ping_check(7, False) is not False
+        if not alive:
+            try:
+                new_con = con._create()
+            except Exception:
+                con._close()
+                return False
+            con._close()
+            con._store(new_con)
+        return True
+
+    def stats(self):
+        """Get statistics of the pool.
+
+        Returns a dict with the counters and histograms described in
+        the pool_stats module and the current number of idle connections
+        (idle), shared connections (shared) and connections that are
+        in use or being opened (used), including the shared ones.
+        """
+        stats = self._stats.snapshot()
+        with self._lock:
+            # connections kept for threads are idle, but hold their slots
+            parked = len(self._parked) if self._parked else 0
+            stats['idle'] = len(self._idle_cache) + parked
+            stats['shared'] = len(self._shared_cache) if self._maxshared else 0
+            stats['used'] = self._connections - parked
+        return stats
 
     def close(self):
-        """Close all connections in the pool."""
+        """Close all connections in the pool.
+
+        This also stops the maintenance thread and the reset worker
+        if there are any.
+        """
+        if self._maintenance:
+            self._maintenance.stop()
+        worker = self._reset_worker
+        if worker:
+            # connections returned later will be reset by their threads
+            self._reset_worker = None
+            worker.stop()
         with self._lock:
+            while self._parked:  # close all connections kept for threads
+                self._unpark()
             while self._idle_cache:  # close all idle connections
-                con = self._idle_cache.pop(0)
+                con = self._idle_cache.popleft()
                 with suppress(Exception):
                     con.close()
             if self._maxshared:  # close all shared connections
                 while self._shared_cache:
-                    con = self._shared_cache.pop(0).con
+                    con = self._shared_cache.pop().con
                     with suppress(Exception):
                         con.close()
                     self._connections -= 1
-            self._lock.notify_all()
+            self._serve()
 
     def __del__(self):
         """Delete the pool."""
@@ -396,42 +1023,154 @@ class PooledDB:
         except:  # noqa: E722, S110
             pass
 
-    def _wait_lock(self):
-        """Wait until notified or report an error."""
-        if not self._blocking:
-            raise TooManyConnectionsError
-        self._lock.wait()
 
+class PooledDBMaintenance(Thread):
+    """Auxiliary thread for maintaining a pool in the background."""
 
-# Auxiliary classes for pooled connections
+    def __init__(self, pool, interval):
+        """Create a maintenance thread.
 
-class PooledDedicatedDBConnection:
-    """Auxiliary proxy class for pooled dedicated connections."""
+        pool: the corresponding PooledDB instance
+        interval: number of seconds between maintenance runs
+        """
+        super().__init__(name='PooledDBMaintenance', daemon=True)
+        # do not keep the pool alive just for maintaining it
+        self._pool = ref(pool)
+        self._interval = interval
+        self._stopped = Event()
 
-    def __init__(self, pool, con):
-        """Create a pooled dedicated connection.
+    def run(self):
+        """Maintain the pool until it has been closed or deleted."""
+        while not self._stopped.wait(self._interval):
+            pool = self._pool()
+            if pool is None:
+                break
+            with suppress(Exception):
+                pool.maintain()
+            del pool
+
+    def stop(self):
+        """Stop maintaining the pool."""
+        self._stopped.set()
+
+
+class PooledDBResetWorker(Thread):
+    """Auxiliary thread for resetting returned connections."""
+
+    def __init__(self, pool):
+        """Create a reset worker.
 
         pool: the corresponding PooledDB instance
-        con: the underlying SteadyDB connection
         """
-        # basic initialization to make finalizer work
-        self._con = None
-        # proper initialization of the connection
-        if not con.threadsafety():
-            raise NotSupportedError("Database module is not thread-safe.")
-        self._pool = pool
-        self._con = con
+        super().__init__(name='PooledDBResetWorker', daemon=True)
+        # do not keep the pool alive just for resetting its connections
+        self._pool = ref(pool)
+        self._queue = SimpleQueue()
+        self._lock = Lock()
+        self._stopped = False
 
-    def close(self):
-        """Close the pooled dedicated connection."""
-        # Instead of actually closing the connection,
-        # return it to the pool for future reuse.
-        if self._con:
-            self._pool.cache(self._con)
-            self._con = None
+    def put(self, con):
+        """Hand over a returned connection.
+
+        Returns False if the worker has already been stopped.
+        """
+        with self._lock:
+            if self._stopped:
+                return False
+            self._queue.put(con)
+            return True
+
+    def run(self):
+        """Reset connections until the pool has been closed or deleted."""
+        while True:
+            con = self._queue.get()
+            if con is None:
+                break
+            pool = self._pool()
+            if pool is None:
+                break
+            with suppress(Exception):
+                pool._checkin(con)
+            del pool
+
+    def stop(self):
+        """Stop resetting connections after the pending ones."""
+        with self._lock:
+            self._stopped = True
+            self._queue.put(None)
+
+
+class PooledDBWaiter:
+    """Auxiliary class for threads waiting for a pooled connection."""
+
+    def __init__(self, shareable, arrival):
+        """Create a waiter for the current thread.
+
+        shareable: whether the thread is waiting for a shared connection
+        arrival: sequence number that tells when the thread started waiting
+        """
+        self.shareable = shareable
+        self.arrival = arrival
+        self.con = None
+        self._lock = Lock()
+        self._lock.acquire()
+
+    def grant(self, con):
+        """Hand over a connection or a reserved slot to the waiter."""
+        self.con = con
+        self._lock.release()
+
+    def wait(self, timeout=None):
+        """Wait until a connection or slot has been handed over.
+
+        Returns False if this did not happen within the given timeout.
+        """
+        if timeout is None:
+            return self._lock.acquire()
+        return self._lock.acquire(timeout=max(timeout, 0))
+
+
+# Auxiliary classes for pooled connections
+
+class PooledDBConnectionProxy:
+    """Auxiliary base proxy class for pooled connections.
+
+    The methods of the DB-API 2 connection interface are bound explicitly,
+    all other members of the underlying connection are proxied.
+    """
+
+    __slots__ = ('__weakref__', '_con', '_pool')
+
+    def cursor(self, *args, **kwargs):
+        """Return a new cursor object using the connection."""
+        con = self._con
+        if con:
+            return con.cursor(*args, **kwargs)
+        raise InvalidConnectionError
+
+    def begin(self, *args, **kwargs):
+        """Begin a transaction on the connection."""
+        con = self._con
+        if con:
+            return con.begin(*args, **kwargs)
+        raise InvalidConnectionError
+
+    def commit(self):
+        """Commit any pending transaction on the connection."""
+        con = self._con
+        if con:
+            return con.commit()
+        raise InvalidConnectionError
+
+    def rollback(self):
+        """Roll back to the start of any pending transaction."""
+        con = self._con
+        if con:
+            return con.rollback()
+        raise InvalidConnectionError
 
     def __getattr__(self, name):
-        """Proxy all members of the class."""
+        """Proxy all other members of the class."""
         if self._con:
             return getattr(self._con, name)
         raise InvalidConnectionError
@@ -453,6 +1192,34 @@ class PooledDedicatedDBConnection:
         self.close()
 
 
+class PooledDedicatedDBConnection(PooledDBConnectionProxy):
+    """Auxiliary proxy class for pooled dedicated connections."""
+
+    __slots__ = ()
+
+    def __init__(self, pool, con):
+        """Create a pooled dedicated connection.
+
+        pool: the corresponding PooledDB instance
+        con: the underlying SteadyDB connection
+        """
+        # basic initialization to make finalizer work
+        self._con = None
+        # proper initialization of the connection
+        if not con.threadsafety():
+            raise NotSupportedError("Database module is not thread-safe.")
+        self._pool = pool
+        self._con = con
+
+    def close(self):
+        """Close the pooled dedicated connection."""
+        # Instead of actually closing the connection,
+        # return it to the pool for future reuse.
+        if self._con:
+            self._pool.cache(self._con)
+            self._con = None
+
+
 @total_ordering
 class SharedDBConnection:
     """Auxiliary class for shared connections."""
@@ -464,6 +1231,8 @@ class SharedDBConnection:
         """
         self.con = con
         self.shared = 1
+        self.order = 0  # when the connection has been shared last
+        self.index = None  # the position in the shared cache
 
     def __lt__(self, other):
         """Check whether this connection should come before the other one."""
@@ -489,9 +1258,143 @@ class SharedDBConnection:
         self.shared -= 1
 
 
-class PooledSharedDBConnection:
+class SharedDBCache:
+    """Auxiliary indexed heap of shared connections.
+
+    The shared connections are ordered by their number of shares and,
+    if they are equally shared, by the time they were last shared.
+    Since every connection knows its position in the heap, it can be
+    repositioned or removed in logarithmic time when its share changes.
+    """
+
+    def __init__(self):
+        """Create an empty cache for shared connections."""
+        self._heap = []
+        self._counter = count()
+
+    def __len__(self):
+        """Get the number of shared connections in the cache."""
+        return len(self._heap)
+
+    def __getitem__(self, index):
+        """Get the shared connection at the given position in the heap."""
+        return self._heap[index]
+
+    def __iter__(self):
+        """Iterate over the shared connections in heap order."""
+        return iter(self._heap)
+
+    def __contains__(self, con):
+        """Check whether the shared connection is in the cache."""
+        index = con.index
+        return (index is not None and index < len(self._heap)
+                and self._heap[index] is con)
+
+    def add(self, con):
+        """Add a shared connection to the cache."""
+        con.order = next(self._counter)
+        con.index = len(self._heap)
+        self._heap.append(con)
+        self._sift_up(con.index)
+
+    def remove(self, con):
+        """Remove a shared connection from the cache."""
+        if con not in self:
+            raise ValueError("Connection is not in the cache.")
+        heap = self._heap
+        index = con.index
+        last = heap.pop()
+        if last is not con:
+            heap[index] = last
+            last.index = index
+            self._sift_up(index)
+            self._sift_down(last.index)
+        con.index = None
+
+    def pop(self):
+        """Remove and return an arbitrary shared connection."""
+        con = self._heap.pop()
+        con.index = None
+        return con
+
+    def share(self, con):
+        """Increase the share of a connection in the cache."""
+        con.share()
+        con.order = next(self._counter)
+        self._sift_down(con.index)
+
+    def unshare(self, con):
+        """Decrease the share of a connection in the cache."""
+        con.unshare()
+        self._sift_up(con.index)
+
+    def least_shared(self):
+        """Get the least shared connection that is not in a transaction.
+
+        Only connections in a transaction which are less shared than the
+        result need to be visited, the heap itself is not modified.
+        Returns None if all connections are in a transaction.
+        """
+        heap = self._heap
+        size = len(heap)
+        candidates = [(heap[0].shared, heap[0].order, 0)] if heap else []
+        while candidates:
+            index = heappop(candidates)[2]
+            con = heap[index]
+            if not con.con._transaction:
+                return con
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < size:
+                    con = heap[child]
+                    heappush(candidates, (con.shared, con.order, child))
+        return None
+
+    def _sift_up(self, index):
+        """Move the connection at the given index up the heap."""
+        heap = self._heap
+        con = heap[index]
+        key = con.shared, con.order
+        while index:
+            parent_index = (index - 1) >> 1
+            parent = heap[parent_index]
+            if key >= (parent.shared, parent.order):
+                break
+            heap[index] = parent
+            parent.index = index
+            index = parent_index
+        heap[index] = con
+        con.index = index
+
+    def _sift_down(self, index):
+        """Move the connection at the given index down the heap."""
+        heap = self._heap
+        size = len(heap)
+        con = heap[index]
+        key = con.shared, con.order
+        while True:
+            child_index = 2 * index + 1
+            if child_index >= size:
+                break
+            child = heap[child_index]
+            right_index = child_index + 1
+            if right_index < size:
+                right = heap[right_index]
+                if (right.shared, right.order) < (child.shared, child.order):
+                    child_index, child = right_index, right
+            if key <= (child.shared, child.order):
+                break
+            heap[index] = child
+            child.index = index
+            index = child_index
+        heap[index] = con
+        con.index = index
+
+
+class PooledSharedDBConnection(PooledDBConnectionProxy):
     """Auxiliary proxy class for pooled shared connections."""
 
+    __slots__ = ('_shared_con',)
+
     def __init__(self, pool, shared_con):
         """Create a pooled shared connection.
 
@@ -515,25 +1418,3 @@ class PooledSharedDBConnection:
         if self._con:
             self._pool.unshare(self._shared_con)
             self._shared_con = self._con = None
-
-    def __getattr__(self, name):
-        """Proxy all members of the class."""
-        if self._con:
-            return getattr(self._con, name)
-        raise InvalidConnectionError
-
-    def __del__(self):
-        """Delete the pooled connection."""
-        # builtins (including Exceptions) might not exist anymore
-        try:  # noqa: SIM105
-            self.close()
-        except:  # noqa: E722, S110
-            pass
-
-    def __enter__(self):
-        """Enter a runtime context for the connection."""
-        return self
-
-    def __exit__(self, *exc):
-        """Exit a runtime context for the connection."""
-        self.close()
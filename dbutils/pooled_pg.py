@@ -41,6 +41,7 @@ an instance of PooledPg, passing the following parameters:
     blocking: determines behavior when exceeding the maximum
         (if this is set to true, block and wait until the number of
         connections decreases, but by default an error will be reported)
+        Waiting threads are served in the order of their arrival.
     maxusage: maximum number of reuses of a single connection
         (the default of 0 or None means unlimited reuse)
         When this maximum usage number of the connection is reached,
@@ -48,6 +49,35 @@ an instance of PooledPg, passing the following parameters:
     setsession: an optional list of SQL commands that may serve to
         prepare the session, e.g. ["set datestyle to german", ...]
 
+    The following parameters can only be passed as keyword arguments:
+
+    checkout_order: the order in which idle connections are handed out
+        ('fifo' = default = the connection idle for the longest time,
+        'lifo' = the most recently used connection, keeping hot
+        connections hot and letting surplus connections age out)
+    checkout_timeout: the default number of seconds a blocking pool
+        waits for a connection before an error will be reported
+        (the default value of None means waiting indefinitely)
+    maxwaiters: the maximum number of threads that may wait for
+        a connection in a blocking pool before further requests
+        will be rejected immediately with an error
+        (the default value of 0 or None means any number of threads)
+    maintenance_interval: if set to a number of seconds, a background
+        thread will maintain the pool in this interval, checking and
+        reopening idle connections that have not been used recently
+        or have reached their usage limit, and refilling the pool
+        up to mincached connections (the default value of 0 or None
+        means that no such thread will be started)
+    max_lifetime: the maximum number of seconds a connection may live
+        before it is reopened (0 or None means unlimited lifetime)
+    idle_timeout: the maximum number of seconds a connection may be idle
+        before it is reopened or closed (0 or None means no timeout)
+        Expired connections are reopened when they are fetched from the
+        pool.  The maintenance thread also reopens expired connections
+        and closes idle ones as long as more than mincached are left.
+        To avoid reconnection storms, both limits are shortened by
+        a random jitter of up to ten percent for every connection.
+
     Additionally, you have to pass the parameters for the actual
     PostgreSQL connection which are passed via PyGreSQL,
     such as the names of the host, database, user, password etc.
@@ -94,11 +124,14 @@ suspended until the end of the transaction, and that the connection will
 be rolled back before being given back to the connection pool.  To end
 transactions, use one of the end(), commit() or rollback() methods.
 
+You can get statistics of the pool such as the number of checkouts,
+waits and opened connections and histograms of the time spent waiting
+for connections and opening connections as a dict with pool.stats().
+The counters are described in the pool_stats module.
+
 
 Ideas for improvement:
 
-* Add a thread for monitoring, restarting (or closing) bad or expired
-  connections (similar to DBConnectionPool/ResourcePool by Warren Smith).
 * Optionally log usage, bad connections and exceeding of limits.
 
 
@@ -112,14 +145,21 @@ Copyright, credits and license:
 Licensed under the MIT license.
 """
 
+from collections import deque
 from contextlib import suppress
-from queue import Empty, Full, Queue
+from itertools import islice
+from queue import Empty, LifoQueue, Queue
+from threading import Event, Lock, Thread
+from time import monotonic
+from weakref import ref
 
 from . import __version__
+from .pool_stats import PoolStats
 from .steady_pg import SteadyPgConnection
 
 __all__ = [
-    'PooledPg', 'PooledPgConnection',
+    'PooledPg', 'PooledPgConnection', 'PooledPgMaintenance',
+    'PooledPgWaiter',
     'PooledPgError', 'InvalidConnectionError', 'TooManyConnectionsError',
     'RESET_ALWAYS_ROLLBACK', 'RESET_COMPLETELY',
 ]
@@ -155,11 +195,13 @@ class PooledPg:
 
     version = __version__
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
             self, mincached=0, maxcached=0,
             maxconnections=0, blocking=False,
             maxusage=None, setsession=None, reset=None,
-            *args, **kwargs):
+            *args, checkout_order='fifo', checkout_timeout=None,
+            maxwaiters=None, maintenance_interval=None,
+            max_lifetime=None, idle_timeout=None, **kwargs):
         """Set up the PostgreSQL connection pool.
 
         mincached: initial number of connections in the pool
@@ -171,6 +213,7 @@ class PooledPg:
         blocking: determines behavior when exceeding the maximum
             (if this is set to true, block and wait until the number of
             connections decreases, otherwise an error will be reported)
+            Waiting threads are served in the order of their arrival.
         maxusage: maximum number of reuses of a single connection
             (0 or None means unlimited reuse)
             When this maximum usage number of the connection is reached,
@@ -180,6 +223,20 @@ class PooledPg:
         reset: how connections should be reset when returned to the pool
             (0 or None to rollback transactions started with begin(),
             1 to always issue a rollback, 2 for a complete reset)
+        checkout_order: the order in which idle connections are handed out
+            ('fifo' = the connection idle for the longest time,
+            'lifo' = the most recently used connection)
+        checkout_timeout: default number of seconds a blocking pool waits
+            for a connection (None means waiting indefinitely)
+        maxwaiters: maximum number of threads waiting for a connection
+            (0 or None means an arbitrary number of threads)
+        maintenance_interval: number of seconds between the runs of
+            a background thread maintaining the pool
+            (0 or None means no background maintenance)
+        max_lifetime: maximum number of seconds a connection may live
+            (0 or None means unlimited lifetime)
+        idle_timeout: maximum number of seconds a connection may be idle
+            (0 or None means no timeout)
         args, kwargs: the parameters that shall be used to establish
             the PostgreSQL connections using class PyGreSQL pg.DB()
         """
@@ -187,66 +244,289 @@ class PooledPg:
         self._maxusage = maxusage
         self._setsession = setsession
         self._reset = reset or 0
+        if checkout_order not in ('fifo', 'lifo'):
+            raise ValueError("'checkout_order' must be 'fifo' or 'lifo'.")
+        self._timeout = checkout_timeout
+        self._maxwaiters = maxwaiters or 0
+        self._max_lifetime = max_lifetime or 0
+        self._idle_timeout = idle_timeout or 0
         if mincached is None:
             mincached = 0
         if maxcached is None:
             maxcached = 0
         if maxconnections is None:
             maxconnections = 0
+        self._mincached = mincached
         if maxcached and maxcached < mincached:
             maxcached = mincached
         if maxconnections:
             maxconnections = max(maxconnections, maxcached)
-            # Create semaphore for number of allowed connections generally:
-            from threading import Semaphore  # noqa: PLC0415
-            self._connections = Semaphore(maxconnections)
             self._blocking = blocking
-        else:
-            self._connections = None
-        self._cache = Queue(maxcached)  # the actual connection pool
+        self._maxconnections = maxconnections
+        self._lock = Lock()
+        self._connections = 0  # connections in use or being opened
+        self._waiters = deque()  # threads waiting for a connection
+        self._stats = PoolStats()
+        # the actual connection pool
+        queue = LifoQueue if checkout_order == 'lifo' else Queue
+        self._cache = queue(maxcached)
         # Establish an initial number of database connections:
         idle = [self.connection() for i in range(mincached)]
         while idle:
             idle.pop().close()
+        # Start a background thread for maintaining the pool if requested:
+        self._maintenance_interval = maintenance_interval or 0
+        if maintenance_interval:
+            self._maintenance = PooledPgMaintenance(
+                self, maintenance_interval)
+            self._maintenance.start()
+        else:
+            self._maintenance = None
 
     def steady_connection(self):
         """Get a steady, unpooled PostgreSQL connection."""
-        return SteadyPgConnection(self._maxusage, self._setsession, True,
-                                  *self._args, **self._kwargs)
-
-    def connection(self):
-        """Get a steady, cached PostgreSQL connection from the pool."""
-        if self._connections and not self._connections.acquire(self._blocking):
-            raise TooManyConnectionsError
-        try:
-            con = self._cache.get_nowait()
-        except Empty:
-            con = self.steady_connection()
+        start = monotonic()
+        con = SteadyPgConnection(self._maxusage, self._setsession, True,
+                                 *self._args, **self._kwargs)
+        con._stats = self._stats
+        self._stats.record().add_created(monotonic() - start)
+        return con
+
+    def connection(self, timeout=None):
+        """Get a steady, cached PostgreSQL connection from the pool.
+
+        If the pool is blocking, the timeout specifies how many seconds
+        to wait at most for a connection before an error is reported
+        (None means using the default timeout set for the pool).
+        """
+        with self._lock:
+            if self._maxconnections and (
+                    self._waiters
+                    or self._connections >= self._maxconnections):
+                if not self._blocking or (
+                        self._maxwaiters
+                        and len(self._waiters) >= self._maxwaiters):
+                    raise TooManyConnectionsError
+                # queue up behind the threads which are already waiting
+                waiter = PooledPgWaiter()
+                self._waiters.append(waiter)
+            else:
+                waiter = None
+                self._connections += 1
+                try:
+                    con = self._cache.get_nowait()
+                except Empty:
+                    con = None
+        if waiter:
+            if timeout is None:
+                timeout = self._timeout
+            start = monotonic()
+            if not waiter.wait(timeout):
+                with self._lock:
+                    try:
+                        self._waiters.remove(waiter)
+                    except ValueError:  # granted in the meantime
+                        pass
+                    else:
+                        self._stats.record().add_wait(
+                            monotonic() - start, timeout=True)
+                        raise TooManyConnectionsError
+                waiter.wait()
+            self._stats.record().add_wait(monotonic() - start)
+            con = waiter.con
+        if con is None:
+            try:
+                con = self.steady_connection()
+            except Exception:
+                self._release()
+                raise
+        elif (self._max_lifetime or self._idle_timeout) and con._expired(
+                self._max_lifetime, self._idle_timeout):
+            con.reopen()  # keeps the old connection if this is not possible
+        self._stats.record().checkouts += 1
         return PooledPgConnection(self, con)
 
     def cache(self, con):
-        """Put a connection back into the pool cache."""
-        try:
-            if self._reset == RESET_COMPLETELY:
-                con.reset()  # reset the connection completely
-            elif self._reset == RESET_ALWAYS_ROLLBACK or con._transaction:
-                with suppress(Exception):
-                    con.rollback()  # rollback a possible transaction
-            self._cache.put_nowait(con)  # and then put it back into the cache
-        except Full:
+        """Put a connection back into the pool cache.
+
+        If threads are waiting, the connection is directly handed over
+        to the one that has been waiting for the longest time.
+        """
+        if self._reset == RESET_COMPLETELY:
+            con.reset()  # reset the connection completely
+        elif self._reset == RESET_ALWAYS_ROLLBACK or con._transaction:
+            with suppress(Exception):
+                con.rollback()  # rollback a possible transaction
+            self._stats.record().rollbacks += 1
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft().grant(con)
+                return
+            self._connections -= 1
+            full = self._cache.full()
+            if not full:
+                self._cache.put_nowait(con)  # put it back into the cache
+        if full:
             con.close()
-        if self._connections:
-            self._connections.release()
+
+    def _release(self):
+        """Release a slot that has not been used."""
+        with self._lock:
+            if self._waiters:
+                # let the thread that has been waiting open a connection
+                self._waiters.popleft().grant(None)
+            else:
+                self._connections -= 1
+
+    def maintain(self):
+        """Maintain the idle connections in the pool.
+
+        Idle connections that have exceeded the idle timeout are closed
+        as long as more than mincached idle connections are left.  Idle
+        connections that have not been used within the maintenance
+        interval are checked with a trivial query.  If they are not alive,
+        have expired or reached their usage limit, they are reset or closed
+        if this is not possible.  While they are being checked, they still
+        count against maxconnections.  Then the pool is refilled up to
+        mincached idle connections, but not beyond maxconnections.
+        The lock is not held while doing this, so requesting threads
+        will not be blocked.
+
+        Since connections are returned to the end of the queue, only
+        connections from its front need to be taken out and checked,
+        so the whole queue does not need to be scanned.
+
+        This is called periodically by the maintenance thread,
+        but you can also call it yourself.
+        """
+        # take out the idle connections which need to be checked
+        now = monotonic()
+        since = now - self._maintenance_interval
+        idle_timeout = self._idle_timeout
+        with self._lock, self._cache.mutex:
+            idle = self._cache.queue  # the oldest connections come first
+            num_idle = len(idle)
+            num_expired = num_stale = 0
+            if idle_timeout:
+                for con in idle:
+                    if num_idle - num_expired <= self._mincached or (
+                            not con._expired(
+                                idle_timeout=idle_timeout, now=now)):
+                        break
+                    num_expired += 1
+            for con in islice(idle, num_expired, None):
+                if con._last_used > since:
+                    break
+                num_stale += 1
+            num_stale += num_expired
+            if num_stale:
+                expired = list(islice(idle, num_expired))
+                stale = list(islice(idle, num_expired, num_stale))
+                fresh = list(islice(idle, num_stale, None))
+                idle.clear()
+                idle.extend(fresh)
+                # the connections being checked still hold their slots
+                self._connections += len(stale)
+            else:
+                expired = stale = []
+        # close surplus connections and check the others
+        for con in expired:
+            con.close()
+        checked = len(stale)
+        stale = [con for con in stale if self._refresh(con)]
+        if checked:
+            surplus = []
+            with self._lock, self._cache.mutex:
+                self._connections -= checked - len(stale)
+                waiters = self._waiters
+                while stale and waiters:  # hand the slots over
+                    waiters.popleft().grant(stale.pop())
+                self._connections -= len(stale)
+                while waiters and (  # the closed connections freed slots
+                        self._connections < self._maxconnections):
+                    self._connections += 1
+                    waiters.popleft().grant(None)
+                # these connections have not been used for the longest time
+                idle = self._cache.queue
+                maxcached = self._cache.maxsize
+                if maxcached > 0:
+                    room = max(maxcached - len(idle), 0)
+                    surplus = stale[room:]
+                    stale = stale[:room]
+                stale.extend(idle)
+                idle.clear()
+                idle.extend(stale)
+            for con in surplus:
+                con.close()
+        # refill the pool up to the minimum number of idle connections
+        while True:
+            with self._lock:
+                num_idle = self._cache.qsize()
+                if num_idle >= self._mincached or (
+                        self._maxconnections and self._connections + num_idle
+                        >= self._maxconnections):
+                    break
+            try:
+                con = self.steady_connection()
+            except Exception:  # database may be unavailable
+                break
+            with self._lock:
+                full = self._cache.full() or (
+                    self._maxconnections and self._connections
+                    + self._cache.qsize() >= self._maxconnections)
+                if not full:
+                    self._cache.put_nowait(con)
+            if full:
+                con.close()
+                break
+
+    def _refresh(self, con):
+        """Check an idle connection and reset it if necessary.
+
+        Returns whether the connection can still be used.
+        """
+        try:
+            if (con._maxusage and con._usage >= con._maxusage) or (
+                    self._max_lifetime and con._expired(self._max_lifetime)):
+                raise AttributeError  # usage limit reached or expired
+            self._stats.record().pings += 1
+            con._con.query('select 1')  # check the raw connection
+        except Exception:
+            con.reset()
+            try:
+                alive = con._con.db.status
+            except Exception:
+                alive = False
+            if not alive:
+                con.close()
+                return False
+        return True
+
+    def stats(self):
+        """Get statistics of the pool.
+
+        Returns a dict with the counters and histograms described in
+        the pool_stats module and the current number of idle connections
+        (idle) and connections that are in use or being opened (used).
+        """
+        stats = self._stats.snapshot()
+        with self._lock:
+            stats['idle'] = self._cache.qsize()
+            stats['used'] = self._connections
+        return stats
 
     def close(self):
-        """Close all connections in the pool."""
+        """Close all connections in the pool.
+
+        This also stops the maintenance thread if there is one.
+        """
+        if self._maintenance:
+            self._maintenance.stop()
         while 1:
             try:
                 con = self._cache.get_nowait()
                 with suppress(Exception):
                     con.close()
-                if self._connections:
-                    self._connections.release()
             except Empty:
                 break
 
@@ -259,10 +539,70 @@ class PooledPg:
             pass
 
 
-# Auxiliary class for pooled connections
+# Auxiliary classes for pooled connections
+
+class PooledPgMaintenance(Thread):
+    """Auxiliary thread for maintaining a pool in the background."""
+
+    def __init__(self, pool, interval):
+        """Create a maintenance thread.
+
+        pool: the corresponding PooledPg instance
+        interval: number of seconds between maintenance runs
+        """
+        super().__init__(name='PooledPgMaintenance', daemon=True)
+        # do not keep the pool alive just for maintaining it
+        self._pool = ref(pool)
+        self._interval = interval
+        self._stopped = Event()
+
+    def run(self):
+        """Maintain the pool until it has been closed or deleted."""
+        while not self._stopped.wait(self._interval):
+            pool = self._pool()
+            if pool is None:
+                break
+            with suppress(Exception):
+                pool.maintain()
+            del pool
+
+    def stop(self):
+        """Stop maintaining the pool."""
+        self._stopped.set()
+
+
+class PooledPgWaiter:
+    """Auxiliary class for threads waiting for a pooled connection."""
+
+    def __init__(self):
+        """Create a waiter for the current thread."""
+        self.con = None
+        self._lock = Lock()
+        self._lock.acquire()
+
+    def grant(self, con):
+        """Hand over a connection or a free slot to the waiter."""
+        self.con = con
+        self._lock.release()
+
+    def wait(self, timeout=None):
+        """Wait until a connection or free slot has been handed over.
+
+        Returns False if this did not happen within the given timeout.
+        """
+        if timeout is None:
+            return self._lock.acquire()
+        return self._lock.acquire(timeout=max(timeout, 0))
+
 
 class PooledPgConnection:
-    """Proxy class for pooled PostgreSQL connections."""
+    """Proxy class for pooled PostgreSQL connections.
+
+    The methods for queries and transactions are bound explicitly,
+    all other members of the underlying connection are proxied.
+    """
+
+    __slots__ = ('__weakref__', '_con', '_pool')
 
     def __init__(self, pool, con):
         """Create a pooled DB-API 2 connection.
@@ -291,8 +631,43 @@ class PooledPgConnection:
         else:
             self._con = self._pool.connection()
 
+    def query(self, *args, **kwargs):
+        """Execute a query using the pooled connection."""
+        con = self._con
+        if con:
+            return con.query(*args, **kwargs)
+        raise InvalidConnectionError
+
+    def begin(self, sql=None):
+        """Begin a transaction."""
+        con = self._con
+        if con:
+            return con.begin(sql)
+        raise InvalidConnectionError
+
+    def end(self, sql=None):
+        """Commit the current transaction."""
+        con = self._con
+        if con:
+            return con.end(sql)
+        raise InvalidConnectionError
+
+    def commit(self, sql=None):
+        """Commit the current transaction."""
+        con = self._con
+        if con:
+            return con.commit(sql)
+        raise InvalidConnectionError
+
+    def rollback(self, sql=None):
+        """Rollback the current transaction."""
+        con = self._con
+        if con:
+            return con.rollback(sql)
+        raise InvalidConnectionError
+
     def __getattr__(self, name):
-        """Proxy all members of the class."""
+        """Proxy all other members of the class."""
         if self._con:
             return getattr(self._con, name)
         raise InvalidConnectionError
@@ -0,0 +1,249 @@
+"""RoutingPooledDB - read/write split routing for DB-API 2 connections.
+
+Implements a pool of steady, thread-safe cached connections which routes
+read-only connections to the replicas of a database and all others to its
+primary, using two pools such as PooledDB or BalancedPooledDB instances.
+
+Connections are requested with connection(readonly=True) when they are only
+used for reading, which will then be taken from the pool of the replicas.
+All other connections are taken from the pool of the primary.  Calling
+begin() on a read-only connection pins it to the primary, i.e. its replica
+connection is returned and replaced with a connection to the primary before
+the transaction is started.  While a thread has a connection to the primary
+with an ongoing transaction, a read-only connection requested by the same
+thread will use the same connection, so that it sees the changes made in the
+transaction.  Calling begin() on such a read-only connection does nothing,
+since the transaction is already ongoing.  Optionally, read-only connections
+requested by a thread within a given time after it has used a connection to
+the primary will be taken from the primary as well, so that the thread can
+read its own writes even if the replicas are lagging behind.  If getting a
+connection from the replicas fails, the connection is taken from the primary
+instead.
+
+For the Python DB-API 2 specification, see:
+    https://www.python.org/dev/peps/pep-0249/
+For information on Webware for Python, see:
+    https://webwareforpython.github.io/w4py/
+
+
+Usage:
+
+First you need to set up the pools for the primary and for the replicas,
+and then you can create an instance of RoutingPooledDB, passing the
+following parameters:
+
+    primary: the pool for the primary database
+    replicas: the pool for the replicas of the database
+
+    The following parameter can only be passed as keyword argument:
+
+    read_your_writes: the number of seconds after the last use of
+        a connection to the primary by a thread in which read-only
+        connections requested by the same thread will also be taken
+        from the primary (the default of 0 means no such window)
+
+For instance, if you are using pgdb as your DB-API 2 database module:
+
+    import pgdb  # import used DB-API 2 module
+    from dbutils.pooled_db import PooledDB
+    from dbutils.balanced_pooled_db import BalancedPooledDB
+    from dbutils.routing_pooled_db import RoutingPooledDB
+    primary = PooledDB(pgdb, 5, host='primary', database='mydb')
+    replicas = BalancedPooledDB(
+        [{'host': 'replica1'}, {'host': 'replica2'}],
+        5, creator=pgdb, database='mydb')
+    pool = RoutingPooledDB(primary, replicas, read_your_writes=2)
+
+Then you can request connections for reading and for writing:
+
+    db = pool.connection(readonly=True)  # from the replicas
+    db = pool.connection()  # from the primary
+
+
+Copyright, credits and license:
+
+* Based on the PooledDB module contributed as supplement for
+  Webware for Python and PyGreSQL by Christoph Zwerschke in September 2005
+
+Licensed under the MIT license.
+"""
+
+from threading import Lock, local
+from time import monotonic
+from weakref import WeakSet
+
+from . import __version__
+
+__all__ = ['RoutingPooledDB', 'RoutingPooledDBConnection']
+
+
+class RoutingPooledDB:
+    """Pool routing DB-API 2 connections to the primary or the replicas.
+
+    After you have created the connection pool, you can use
+    connection() to get pooled, steady DB-API 2 connections.
+    """
+
+    version = __version__
+
+    def __init__(self, primary, replicas, *, read_your_writes=0):
+        """Set up the routing DB-API 2 connection pool.
+
+        primary: the pool for the primary database
+        replicas: the pool for the replicas of the database
+        read_your_writes: number of seconds after the last use of the
+            primary in which read-only connections also use the primary
+        """
+        self.primary = primary
+        self.replicas = replicas
+        self._read_your_writes = read_your_writes or 0
+        self._local = local()
+        self._reads_on_primary = 0  # read-only connections to the primary
+        self._lock = Lock()  # protects the counter
+
+    def _thread_state(self):
+        """Get the state of the current thread.
+
+        This is the set of its connections to the primary and
+        the time when it has last used a connection to the primary.
+        """
+        try:
+            return self._local.state
+        except AttributeError:
+            state = self._local.state = [WeakSet(), 0]
+            return state
+
+    def connection(self, shareable=True, timeout=None, readonly=False):
+        """Get a steady, cached DB-API 2 connection from the pool.
+
+        If readonly is set, the connection is taken from the replicas,
+        unless the current thread is in a transaction on the primary or
+        has used the primary recently.  All other connections are taken
+        from the primary.  The other parameters are passed to the pools.
+        """
+        state = self._thread_state()
+        if readonly:
+            for con in state[0]:
+                if con._transaction():
+                    # share the connection in the transaction
+                    self._read_on_primary()
+                    return RoutingPooledDBConnection(
+                        self, con._con, True, False)
+            window = self._read_your_writes
+            if not window or monotonic() - state[1] >= window:
+                try:
+                    con = self.replicas.connection(shareable, timeout)
+                except Exception:  # noqa: S110
+                    pass  # replicas not available, use the primary
+                else:
+                    return RoutingPooledDBConnection(self, con)
+            self._read_on_primary()
+        con = RoutingPooledDBConnection(
+            self, self._primary_connection(shareable, timeout), True)
+        state[0].add(con)
+        return con
+
+    def dedicated_connection(self, timeout=None, readonly=False):
+        """Alias for connection(shareable=False)."""
+        return self.connection(False, timeout, readonly)
+
+    def _primary_connection(self, shareable=True, timeout=None):
+        """Get a pooled connection to the primary."""
+        con = self.primary.connection(shareable, timeout)
+        self._used_primary()
+        return con
+
+    def _read_on_primary(self):
+        """Count a read-only connection taken from the primary."""
+        with self._lock:
+            self._reads_on_primary += 1
+
+    def _used_primary(self):
+        """Note that the current thread has used the primary."""
+        self._thread_state()[1] = monotonic()
+
+    def stats(self):
+        """Get statistics of the pool.
+
+        Returns a dict with the statistics of the primary and the replicas
+        and the number of read-only connections taken from the primary.
+        """
+        return {
+            'primary': self.primary.stats(),
+            'replicas': self.replicas.stats(),
+            'reads_on_primary': self._reads_on_primary,
+        }
+
+    def close(self):
+        """Close the pools of the primary and the replicas."""
+        self.primary.close()
+        self.replicas.close()
+
+
+class RoutingPooledDBConnection:
+    """Proxy for connections of a routing pool."""
+
+    def __init__(self, pool, con, primary=False, owner=True):
+        """Create a proxy for a connection of a routing pool.
+
+        pool: the corresponding RoutingPooledDB instance
+        con: the underlying pooled connection
+        primary: whether this is a connection to the primary
+        owner: whether closing the proxy shall close the connection
+            (the connection is not owned if it is shared with a
+            connection to the primary that is in a transaction)
+        """
+        self._pool = pool
+        self._con = con
+        self._primary = primary
+        self._owner = owner
+
+    @property
+    def primary(self):
+        """Check whether this is a connection to the primary."""
+        return self._primary
+
+    def _transaction(self):
+        """Check whether the connection is in a transaction."""
+        # only dedicated connections have the transaction flag
+        con = self._con and self._con._con
+        return bool(getattr(con, '_transaction', False))
+
+    def begin(self, *args, **kwargs):
+        """Begin a transaction, pinning the connection to the primary.
+
+        If the connection is shared with a connection to the primary that
+        is in a transaction, this does nothing, since the transaction of
+        the shared connection is already ongoing.
+        """
+        if not self._owner:
+            return None
+        if not self._primary:
+            pool = self._pool
+            con = pool._primary_connection(False)
+            self._con.close()  # return the connection to the replicas
+            self._con, self._primary = con, True
+            pool._thread_state()[0].add(self)
+        return self._con.begin(*args, **kwargs)
+
+    def close(self):
+        """Close the connection, returning it to its pool."""
+        con = self._con
+        if con:
+            self._con = None
+            if self._owner:
+                con.close()
+            if self._primary:
+                self._pool._used_primary()
+
+    def __getattr__(self, name):
+        """Proxy all members of the class."""
+        return getattr(self._con, name)
+
+    def __enter__(self):
+        """Enter a runtime context for the connection."""
+        return self
+
+    def __exit__(self, *exc):
+        """Exit a runtime context for the connection."""
+        self.close()
@@ -72,10 +72,15 @@ Copyright, credits and license:
 Licensed under the MIT license.
 """
 
+from functools import partial
+from queue import Empty
+
 from . import __version__
+from .pool_warmup import warm_up
 
 __all__ = [
     'PooledDB', 'PooledDBConnection', 'PooledDBError', 'NotSupportedError',
+    'TooManyConnectionsError',
 ]
 
 
@@ -87,6 +92,10 @@ class NotSupportedError(PooledDBError):
     """DB-API module not supported by PooledDB."""
 
 
+class TooManyConnectionsError(PooledDBError):
+    """No database connection became available in time."""
+
+
 class PooledDBConnection:
     """A proxy class for pooled database connections.
 
@@ -94,6 +103,8 @@ class PooledDBConnection:
     but use PooledDB to get new connections.
     """
 
+    __slots__ = ('__weakref__', '_con', '_pool')
+
     def __init__(self, pool, con):
         """Initialize pooled connection."""
         self._con = con
@@ -107,6 +118,18 @@ class PooledDBConnection:
             self._pool.returnConnection(self._con)
             self._con = None
 
+    def cursor(self, *args, **kwargs):
+        """Return a new cursor object using the connection."""
+        return self._con.cursor(*args, **kwargs)
+
+    def commit(self):
+        """Commit any pending transaction on the connection."""
+        return self._con.commit()
+
+    def rollback(self):
+        """Roll back to the start of any pending transaction."""
+        return self._con.rollback()
+
     def __getattr__(self, name):
         """Get the attribute with the given name."""
         # All other attributes are the same.
@@ -126,11 +149,21 @@ class PooledDB:
 
     version = __version__
 
-    def __init__(self, dbapi, maxconnections, *args, **kwargs):
+    def __init__(
+            self, dbapi, maxconnections, *args,
+            checkout_timeout=None, maxwaiters=None, warmup='parallel',
+            **kwargs):
         """Set up the database connection pool.
 
         dbapi: the DB-API 2 compliant module you want to use
         maxconnections: the number of connections cached in the pool
+        checkout_timeout: default number of seconds to wait for a connection
+            if the module is not threadsafe at the connection level
+            (None means waiting indefinitely, keyword argument only)
+        maxwaiters: maximum number of threads waiting for a connection
+            (0 or None means an arbitrary number, keyword argument only)
+        warmup: how the connections are opened ('parallel' = default,
+            'serial' or 'background', keyword argument only)
         args, kwargs: the parameters that shall be used to establish
             the database connections using connect()
         """
@@ -146,7 +179,12 @@ class PooledDB:
             # the pool using the synchronized queue class
             # that implements all the required locking semantics.
             from queue import Queue  # noqa: PLC0415
+            from threading import Lock  # noqa: PLC0415
             self._queue = Queue(maxconnections)  # create the queue
+            self._timeout = checkout_timeout
+            self._maxwaiters = maxwaiters or 0
+            self._lock = Lock()  # protects the number of waiting threads
+            self._waiters = 0
             self.connection = self._unthreadsafe_get_connection
             self.addConnection = self._unthreadsafe_add_connection
             self.returnConnection = self._unthreadsafe_return_connection
@@ -156,6 +194,7 @@ class PooledDB:
             # We only need a minimum of locking in this case.
             from threading import Lock  # noqa: PLC0415
             self._lock = Lock()  # create a lock object to be used later
+            self._timeout = checkout_timeout
             self._nextConnection = 0  # index of the next connection to be used
             self._connections = []  # the list of connections
             self.connection = self._threadsafe_get_connection
@@ -164,10 +203,11 @@ class PooledDB:
         else:
             raise NotSupportedError(
                 "Database module threading support cannot be determined.")
-        # Establish all database connections (it would be better to
-        # only establish a part of them now, and the rest on demand).
-        for _i in range(maxconnections):
-            self.addConnection(dbapi.connect(*args, **kwargs))
+        # Establish all database connections (in parallel by default,
+        # the event is set when all of them have been established).
+        self.ready = warm_up(
+            partial(dbapi.connect, *args, **kwargs), self.addConnection,
+            maxconnections, warmup)
 
     # The following functions are used with DB-API 2 modules
     # that do not have connection level threadsafety, like PyGreSQL.
@@ -175,9 +215,30 @@ class PooledDB:
     # Note: threadsafe/unthreadsafe refers to the DB-API 2 module,
     # not to this class which should be threadsafe in any case.
 
-    def _unthreadsafe_get_connection(self):
-        """Get a connection from the pool."""
-        return PooledDBConnection(self, self._queue.get())
+    def _unthreadsafe_get_connection(self, timeout=None):
+        """Get a connection from the pool.
+
+        The timeout specifies how many seconds to wait at most for a
+        connection (None means using the default timeout of the pool).
+        """
+        try:
+            con = self._queue.get_nowait()
+        except Empty:
+            if timeout is None:
+                timeout = self._timeout
+            with self._lock:
+                if self._maxwaiters and self._waiters >= self._maxwaiters:
+                    raise TooManyConnectionsError from None
+                self._waiters += 1
+            try:
+                con = self._queue.get(
+                    timeout=None if timeout is None else max(timeout, 0))
+            except Empty as error:
+                raise TooManyConnectionsError from error
+            finally:
+                with self._lock:
+                    self._waiters -= 1
+        return PooledDBConnection(self, con)
 
     def _unthreadsafe_add_connection(self, con):
         """Add a connection to the pool."""
@@ -198,8 +259,18 @@ class PooledDB:
     # Note: In this case, connections are shared between threads.
     # This may lead to problems if you use transactions.
 
-    def _threadsafe_get_connection(self):
-        """Get a connection from the pool."""
+    def _threadsafe_get_connection(self, timeout=None):
+        """Get a connection from the pool.
+
+        Since connections are shared, this only needs to wait if
+        no connection has been established yet during the warm-up.
+        """
+        if not self._connections:
+            if timeout is None:
+                timeout = self._timeout
+            self.ready.wait(None if timeout is None else max(timeout, 0))
+            if not self._connections:
+                raise TooManyConnectionsError
         with self._lock:
             next_con = self._nextConnection
             con = PooledDBConnection(self, self._connections[next_con])
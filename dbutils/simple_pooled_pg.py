@@ -67,9 +67,12 @@ Copyright, credits and license:
 Licensed under the MIT license.
 """
 
+from functools import partial
+
 from pg import DB as PgConnection  # noqa: N811
 
 from . import __version__
+from .pool_warmup import warm_up
 
 __all__ = ['PooledPg', 'PooledPgConnection']
 
@@ -81,6 +84,8 @@ class PooledPgConnection:
     but use PooledPg to get new connections.
     """
 
+    __slots__ = ('__weakref__', '_con', '_pool')
+
     def __init__(self, pool, con):
         """Initialize pooled connection."""
         self._con = con
@@ -94,6 +99,10 @@ class PooledPgConnection:
             self._pool.cache(self._con)
             self._con = None
 
+    def query(self, *args, **kwargs):
+        """Execute a query using the connection."""
+        return self._con.query(*args, **kwargs)
+
     def __getattr__(self, name):
         """Get the attribute with the given name."""
         # All other attributes are the same.
@@ -113,10 +122,12 @@ class PooledPg:
 
     version = __version__
 
-    def __init__(self, maxconnections, *args, **kwargs):
+    def __init__(self, maxconnections, *args, warmup='parallel', **kwargs):
         """Set up the PostgreSQL connection pool.
 
         maxconnections: the number of connections cached in the pool
+        warmup: how the connections are opened ('parallel' = default,
+            'serial' or 'background', keyword argument only)
         args, kwargs: the parameters that shall be used to establish
             the PostgreSQL connections using pg.connect()
         """
@@ -125,10 +136,11 @@ class PooledPg:
         # that implements all the required locking semantics.
         from queue import Queue  # noqa: PLC0415
         self._queue = Queue(maxconnections)
-        # Establish all database connections (it would be better to
-        # only establish a part of them now, and the rest on demand).
-        for _i in range(maxconnections):
-            self.cache(PgConnection(*args, **kwargs))
+        # Establish all database connections (in parallel by default,
+        # the event is set when all of them have been established).
+        self.ready = warm_up(
+            partial(PgConnection, *args, **kwargs), self.cache,
+            maxconnections, warmup)
 
     def cache(self, con):
         """Add or return a connection to the pool."""
@@ -71,11 +71,22 @@ without further notice.
     ...
     db.close()
 
+The executemany() method of the cursors takes an additional keyword
+argument chunksize.  When it is set, the parameters can be passed as any
+iterable, e.g. a generator, which is consumed in chunks of this size.  If the
+connection is in autocommit mode, you can also pass autocommit=True, so that
+only the failed chunk is executed again when the connection is lost:
+
+    cursor.executemany(
+        'insert into data values (%s, %s)', rows(), chunksize=1000)
+    print(cursor.executemany_stats['rows_per_second'])
+
+For scanning huge results, the rows can be fetched in batches with
+the stream() method of the cursors, e.g. "for row in cursor.stream(5000)".
+
 
 Ideas for improvement:
 
-* Alternatively to the maximum number of uses,
-  implement a maximum time to live for connections.
 * Optionally log usage and loss of connection.
 
 
@@ -90,7 +101,11 @@ Licensed under the MIT license.
 """
 
 import sys
+from collections import OrderedDict, deque
 from contextlib import suppress
+from itertools import islice
+from random import random
+from time import monotonic
 
 from . import __version__
 
@@ -106,6 +121,8 @@ class InvalidCursorError(SteadyDBError):
 # deprecated alias names for error classes
 InvalidCursor = InvalidCursorError
 
+_missing = object()  # marks attributes missing on the cursor of the driver
+
 
 def connect(
         creator, maxusage=None, setsession=None,
@@ -192,8 +209,16 @@ class SteadyDBConnection:
             raise TypeError("'failures' must be a tuple of exceptions.")
         self._failures = failures
         self._ping = ping if isinstance(ping, int) else 0
+        # do not ping if the connection has been used within this interval
+        self._ping_interval = 0
         self._closeable = closeable
         self._args, self._kwargs = args, kwargs
+        # random factor for spreading the expiry of the connections
+        self._jitter = random()  # noqa: S311
+        self._stats = None  # statistics of the pool using the connection
+        self._breaker = None  # circuit breaker of the pool
+        self._statements = None  # cache of prepared statements
+        self._cursor_cache = None  # cache of idle cursors for reuse
         self._store(self._create())
 
     def __enter__(self):
@@ -212,7 +237,11 @@ class SteadyDBConnection:
 
     def _create(self):
         """Create a new connection using the creator function."""
-        con = self._creator(*self._args, **self._kwargs)
+        breaker = self._breaker
+        if breaker is None:
+            con = self._creator(*self._args, **self._kwargs)
+        else:  # fail fast while the database is unavailable
+            con = breaker.call(self._creator, *self._args, **self._kwargs)
         try:
             try:
                 if self._dbapi.connect != self._creator:
@@ -306,10 +335,23 @@ class SteadyDBConnection:
 
     def _store(self, con):
         """Store a database connection for subsequent use."""
+        if self._stats:  # the connection has been reopened
+            self._stats.record().failovers += 1
+        if self._statements is not None:
+            # the statements have been prepared on the old connection
+            self._statements.clear()
+        if self._cursor_cache is not None:
+            # the cursors have been opened on the old connection
+            self._new_cursor_cache(self._cursor_cache.maxlen)
         self._con = con
         self._transaction = False
+        # whether cursors have been used since the last commit or
+        # rollback (the session preparation may also have done this)
+        self._dirty = bool(self._setsession_sql)
         self._closed = False
         self._usage = 0
+        # time of the creation and of the last database operation
+        self._created = self._last_used = monotonic()
 
     def _close(self):
         """Close the tough connection.
@@ -318,6 +360,10 @@ class SteadyDBConnection:
         and it will not complain if you close it more than once.
         """
         if not self._closed:
+            if self._statements is not None:
+                self._statements.clear()
+            if self._cursor_cache is not None:
+                self._new_cursor_cache(self._cursor_cache.maxlen)
             with suppress(Exception):
                 self._con.close()
             self._transaction = False
@@ -326,11 +372,33 @@ class SteadyDBConnection:
     def _reset(self, force=False):
         """Reset a tough connection.
 
-        Rollback if forced or the connection was in a transaction.
+        Rollback if the connection was in a transaction, or if forced and
+        cursors have been used since the last commit or rollback.
+        Returns whether a rollback has been issued.
         """
-        if not self._closed and (force or self._transaction):
+        if not self._closed and (
+                self._transaction or (force and self._dirty)):
             with suppress(Exception):
                 self.rollback()
+            return True
+        return False
+
+    def _expired(self, max_lifetime=None, idle_timeout=None, now=None):
+        """Check whether the connection has expired.
+
+        The connection has expired if it is older than max_lifetime
+        or has been idle for longer than idle_timeout seconds.  Both
+        limits are shortened by a random jitter of up to ten percent
+        that is fixed per connection, so that connections opened at
+        the same time do not all expire at the same time.
+        """
+        if now is None:
+            now = monotonic()
+        factor = 1 - 0.1 * self._jitter
+        return bool(
+            (max_lifetime and now - self._created > max_lifetime * factor)
+            or (idle_timeout
+                and now - self._last_used > idle_timeout * factor))
 
     def _ping_check(self, ping=1, reconnect=True):
         """Check whether the connection is still alive using ping().
@@ -338,8 +406,14 @@ class SteadyDBConnection:
         If the underlying connection is not active and the ping
         parameter is set accordingly, the connection will be recreated
         unless the connection is currently inside a transaction.
+
+        If a ping interval has been set and the connection has been
+        used successfully within this interval, it is trusted without
+        actually pinging it.
         """
-        if ping & self._ping:
+        if ping & self._ping and not (
+                self._ping_interval
+                and monotonic() - self._last_used < self._ping_interval):
             try:  # if possible, ping the connection
                 try:  # pass a reconnect=False flag if this is supported
                     alive = self._con.ping(False)
@@ -351,7 +425,11 @@ class SteadyDBConnection:
                 reconnect = False
             except Exception:
                 alive = False
+                if self._stats:
+                    self._stats.record().pings += 1
             else:
+                if self._stats:
+                    self._stats.record().pings += 1
                 if alive is None:
                     alive = True
                 if alive:
@@ -423,6 +501,7 @@ class SteadyDBConnection:
         self._transaction = False
         try:
             self._con.commit()
+            self._dirty = False
         except self._failures as error:  # cannot commit
             try:  # try to reopen the connection
                 con = self._create()
@@ -438,6 +517,7 @@ class SteadyDBConnection:
         self._transaction = False
         try:
             self._con.rollback()
+            self._dirty = False
         except self._failures as error:  # cannot rollback
             try:  # try to reopen the connection
                 con = self._create()
@@ -505,8 +585,86 @@ class SteadyDBConnection:
         return cursor
 
     def cursor(self, *args, **kwargs):
-        """Return a new Cursor Object using the connection."""
-        return SteadyDBCursor(self, *args, **kwargs)
+        """Return a new Cursor Object using the connection.
+
+        If the connection has a cursor cache, the cursor of the driver
+        underlying a cursor that has been closed is reused instead of
+        opening a new one, unless special arguments for creating the cursor
+        have been passed.  The closed cursor itself stays closed.
+        """
+        # any method of the cursor of the driver may start a transaction
+        self._dirty = True
+        cache = self._cursor_cache
+        if cache is None or args or kwargs:
+            return SteadyDBCursor(self, *args, **kwargs)
+        try:
+            cursor = cache.pop()
+        except IndexError:  # no idle cursor
+            cursor = SteadyDBCursor(self)
+        else:
+            self._ping_check(2)
+            if cache is not self._cursor_cache:  # connection reopened
+                with suppress(Exception):
+                    cursor.close()
+                return self.cursor()
+            cursor = SteadyDBCursor._reuse(self, cursor)
+        cursor._cache = self._cursor_cache
+        return cursor
+
+    def _new_cursor_cache(self, maxsize):
+        """Start with a new cursor cache, closing all idle cursors.
+
+        The new cache will hold up to maxsize idle cursors.  If maxsize
+        is zero or None, the connection will not have a cursor cache.
+        """
+        cache = self._cursor_cache
+        self._cursor_cache = deque(maxlen=maxsize) if maxsize else None
+        if cache:
+            for cursor in cache:
+                with suppress(Exception):
+                    cursor.close()
+
+    def prepare(self, operation):
+        """Return a cursor prepared for executing the given operation.
+
+        If the driver supports preparing statements with a prepare() method
+        of its cursors, the operation is prepared.  Otherwise, the cursor is
+        dedicated to the operation, so that the driver can optimize repeated
+        executions of the same operation as suggested by DB-API 2.
+
+        If the connection has a statement cache, closing the cursor puts it
+        back into the cache, and it will be returned again when the same
+        operation is prepared later, as long as it has not been evicted as
+        the least recently used one.  The cache is cleared when the
+        connection is reopened.
+        """
+        self._dirty = True
+        cache = self._statements
+        if cache is not None:
+            cursor = cache.checkout(operation)
+            if self._stats:
+                record = self._stats.record()
+                if cursor is None:
+                    record.statement_misses += 1
+                else:
+                    record.statement_hits += 1
+            if cursor is not None:
+                cursor._statement = (operation, cache.generation)
+                return cursor
+        cursor = SteadyDBCursor(self)
+        try:
+            prepare = cursor._cursor.prepare
+        except AttributeError:
+            pass  # preparing statements is not supported
+        else:
+            try:
+                prepare(operation)
+            except Exception:
+                cursor.close()
+                raise
+        if cache is not None:
+            cursor._statement = (operation, cache.generation)
+        return cursor
 
     def __del__(self):
         """Delete the steady connection."""
@@ -520,19 +678,43 @@ class SteadyDBConnection:
 class SteadyDBCursor:
     """A hardened version of DB-API 2 cursors."""
 
+    __slots__ = (
+        '__weakref__', '_args', '_cache', '_closed', '_con', '_cursor',
+        '_defaults', '_inputsizes', '_kwargs', '_outputsizes', '_statement',
+        'executemany_stats')
+
+    # the attributes that are not set on the underlying cursor
+    _own_attributes = frozenset(__slots__)
+
     def __init__(self, con, *args, **kwargs):
         """Create a "tough" DB-API 2 cursor."""
         # basic initialization to make finalizer work
         self._cursor = None
         self._closed = True
         # proper initialization of the cursor
-        self._con = con
-        self._args, self._kwargs = args, kwargs
-        self._clearsizes()
         try:
-            self._cursor = con._cursor(*args, **kwargs)
+            cursor = con._cursor(*args, **kwargs)
         except AttributeError as error:
             raise TypeError(f"{con!r} is not a SteadyDBConnection.") from error
+        self._setup(con, cursor, args, kwargs)
+
+    @classmethod
+    def _reuse(cls, con, cursor):
+        """Create a tough cursor for an idle cursor of the driver."""
+        self = cls.__new__(cls)
+        self._setup(con, cursor, (), {})
+        return self
+
+    def _setup(self, con, cursor, args, kwargs):
+        """Set up the tough cursor for the given cursor of the driver."""
+        self._statement = None  # operation and generation if cached
+        self._cache = None  # the cursor cache the cursor may return to
+        self._defaults = None  # default values of the changed attributes
+        self.executemany_stats = None  # set by executemany() with chunks
+        self._con = con
+        self._args, self._kwargs = args, kwargs
+        self._inputsizes, self._outputsizes = [], {}
+        self._cursor = cursor
         self._closed = False
 
     def __enter__(self):
@@ -544,13 +726,45 @@ class SteadyDBCursor:
         self.close()
 
     def __iter__(self):
-        """Make cursor compatible to the iteration protocol."""
+        """Make cursor compatible to the iteration protocol.
+
+        If the original cursor does not provide an iterator, the rows are
+        fetched with fetchmany() in batches of the arraysize of the cursor,
+        or with fetchone() if the arraysize is not bigger than one.
+        """
         cursor = self._cursor
         try:  # use iterator provided by original cursor
             return iter(cursor)
         except TypeError:  # create iterator if not provided
+            try:
+                size = cursor.arraysize
+                fetchmany = cursor.fetchmany
+            except AttributeError:
+                size = 1
+            if size > 1:
+                return self._iter_batches(fetchmany, size)
             return iter(cursor.fetchone, None)
 
+    def stream(self, batch_size=1000):
+        """Iterate over the rows, fetching them in batches of the given size.
+
+        Only one batch of rows is held in memory at a time, so that this
+        can be used for scanning results with a huge number of rows.
+        """
+        cursor = self._cursor
+        if not cursor:
+            raise InvalidCursorError
+        return self._iter_batches(cursor.fetchmany, batch_size)
+
+    @staticmethod
+    def _iter_batches(fetchmany, size):
+        """Yield the rows fetched in batches of the given size."""
+        while True:
+            rows = fetchmany(size)
+            if not rows:
+                break
+            yield from rows
+
     def setinputsizes(self, sizes):
         """Store input sizes in case cursor needs to be reopened."""
         self._inputsizes = sizes
@@ -561,8 +775,11 @@ class SteadyDBCursor:
 
     def _clearsizes(self):
         """Clear stored input and output sizes."""
-        self._inputsizes = []
-        self._outputsizes = {}
+        # avoid needless assignments, which are not cheap for this class
+        if self._inputsizes:
+            self._inputsizes = []
+        if self._outputsizes:
+            self._outputsizes = {}
 
     def _setsizes(self, cursor=None):
         """Set stored input and output sizes for cursor execution."""
@@ -580,110 +797,227 @@ class SteadyDBCursor:
         """Close the tough cursor.
 
         It will not complain if you close it more than once.
+        Cursors returned by prepare() are put back into the statement
+        cache of the connection instead of being closed if possible.
+        Otherwise, if the connection has a cursor cache, the cursor of the
+        driver is put back into the cache with its attributes reset, so that
+        it can be reused by cursor(), while this cursor becomes invalid.
         """
         if not self._closed:
+            statement = self._statement
+            if statement:
+                self._statement = None
+                cache = self._con._statements
+                if cache is not None and cache.checkin(self, *statement):
+                    return
+            self._closed = True
+            cache = self._cache
+            if cache is not None:
+                self._cache = None
+                if cache is self._con._cursor_cache and (
+                        len(cache) < cache.maxlen) and self._restore():
+                    cursor = self._cursor
+                    self._cursor = None
+                    cache.append(cursor)
+                    return
             with suppress(Exception):
                 self._cursor.close()
-            self._closed = True
+
+    def _restore(self):
+        """Reset the changed attributes of the underlying cursor.
+
+        Returns False if the default values could not be restored.
+        """
+        defaults = self._defaults
+        if defaults:
+            self._defaults = None
+            cursor = self._cursor
+            try:
+                for name, value in defaults.items():
+                    if value is _missing:
+                        delattr(cursor, name)
+                    else:
+                        setattr(cursor, name, value)
+            except Exception:
+                return False
+        return True
+
+    def _replace(self, cursor):
+        """Replace the underlying cursor with a reopened cursor."""
+        with suppress(Exception):
+            self._cursor.close()
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        """Execute an operation, reopening the cursor if necessary."""
+        return self._call_tough('execute', True, args, kwargs)
+
+    def executemany(
+            self, *args, chunksize=None, autocommit=False, **kwargs):
+        """Execute an operation for a sequence of parameters.
+
+        If a chunksize is given, the parameters can be passed as an arbitrary
+        iterable, which is consumed in chunks of this size that are executed
+        one after another.  The result of the last chunk is returned, and
+        the number of rows, chunks and seconds and the rows per second are
+        stored as a dict in the executemany_stats attribute of the cursor.
+
+        Since the chunks executed on a lost connection have been rolled back
+        by the database, the connection is only reopened and the failed chunk
+        executed again if this happens for the first chunk.  Otherwise, the
+        error is raised, unless you set autocommit to tell that every chunk
+        is committed immediately, so that only the failed chunk is lost.
+        """
+        if chunksize:
+            return self._executemany_chunks(
+                chunksize, autocommit, *args, **kwargs)
+        return self._call_tough('executemany', True, args, kwargs)
+
+    def _executemany_chunks(
+            self, chunksize, autocommit,
+            operation, seq_of_parameters, *args, **kwargs):
+        """Execute an operation for parameters consumed in chunks."""
+        parameters = iter(seq_of_parameters)
+        inputsizes, outputsizes = self._inputsizes, self._outputsizes
+        result = None
+        rows = chunks = 0
+        self.executemany_stats = None
+        start = monotonic()
+        while True:
+            chunk = list(islice(parameters, chunksize))
+            if not chunk:
+                break
+            # the stored sizes shall be set for every chunk
+            self._inputsizes, self._outputsizes = inputsizes, outputsizes
+            result = self._call_tough(
+                'executemany', True, (operation, chunk, *args), kwargs,
+                failover=autocommit or not chunks)
+            rows += len(chunk)
+            chunks += 1
+        self._clearsizes()
+        seconds = monotonic() - start
+        self.executemany_stats = {
+            'rows': rows, 'chunks': chunks, 'seconds': seconds,
+            'rows_per_second': rows / seconds if seconds else 0.0,
+        }
+        return result
+
+    def callproc(self, *args, **kwargs):
+        """Call a stored procedure, reopening the cursor if necessary."""
+        return self._call_tough('callproc', False, args, kwargs)
 
     def _get_tough_method(self, name):
         """Return a "tough" version of the given cursor method."""
+        execute = name.startswith('execute')
+
         def tough_method(*args, **kwargs):
-            execute = name.startswith('execute')
-            con = self._con
-            transaction = con._transaction
+            return self._call_tough(name, execute, args, kwargs)
+        return tough_method
+
+    def _call_tough(self, name, execute, args, kwargs, failover=True):
+        """Call a cursor method in a "tough" way.
+
+        If the method fails because the connection has been lost, the cursor
+        or the connection is reopened and the method is called again, unless
+        the connection is inside a transaction or failover is not set,
+        in which case the connection is treated like being in a transaction.
+        The execute flag tells whether stored input and output sizes shall
+        be set for the method.
+        """
+        if not self._cursor:
+            raise InvalidCursorError
+        con = self._con
+        con._dirty = True  # a rollback will be needed when reset
+        transaction = con._transaction or not failover
+        if not transaction:
+            con._ping_check(4)
+        try:
+            # check whether the connection has been used too often
+            if (con._maxusage and con._usage >= con._maxusage
+                    and not transaction):
+                raise con._failure
+            if execute:
+                self._setsizes()
+            method = getattr(self._cursor, name)
+            result = method(*args, **kwargs)  # try to execute
+            if execute:
+                self._clearsizes()
+        except con._failures as error:  # execution error
             if not transaction:
-                con._ping_check(4)
-            try:
-                # check whether the connection has been used too often
-                if (con._maxusage and con._usage >= con._maxusage
-                        and not transaction):
-                    raise con._failure
-                if execute:
-                    self._setsizes()
-                method = getattr(self._cursor, name)
-                result = method(*args, **kwargs)  # try to execute
-                if execute:
-                    self._clearsizes()
-            except con._failures as error:  # execution error
-                if not transaction:
-                    try:
-                        cursor2 = con._cursor(
-                            *self._args, **self._kwargs)  # open new cursor
-                    except Exception:  # noqa: S110
-                        pass
-                    else:
-                        try:  # and try one more time to execute
-                            if execute:
-                                self._setsizes(cursor2)
-                            method = getattr(cursor2, name)
-                            result = method(*args, **kwargs)
-                            if execute:
-                                self._clearsizes()
-                        except Exception:  # noqa: S110
-                            pass
-                        else:
-                            self.close()
-                            self._cursor = cursor2
-                            con._usage += 1
-                            return result
-                        with suppress(Exception):
-                            cursor2.close()
-                try:  # try to reopen the connection
-                    con2 = con._create()
+                try:
+                    cursor2 = con._cursor(
+                        *self._args, **self._kwargs)  # open new cursor
                 except Exception:  # noqa: S110
                     pass
                 else:
-                    try:
-                        cursor2 = con2.cursor(
-                            *self._args, **self._kwargs)  # open new cursor
+                    try:  # and try one more time to execute
+                        if execute:
+                            self._setsizes(cursor2)
+                        method = getattr(cursor2, name)
+                        result = method(*args, **kwargs)
+                        if execute:
+                            self._clearsizes()
                     except Exception:  # noqa: S110
                         pass
                     else:
-                        if transaction:
-                            self.close()
-                            con._close()
-                            con._store(con2)
-                            self._cursor = cursor2
-                            raise error  # raise the original error again
-                        error2 = None
-                        try:  # try one more time to execute
-                            if execute:
-                                self._setsizes(cursor2)
-                            method2 = getattr(cursor2, name)
-                            # if the following call hangs,
-                            # you may have forgotten to call begin()
-                            result = method2(*args, **kwargs)
-                            if execute:
-                                self._clearsizes()
-                        except error.__class__:  # same execution error
-                            use2 = False
-                            error2 = error
-                        except Exception as error:  # other execution errors
-                            use2 = True
-                            error2 = error
-                        else:
-                            use2 = True
-                        if use2:
-                            self.close()
-                            con._close()
-                            con._store(con2)
-                            self._cursor = cursor2
-                            con._usage += 1
-                            if error2:
-                                raise error2  # raise the other error
-                            return result
-                        with suppress(Exception):
-                            cursor2.close()
+                        self._replace(cursor2)
+                        con._usage += 1
+                        con._last_used = monotonic()
+                        return result
                     with suppress(Exception):
-                        con2.close()
-                if transaction:
-                    self._transaction = False
-                raise error  # re-raise the original error again
+                        cursor2.close()
+            try:  # try to reopen the connection
+                con2 = con._create()
+            except Exception:  # noqa: S110
+                pass
             else:
-                con._usage += 1
-                return result
-        return tough_method
+                try:
+                    cursor2 = con2.cursor(
+                        *self._args, **self._kwargs)  # open new cursor
+                except Exception:  # noqa: S110
+                    pass
+                else:
+                    if transaction:
+                        self._replace(cursor2)
+                        con._close()
+                        con._store(con2)
+                        raise error  # raise the original error again
+                    error2 = None
+                    try:  # try one more time to execute
+                        if execute:
+                            self._setsizes(cursor2)
+                        method2 = getattr(cursor2, name)
+                        # if the following call hangs,
+                        # you may have forgotten to call begin()
+                        result = method2(*args, **kwargs)
+                        if execute:
+                            self._clearsizes()
+                    except error.__class__:  # same execution error
+                        use2 = False
+                        error2 = error
+                    except Exception as error:  # other execution errors
+                        use2 = True
+                        error2 = error
+                    else:
+                        use2 = True
+                    if use2:
+                        self._replace(cursor2)
+                        con._close()
+                        con._store(con2)
+                        con._usage += 1
+                        con._last_used = monotonic()
+                        if error2:
+                            raise error2  # raise the other error
+                        return result
+                    with suppress(Exception):
+                        cursor2.close()
+                with suppress(Exception):
+                    con2.close()
+            raise error  # re-raise the original error again
+        else:
+            con._usage += 1
+            con._last_used = monotonic()
+            return result
 
     def __getattr__(self, name):
         """Inherit methods and attributes of underlying cursor."""
@@ -694,6 +1028,23 @@ class SteadyDBCursor:
             return getattr(self._cursor, name)
         raise InvalidCursorError
 
+    def __setattr__(self, name, value):
+        """Set attributes of the underlying cursor, like arraysize."""
+        if name in self._own_attributes:
+            object.__setattr__(self, name, value)
+        elif self._cursor:
+            cursor = self._cursor
+            if self._cache is not None:
+                # remember the default value for reusing the cursor
+                defaults = self._defaults
+                if defaults is None:
+                    self._defaults = defaults = {}
+                if name not in defaults:
+                    defaults[name] = getattr(cursor, name, _missing)
+            setattr(cursor, name, value)
+        else:
+            raise InvalidCursorError
+
     def __del__(self):
         """Delete the steady cursor."""
         # builtins (including Exceptions) might not exist anymore
@@ -701,3 +1052,76 @@ class SteadyDBCursor:
             self.close()  # make sure the cursor is closed
         except:  # noqa: E722, S110
             pass
+
+
+class SteadyDBStatementCache:
+    """LRU cache of the cursors prepared for a SteadyDB connection.
+
+    The cache only holds the idle cursors.  Cursors returned by prepare()
+    are taken out of the cache and put back when they are closed.
+    """
+
+    def __init__(self, maxsize):
+        """Create a cache holding up to maxsize prepared cursors."""
+        self.maxsize = maxsize
+        self.generation = 0  # increased when the cache is cleared
+        self.hits = self.misses = self.evictions = 0
+        self._cursors = OrderedDict()
+
+    def __len__(self):
+        """Get the number of idle cursors in the cache."""
+        return len(self._cursors)
+
+    def checkout(self, operation):
+        """Take the cursor prepared for the operation out of the cache.
+
+        Returns None if there is no idle cursor for the operation.
+        """
+        cursor = self._cursors.pop(operation, None)
+        if cursor is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cursor
+
+    def checkin(self, cursor, operation, generation):
+        """Put a cursor prepared for the operation back into the cache.
+
+        Returns False if the cursor has been prepared on a connection that
+        has since been reopened or if there is already an idle cursor for
+        the operation, so that the cursor cannot be put back.  If the cache
+        gets too big, the least recently used cursor is evicted.
+        """
+        cursors = self._cursors
+        if generation != self.generation or operation in cursors:
+            return False
+        cursors[operation] = cursor
+        if len(cursors) > self.maxsize:
+            with suppress(KeyError):
+                evicted = cursors.popitem(last=False)[1]
+                self.evictions += 1
+                evicted.close()
+        return True
+
+    def clear(self):
+        """Close all idle cursors and invalidate the cursors in use."""
+        self.generation += 1
+        cursors = list(self._cursors.values())
+        self._cursors.clear()
+        for cursor in cursors:
+            cursor.close()
+
+    def stats(self):
+        """Get statistics of the cache.
+
+        Returns a dict with the number of idle cursors (size), the maximum
+        size (maxsize), the number of hits, misses and evictions and the
+        ratio of hits to all lookups (hit_rate).
+        """
+        hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'size': len(self._cursors), 'maxsize': self.maxsize,
+            'hits': hits, 'misses': misses, 'evictions': self.evictions,
+            'hit_rate': hits / lookups if lookups else 0.0,
+        }
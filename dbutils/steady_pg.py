@@ -56,8 +56,6 @@ reset, without further notice.
 
 Ideas for improvement:
 
-* Alternatively to the maximum number of uses,
-  implement a maximum time to live for connections.
 * Optionally log usage and loss of connection.
 
 
@@ -70,6 +68,8 @@ Licensed under the MIT license.
 """
 
 from contextlib import suppress
+from random import random
+from time import monotonic
 
 from pg import DB as PgConnection  # noqa: N811
 
@@ -135,6 +135,11 @@ class SteadyPgConnection:
         self._closed = False
         self._setsession()
         self._usage = 0
+        # time of the creation and of the last database operation
+        self._created = self._last_used = monotonic()
+        # random factor for spreading the expiry of the connections
+        self._jitter = random()  # noqa: S311
+        self._stats = None  # statistics of the pool using the connection
 
     def __enter__(self):
         """Enter the runtime context. This will start a transaction."""
@@ -198,6 +203,7 @@ class SteadyPgConnection:
             self._closed = False
             self._setsession()
             self._usage = 0
+            self._created = self._last_used = monotonic()
 
     def reset(self):
         """Reset the tough connection.
@@ -210,6 +216,7 @@ class SteadyPgConnection:
             self._transaction = False
             self._setsession()
             self._usage = 0
+            self._created = self._last_used = monotonic()
         except Exception:
             try:
                 self.reopen()
@@ -217,6 +224,23 @@ class SteadyPgConnection:
                 with suppress(Exception):
                     self.rollback()
 
+    def _expired(self, max_lifetime=None, idle_timeout=None, now=None):
+        """Check whether the connection has expired.
+
+        The connection has expired if it is older than max_lifetime
+        or has been idle for longer than idle_timeout seconds.  Both
+        limits are shortened by a random jitter of up to ten percent
+        that is fixed per connection, so that connections opened at
+        the same time do not all expire at the same time.
+        """
+        if now is None:
+            now = monotonic()
+        factor = 1 - 0.1 * self._jitter
+        return bool(
+            (max_lifetime and now - self._created > max_lifetime * factor)
+            or (idle_timeout
+                and now - self._last_used > idle_timeout * factor))
+
     def begin(self, sql=None):
         """Begin a transaction."""
         self._transaction = True
@@ -258,6 +282,26 @@ class SteadyPgConnection:
         else:
             return rollback(sql=sql) if sql else rollback()
 
+    def query(self, *args, **kwargs):
+        """Execute a query, resetting the connection if necessary."""
+        return self._call_tough('query', args, kwargs)
+
+    def get(self, *args, **kwargs):
+        """Get a row from a table, resetting the connection if necessary."""
+        return self._call_tough('get', args, kwargs)
+
+    def insert(self, *args, **kwargs):
+        """Insert a row into a table, resetting the connection if necessary."""
+        return self._call_tough('insert', args, kwargs)
+
+    def update(self, *args, **kwargs):
+        """Update a row in a table, resetting the connection if necessary."""
+        return self._call_tough('update', args, kwargs)
+
+    def delete(self, *args, **kwargs):
+        """Delete a row from a table, resetting the connection if necessary."""
+        return self._call_tough('delete', args, kwargs)
+
     def _get_tough_method(self, method):
         """Return a "tough" version of a connection class method.
 
@@ -266,30 +310,47 @@ class SteadyPgConnection:
         if this is the case (for instance, the database has been restarted).
         """
         def tough_method(*args, **kwargs):
-            transaction = self._transaction
-            if not transaction:
-                try:
-                    # check whether connection status is bad
-                    # or the connection has been used too often
-                    if not self._con.db.status or (
-                            self._maxusage and self._usage >= self._maxusage):
-                        raise AttributeError
-                except Exception:
-                    self.reset()  # then reset the connection
-            try:
-                result = method(*args, **kwargs)  # try connection method
-            except Exception:  # error in query
-                if transaction:  # inside a transaction
-                    self._transaction = False
-                    raise  # propagate the error
-                if self._con.db.status:  # if it was not a connection problem
-                    raise  # then propagate the error
-                self.reset()  # reset the connection
-                result = method(*args, **kwargs)  # and try one more time
-            self._usage += 1
-            return result
+            return self._call_tough(method, args, kwargs)
         return tough_method
 
+    def _call_tough(self, method, args, kwargs):
+        """Call a connection method in a "tough" way.
+
+        The method can be given as a bound method or as a name that is
+        looked up on the underlying connection.  See _get_tough_method().
+        """
+        if isinstance(method, str):
+            if not self._con:
+                raise InvalidConnectionError
+            method = getattr(self._con, method)
+        transaction = self._transaction
+        if not transaction:
+            try:
+                # check whether connection status is bad
+                # or the connection has been used too often
+                if not self._con.db.status or (
+                        self._maxusage and self._usage >= self._maxusage):
+                    raise AttributeError
+            except Exception:
+                self.reset()  # then reset the connection
+                if self._stats:
+                    self._stats.record().failovers += 1
+        try:
+            result = method(*args, **kwargs)  # try connection method
+        except Exception:  # error in query
+            if transaction:  # inside a transaction
+                self._transaction = False
+                raise  # propagate the error
+            if self._con.db.status:  # if it was not a connection problem
+                raise  # then propagate the error
+            self.reset()  # reset the connection
+            if self._stats:
+                self._stats.record().failovers += 1
+            result = method(*args, **kwargs)  # and try one more time
+        self._usage += 1
+        self._last_used = monotonic()
+        return result
+
     def __getattr__(self, name):
         """Inherit the members of the standard connection class.
 
@@ -297,8 +358,7 @@ class SteadyPgConnection:
         """
         if self._con:
             attr = getattr(self._con, name)
-            if (name in ('query', 'get', 'insert', 'update', 'delete')
-                    or name.startswith('get_')):
+            if name.startswith('get_'):
                 attr = self._get_tough_method(attr)
             return attr
         raise InvalidConnectionError
@@ -0,0 +1,237 @@
+"""StripedPooledDB - striped pooling for DB-API 2 connections.
+
+Implements a pool of steady, thread-safe cached connections to a database
+which is divided into several stripes, i.e. sub-pools with their own lock,
+using an arbitrary DB-API 2 compliant database interface module.
+
+All threads requesting connections from PooledDB need to take the same
+lock.  If there are many threads requesting connections at the same time,
+particularly on free-threaded Python builds, the contention for this lock
+can dominate the time for getting a connection.  StripedPooledDB avoids
+this by assigning every thread to one of several stripes, which are
+ordinary PooledDB instances.  A thread first tries to get a connection
+from its own stripe.  If its stripe has no idle connections, the thread
+steals an idle connection from one of the other stripes.  Only if no
+stripe has idle connections, a new connection will be opened, again
+in the own stripe if possible, else in one of the other stripes.
+
+The limits set for the whole pool are divided among the stripes,
+so that the maximum numbers of connections are still enforced globally,
+without the need of a global lock.  Connections always return to the
+stripe they have been taken from.
+
+For the Python DB-API 2 specification, see:
+    https://www.python.org/dev/peps/pep-0249/
+For information on Webware for Python, see:
+    https://webwareforpython.github.io/w4py/
+
+
+Usage:
+
+StripedPooledDB takes the same parameters as PooledDB, which have the same
+meaning for the whole pool, and the following keyword-only parameter:
+
+    stripes: the number of stripes (the default is 4)
+        The number of stripes is reduced if necessary so that every
+        stripe gets at least one connection when maxcached, maxshared
+        or maxconnections are set.
+
+The limits mincached, maxcached, maxshared and maxconnections are divided
+among the stripes as evenly as possible.  All other parameters are passed
+on to the PooledDB instances used as stripes.  If a circuit breaker is
+requested with breaker=True, one circuit breaker is shared by all stripes.
+
+For instance, if you are using pgdb as your DB-API 2 database module and
+want a pool of at most 64 connections to your local database 'mydb',
+divided into eight stripes:
+
+    import pgdb  # import used DB-API 2 module
+    from dbutils.striped_pooled_db import StripedPooledDB
+    pool = StripedPooledDB(pgdb, maxconnections=64, stripes=8,
+        database='mydb')
+
+Once you have set up the connection pool you can request database
+connections from that pool in the same way as with PooledDB:
+
+    db = pool.connection()
+
+If the pool is blocking and no stripe can provide a connection, the thread
+waits for a connection of its own stripe.  Note that this means threads are
+only served in the order of their arrival among the threads of one stripe.
+
+The stats() method returns the sum of the statistics of all stripes.
+
+
+Copyright, credits and license:
+
+* Based on the PooledDB module contributed as supplement for
+  Webware for Python and PyGreSQL by Christoph Zwerschke in September 2005
+
+Licensed under the MIT license.
+"""
+
+from itertools import count
+from threading import Event, Thread, get_ident, local
+
+from . import __version__
+from .circuit_breaker import CircuitBreaker
+from .pool_stats import sum_stats
+from .pooled_db import PooledDB
+
+__all__ = ['StripedPooledDB']
+
+
+def divide(total, parts):
+    """Divide a total number into the given number of parts.
+
+    The parts differ by at most one, the larger ones come first.
+    """
+    quotient, remainder = divmod(total, parts)
+    return [quotient + (i < remainder) for i in range(parts)]
+
+
+class StripedPooledDB:
+    """Pool for DB-API 2 connections divided into several stripes.
+
+    After you have created the connection pool, you can use
+    connection() to get pooled, steady DB-API 2 connections.
+    """
+
+    version = __version__
+
+    def __init__(
+            self, creator, mincached=0, maxcached=0,
+            maxshared=0, maxconnections=0, blocking=False,
+            maxusage=None, setsession=None, reset=True,
+            failures=None, ping=1,
+            *args, stripes=4, **kwargs):
+        """Set up the striped DB-API 2 connection pool.
+
+        creator: either an arbitrary function returning new DB-API 2
+            connection objects or a DB-API 2 compliant database module
+        mincached: initial number of idle connections in the pool
+        maxcached: maximum number of idle connections in the pool
+        maxshared: maximum number of shared connections
+        maxconnections: maximum number of connections generally allowed
+        blocking: determines behavior when exceeding the maximum
+        maxusage: maximum number of reuses of a single connection
+        setsession: optional list of SQL commands that may serve to prepare
+            the session, e.g. ["set datestyle to ...", "set time zone ..."]
+        reset: how connections should be reset when returned to the pool
+        failures: an optional exception class or a tuple of exception classes
+            for which the connection failover mechanism shall be applied
+        ping: determines when the connection should be checked with ping()
+        stripes: the number of stripes the pool shall be divided into
+        args, kwargs: the parameters that shall be passed to the creator
+            function or the connection constructor of the DB-API 2 module
+            and the keyword-only parameters of PooledDB
+
+        See the PooledDB class for a more detailed description
+        of the parameters, which apply to the pool as a whole.
+        """
+        mincached = mincached or 0
+        maxcached = maxcached or 0
+        maxshared = maxshared or 0
+        maxconnections = maxconnections or 0
+        if maxcached:
+            maxcached = max(maxcached, mincached)
+        if maxconnections:
+            maxconnections = max(maxconnections, maxcached, maxshared)
+        # every stripe must get at least one connection, since
+        # a limit of zero would mean no limit for a stripe
+        stripes = max(stripes or 1, 1)
+        for limit in (maxcached, maxshared, maxconnections):
+            if limit:
+                stripes = min(stripes, limit)
+        if kwargs.get('breaker') is True:  # share one circuit breaker
+            kwargs['breaker'] = CircuitBreaker()
+        self._stripes = [
+            PooledDB(creator, *limits, blocking, maxusage, setsession,
+                     reset, failures, ping, *args, **kwargs)
+            for limits in zip(*(divide(limit, stripes) for limit in (
+                mincached, maxcached, maxshared, maxconnections)))]
+        self._next_stripe = count()
+        self._local = local()
+        readiness = [stripe.ready for stripe in self._stripes]
+        self.ready = Event()
+        if all(ready.is_set() for ready in readiness):
+            self.ready.set()
+        else:
+
+            def wait():
+                for ready in readiness:
+                    ready.wait()
+                self.ready.set()
+
+            Thread(target=wait, name='StripedPooledDBReady',
+                   daemon=True).start()
+
+    @property
+    def stripes(self):
+        """Get the PooledDB instances used as stripes."""
+        return tuple(self._stripes)
+
+    def _order(self):
+        """Get the stripes in the order they are tried by this thread.
+
+        The own stripe of the thread comes first.  Threads are assigned
+        to the stripes in a round-robin fashion when they first use them.
+        """
+        try:
+            return self._local.order
+        except AttributeError:
+            stripes = self._stripes
+            index = next(self._next_stripe) % len(stripes)
+            order = self._local.order = stripes[index:] + stripes[:index]
+            return order
+
+    def steady_connection(self):
+        """Get a steady, unpooled DB-API 2 connection."""
+        return self._stripes[0].steady_connection()
+
+    def connection(self, shareable=True, timeout=None):
+        """Get a steady, cached DB-API 2 connection from the pool.
+
+        The connection is taken from the stripe of the current thread
+        if possible, otherwise it is stolen from one of the other stripes.
+        If no stripe can provide a connection without waiting, then the
+        thread waits for a connection of its own stripe if the pool is
+        blocking and the timeout specifies how many seconds to wait at
+        most (None means using the default timeout set for the pool).
+        """
+        order = self._order()
+        # first try to get an idle connection from any stripe
+        ident = get_ident()
+        for stripe in order:
+            if stripe._idle_cache or (
+                    stripe._parked and ident in stripe._parked):
+                con = stripe._try_connection(shareable)
+                if con is not None:
+                    return con
+        # then try to open a new connection in any stripe
+        for stripe in order:
+            con = stripe._try_connection(shareable)
+            if con is not None:
+                return con
+        return order[0].connection(shareable, timeout)
+
+    def dedicated_connection(self, timeout=None):
+        """Alias for connection(shareable=False)."""
+        return self.connection(False, timeout)
+
+    def maintain(self):
+        """Maintain the idle connections in all stripes."""
+        for stripe in self._stripes:
+            stripe.maintain()
+
+    def stats(self):
+        """Get statistics of the pool.
+
+        Returns the sum of the statistics of all stripes.
+        """
+        return sum_stats(stripe.stats() for stripe in self._stripes)
+
+    def close(self):
+        """Close all connections in all stripes of the pool."""
+        for stripe in self._stripes:
+            stripe.close()
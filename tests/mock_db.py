@@ -1,6 +1,7 @@
 """This module serves as a mock object for the DB-API 2 module"""
 
 import sys
+from itertools import islice
 
 import pytest
 
@@ -62,6 +63,7 @@ class Connection:
         self.num_queries = 0
         self.num_pings = 0
         self.session = []
+        self.rows = []
         self.valid = True
 
     def close(self):
@@ -71,6 +73,7 @@ class Connection:
         self.num_uses = 0
         self.num_queries = 0
         self.session = []
+        self.rows = []
         self.valid = False
 
     def commit(self):
@@ -105,6 +108,9 @@ class Cursor:
         if name == 'error':
             raise OperationalError
         self.result = None
+        self.pending = iter(())
+        self.arraysize = 1
+        self.num_fetches = 0
         self.inputsizes = []
         self.outputsizes = {}
         con.open_cursors += 1
@@ -126,6 +132,9 @@ class Cursor:
         elif operation.startswith('set '):
             self.con.session.append(operation[4:])
             self.result = None
+        elif operation.startswith('rows '):
+            self.result = None
+            self.pending = iter(range(int(operation[5:])))
         elif operation == 'get sizes':
             self.result = (self.inputsizes, self.outputsizes)
             self.inputsizes = []
@@ -133,13 +142,38 @@ class Cursor:
         else:
             raise ProgrammingError
 
+    def executemany(self, operation, seq_of_parameters):
+        if not self.valid or not self.con.valid:
+            raise InternalError
+        self.con.num_uses += 1
+        if operation != 'insert':
+            raise ProgrammingError
+        self.con.rows.extend(seq_of_parameters)
+        self.result = None
+
     def fetchone(self):
         if not self.valid:
             raise InternalError
+        self.num_fetches += 1
+        row = next(self.pending, None)
+        if row is not None:
+            return row
         result = self.result
         self.result = None
         return result
 
+    def fetchmany(self, size=None):
+        if not self.valid:
+            raise InternalError
+        if size is None:
+            size = self.arraysize
+        self.num_fetches += 1
+        rows = list(islice(self.pending, size))
+        if self.result is not None and len(rows) < size:
+            rows.append(self.result)
+            self.result = None
+        return rows
+
     def callproc(self, procname):
         if not self.valid or not self.con.valid or not procname:
             raise InternalError
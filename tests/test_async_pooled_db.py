@@ -0,0 +1,364 @@
+"""Test the AsyncPooledDB module.
+
+Note:
+We don't test performance here, so the test does not predicate
+whether AsyncPooledDB actually will help in improving performance or not.
+We also assume that the underlying SteadyDB connections are tested.
+
+Copyright and credit info:
+
+* This test is based on the tests of the PooledDB module
+"""
+
+import asyncio
+from threading import Event, get_ident
+
+import pytest
+
+from dbutils.async_pooled_db import (
+    AsyncPooledDB,
+    AsyncPooledDBConnection,
+    AsyncPooledDBCursor,
+    InvalidConnectionError,
+    NotSupportedError,
+    TooManyConnectionsError,
+)
+from dbutils.steady_db import SteadyDBConnection
+
+from .mock_db import dbapi  # noqa: F401
+
+
+def test_version():
+    from dbutils import __version__, async_pooled_db
+    assert async_pooled_db.__version__ == __version__
+    assert AsyncPooledDB.version == __version__
+
+
+@pytest.mark.parametrize("threadsafety", [None, 0])
+def test_no_threadsafety(dbapi, threadsafety):  # noqa: F811
+    dbapi.threadsafety = threadsafety
+    with pytest.raises(NotSupportedError):
+        AsyncPooledDB(dbapi)
+
+
+def test_connection(dbapi):  # noqa: F811
+    pool = AsyncPooledDB(dbapi, 1)
+    assert len(pool._idle_cache) == 1
+    con = pool._idle_cache[0]
+    assert isinstance(con, SteadyDBConnection)
+
+    async def run():
+        db = await pool.connection()
+        assert isinstance(db, AsyncPooledDBConnection)
+        assert db._con is con
+        assert not pool._idle_cache
+        assert pool._connections == 1
+        cursor = await db.cursor()
+        assert isinstance(cursor, AsyncPooledDBCursor)
+        await cursor.execute('select test')
+        assert await cursor.fetchone() == 'test'
+        assert cursor.valid  # attributes are returned directly
+        await cursor.close()
+        assert await db.threadsafety() == 2
+        await db.close()
+        assert pool._idle_cache[0] is con
+        assert pool._connections == 0
+        with pytest.raises(InvalidConnectionError):
+            await db.cursor()
+        with pytest.raises(InvalidConnectionError):
+            await db.commit()
+        await db.close()
+        assert len(pool._idle_cache) == 1
+        db = await pool.dedicated_connection()
+        assert db._con is con
+        await db.close()
+
+    asyncio.run(run())
+    pool.close()
+    assert not pool._idle_cache
+    assert not con._con.valid
+
+
+def test_context_managers(dbapi):  # noqa: F811
+    pool = AsyncPooledDB(dbapi)
+
+    async def run():
+        async with pool.connection() as db:
+            assert pool._connections == 1
+            async with await db.cursor() as cursor:
+                await cursor.execute('select test')
+                assert await cursor.fetchone() == 'test'
+            assert not cursor._cursor.valid
+        assert pool._connections == 0
+        assert len(pool._idle_cache) == 1
+        async with await pool.connection() as db:
+            assert pool._connections == 1
+        assert pool._connections == 0
+        assert len(pool._idle_cache) == 1
+
+    asyncio.run(run())
+
+
+def test_executor(dbapi):  # noqa: F811
+    pool = AsyncPooledDB(dbapi, maxconnections=2)
+    assert pool._executor._max_workers == 2
+
+    async def run():
+        assert await pool.run(get_ident) != get_ident()
+        db = await pool.connection()
+        cursor = await db.cursor()
+        # the steady cursor is slotted, so patch the raw cursor
+        cursor._cursor._cursor.execute = lambda _sql: get_ident()
+        assert await cursor.execute('select test') != get_ident()
+        await db.close()
+
+    asyncio.run(run())
+    pool.close()
+    assert pool._executor._shutdown
+    pool = AsyncPooledDB(dbapi, max_workers=3)
+    executor = pool._executor
+    assert executor._max_workers == 3
+    shared_pool = AsyncPooledDB(dbapi, executor=executor)
+    assert shared_pool._executor is executor
+    shared_pool.close()
+    assert not executor._shutdown
+    pool.close()
+    assert executor._shutdown
+
+
+def test_failover(dbapi):  # noqa: F811
+    pool = AsyncPooledDB(dbapi, 1)
+
+    async def run():
+        db = await pool.connection()
+        con = db._con._con
+        con.close()  # the raw connection has been lost
+        cursor = await db.cursor()
+        await cursor.execute('select test')
+        assert await cursor.fetchone() == 'test'
+        assert db._con._con is not con
+        await db.close()
+
+    asyncio.run(run())
+
+
+def test_not_blocking(dbapi):  # noqa: F811
+    pool = AsyncPooledDB(dbapi, maxconnections=1)
+
+    async def run():
+        db = await pool.connection()
+        with pytest.raises(TooManyConnectionsError):
+            await pool.connection()
+        await db.close()
+        db = await pool.connection()
+        await db.close()
+
+    asyncio.run(run())
+
+
+def test_blocking(dbapi):  # noqa: F811
+    pool = AsyncPooledDB(dbapi, maxconnections=1, blocking=True)
+
+    async def run():
+        db = await pool.connection()
+        con = db._con
+        served = []
+
+        async def wait(n):
+            db = await pool.connection()
+            served.append(n)
+            assert db._con is con
+            await asyncio.sleep(0)
+            await db.close()
+
+        tasks = [asyncio.ensure_future(wait(n)) for n in range(3)]
+        await asyncio.sleep(0)
+        # waiting tasks only have a future, they do not use a thread
+        assert len(pool._waiters) == 3
+        assert pool._connections == 1
+        assert not served
+        await db.close()
+        await asyncio.gather(*tasks)
+        assert served == [0, 1, 2]
+        assert not pool._waiters
+        assert pool._connections == 0
+        assert list(pool._idle_cache) == [con]
+
+    asyncio.run(run())
+
+
+def test_checkout_timeout(dbapi):  # noqa: F811
+    pool = AsyncPooledDB(
+        dbapi, maxconnections=1, blocking=True, checkout_timeout=0.01)
+
+    async def run():
+        db = await pool.connection()
+        with pytest.raises(TooManyConnectionsError):
+            await pool.connection()
+        assert not pool._waiters
+        with pytest.raises(TooManyConnectionsError):
+            await pool.connection(timeout=0)
+        assert not pool._waiters
+        task = asyncio.ensure_future(pool.connection(timeout=1))
+        await asyncio.sleep(0)
+        assert len(pool._waiters) == 1
+        await db.close()
+        db = await task
+        assert pool._connections == 1
+        await db.close()
+        assert pool._connections == 0
+
+    asyncio.run(run())
+
+
+def test_cancel_waiting(dbapi):  # noqa: F811
+    pool = AsyncPooledDB(dbapi, maxconnections=1, blocking=True)
+
+    async def run():
+        db = await pool.connection()
+        task = asyncio.ensure_future(pool.connection())
+        await asyncio.sleep(0)
+        assert len(pool._waiters) == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert not pool._waiters
+        task = asyncio.ensure_future(pool.connection())
+        await asyncio.sleep(0)
+        await db.close()  # hand over the connection
+        task.cancel()  # but cancel before the task got it
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert not pool._waiters
+        assert pool._connections == 0
+        assert len(pool._idle_cache) == 1
+        db = await pool.connection()
+        await db.close()
+
+    asyncio.run(run())
+
+
+def test_cancel_connecting(dbapi):  # noqa: F811
+    connecting, proceed = Event(), Event()
+    cons = []
+
+    def creator():
+        connecting.set()
+        proceed.wait(5)
+        return dbapi.connect()
+
+    pool = AsyncPooledDB(creator)
+    steady_connection = pool.steady_connection
+
+    def opened_connection():
+        con = steady_connection()
+        cons.append(con)  # keep a reference to the connection
+        return con
+
+    pool.steady_connection = opened_connection
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        task = asyncio.ensure_future(pool.connection())
+        await loop.run_in_executor(None, connecting.wait, 5)
+        task.cancel()  # cancel while the connection is being opened
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert pool._connections == 0
+        assert not cons
+        proceed.set()
+        for _i in range(100):
+            if cons and cons[0]._closed:
+                break
+            await asyncio.sleep(0.01)
+        # the connection that has been opened too late has been closed
+        assert len(cons) == 1
+        assert cons[0]._closed
+        assert not pool._idle_cache
+        assert pool._connections == 0
+
+    asyncio.run(run())
+    pool.close()
+
+
+def test_checkout_is_not_a_coroutine(dbapi):  # noqa: F811
+    pool = AsyncPooledDB(dbapi)
+
+    async def run():
+        checkout = pool.connection()
+        with pytest.raises(TypeError):
+            asyncio.create_task(checkout)  # noqa: RUF006
+        task = asyncio.ensure_future(checkout)
+        db = await task
+        assert isinstance(db, AsyncPooledDBConnection)
+        await db.close()
+
+    asyncio.run(run())
+    pool.close()
+
+
+def test_maxwaiters(dbapi):  # noqa: F811
+    pool = AsyncPooledDB(
+        dbapi, maxconnections=1, blocking=True, maxwaiters=1)
+
+    async def run():
+        db = await pool.connection()
+        task = asyncio.ensure_future(pool.connection())
+        await asyncio.sleep(0)
+        with pytest.raises(TooManyConnectionsError):
+            await pool.connection()
+        await db.close()
+        db = await task
+        await db.close()
+
+    asyncio.run(run())
+
+
+def test_maxcached(dbapi):  # noqa: F811
+    pool = AsyncPooledDB(dbapi, 1, 2)
+
+    async def run():
+        cache = [await pool.connection() for _i in range(3)]
+        assert pool._connections == 3
+        for db in cache:
+            await db.close()
+        assert len(pool._idle_cache) == 2
+
+    asyncio.run(run())
+
+
+def test_reset(dbapi):  # noqa: F811
+    pool = AsyncPooledDB(dbapi, 1, reset=False)
+
+    async def run():
+        db = await pool.connection()
+        con = db._con
+        await db.begin()
+        assert con._transaction
+        await db.close()
+        assert not con._transaction
+        assert con._con.session == ['rollback']
+
+    asyncio.run(run())
+
+
+def test_garbage_collected_connection(dbapi):  # noqa: F811
+    pool = AsyncPooledDB(dbapi, 1)
+
+    async def run():
+        db = await pool.connection()
+        assert not pool._idle_cache
+        del db
+        for _i in range(10):
+            if pool._idle_cache:
+                break
+            await asyncio.sleep(0.01)
+        assert len(pool._idle_cache) == 1
+        assert pool._connections == 0
+        for _i in range(10):
+            if not pool._tasks:
+                break
+            await asyncio.sleep(0.01)
+        assert not pool._tasks  # the task has been dropped when done
+
+    asyncio.run(run())
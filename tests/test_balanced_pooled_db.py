@@ -0,0 +1,236 @@
+"""Test the BalancedPooledDB module.
+
+Note:
+We don't test performance here, so the test does not predicate
+whether BalancedPooledDB actually will help in improving performance or not.
+We also assume that the underlying PooledDB pools are tested.
+
+Copyright and credit info:
+
+* This test is based on the tests of the PooledDB module
+"""
+
+from time import monotonic
+
+import pytest
+
+from dbutils.balanced_pooled_db import BalancedPooledDB, BalancedPooledDBHost
+from dbutils.pooled_db import PooledDB, TooManyConnectionsError
+
+from .mock_db import dbapi  # noqa: F401
+
+
+def test_version():
+    from dbutils import __version__, balanced_pooled_db
+    assert balanced_pooled_db.__version__ == __version__
+    assert BalancedPooledDB.version == __version__
+
+
+def test_create_pool(dbapi):  # noqa: F811
+
+    def creator(user=None):
+        return dbapi.connect('creator', user)
+
+    creator.dbapi = dbapi
+    pool = BalancedPooledDB(
+        [{'database': 'host1'}, {'database': 'host2'}, creator],
+        1, creator=dbapi, user='test')
+    hosts = pool.hosts
+    assert len(hosts) == 3
+    for host in hosts:
+        assert isinstance(host, BalancedPooledDBHost)
+        assert isinstance(host.pool, PooledDB)
+        assert len(host.pool._idle_cache) == 1
+    assert [host.pool._idle_cache[0]._con.database for host in hosts] == [
+        'host1', 'host2', 'creator']
+    assert hosts[0].pool._idle_cache[0]._con.user == 'test'
+    with pytest.raises(ValueError, match="No hosts"):
+        BalancedPooledDB([])
+    with pytest.raises(ValueError, match="'balance' must be"):
+        BalancedPooledDB([dbapi], balance='random')
+    with pytest.raises(ValueError, match="A creator is needed"):
+        BalancedPooledDB([{'database': 'host1'}])
+
+
+def test_least_outstanding_connections(dbapi):  # noqa: F811
+    pool = BalancedPooledDB(
+        [{'database': 'host1'}, {'database': 'host2'}], creator=dbapi)
+    dbs = [pool.connection() for _i in range(4)]
+    assert [host.outstanding for host in pool.hosts] == [2, 2]
+    databases = [db._con._con.database for db in dbs]
+    assert databases.count('host1') == databases.count('host2') == 2
+    dbs[0].close()
+    dbs[1].close()
+    dbs[2].close()
+    outstanding = [host.outstanding for host in pool.hosts]
+    assert sorted(outstanding) == [0, 1]
+    db = pool.connection()
+    assert [host.outstanding for host in pool.hosts] == [1, 1]
+    assert db._con._con.database == (
+        'host1' if outstanding[0] == 0 else 'host2')
+
+
+def test_lowest_latency(dbapi):  # noqa: F811
+    pool = BalancedPooledDB(
+        [{'database': 'host1'}, {'database': 'host2'}],
+        creator=dbapi, balance='latency')
+    host1, host2 = pool.hosts
+    host1.latency, host2.latency = 0.5, 0.1
+    for _i in range(3):
+        db = pool.connection()
+        assert db._con._con.database == 'host2'
+        db.close()
+    assert host2.latency < 0.1
+    assert host1.latency == 0.5
+
+
+def test_per_host_budget(dbapi):  # noqa: F811
+    pool = BalancedPooledDB(
+        [{'database': 'host1'}, {'database': 'host2'}], 0, 0, 0, 1,
+        creator=dbapi)
+    db1 = pool.connection()
+    db2 = pool.connection()
+    assert {db1._con._con.database, db2._con._con.database} == {
+        'host1', 'host2'}
+    with pytest.raises(TooManyConnectionsError):
+        pool.connection()
+    database = db1._con._con.database
+    db1.close()
+    db3 = pool.connection()
+    assert db3._con._con.database == database
+    assert [host.outstanding for host in pool.hosts] == [1, 1]
+
+
+def test_drop_failing_host(dbapi):  # noqa: F811
+    pool = BalancedPooledDB(
+        [{'database': 'error'}, {'database': 'host2'}],
+        creator=dbapi, retry_interval=60)
+    failing, working = pool.hosts
+    for _i in range(4):
+        db = pool.connection()
+        assert db._con._con.database == 'host2'
+        db.close()
+    assert failing.failures == 1
+    assert failing.down()
+    assert not working.down()
+    stats = pool.stats()
+    assert stats['checkouts'] == 4
+    assert [host['down'] for host in stats['hosts']] == [True, False]
+    assert [host['failures'] for host in stats['hosts']] == [1, 0]
+    failing.down_until = monotonic() - 1  # back in rotation
+    assert not failing.down()
+    pool.connection().close()
+    pool.connection().close()
+    assert failing.failures == 2
+
+
+def test_drop_host_with_dead_idle_connections(dbapi):  # noqa: F811
+    down = set()
+
+    def connect(database):
+        def creator():
+            if database in down:
+                raise dbapi.OperationalError
+            return dbapi.connect(database)
+        creator.dbapi = dbapi
+        return creator
+
+    dbapi.Connection.has_ping = True
+    try:
+        pool = BalancedPooledDB(
+            [connect('host1'), connect('host2')], 1, retry_interval=60)
+        failing, working = pool.hosts
+        idle = failing.pool._idle_cache[0]
+        down.add('host1')  # the host dies while it has an idle connection
+        idle._con.close()
+        for _i in range(4):
+            db = pool.connection()
+            assert db._con._con.database == 'host2'
+            db.close()
+        assert failing.failures == 1
+        assert failing.down()
+        assert not working.down()
+        # the dead connection has been closed and its slot released
+        assert idle._closed
+        assert not failing.pool._idle_cache
+        assert failing.outstanding == 0
+    finally:
+        dbapi.Connection.has_ping = False
+
+
+def test_skip_down_host_while_up_host_is_busy(dbapi):  # noqa: F811
+    connects = []
+
+    def connect(database):
+        def creator():
+            connects.append(database)
+            return dbapi.connect(database)
+        creator.dbapi = dbapi
+        return creator
+
+    pool = BalancedPooledDB(
+        [connect('host1'), connect('host2')], 0, 0, 0, 1, retry_interval=60)
+    working, failing = pool.hosts
+    failing.down_until = monotonic() + 60  # out of rotation
+    db = pool.connection(False)  # saturates the working host
+    assert db._con._con.database == 'host1'
+    with pytest.raises(TooManyConnectionsError):
+        pool.connection(False)
+    assert connects == ['host1']  # no new connection to the failing host
+    assert failing.down()
+    working.down_until = monotonic() + 120  # now no host is up
+    db2 = pool.connection(False)  # so the other host is tried
+    assert db2._con._con.database == 'host2'
+    assert connects == ['host1', 'host2']
+    assert not failing.down()
+
+
+def test_discard_dead_shared_connection(dbapi):  # noqa: F811
+    down = set()
+
+    def connect(database):
+        def creator():
+            if database in down:
+                raise dbapi.OperationalError
+            return dbapi.connect(database)
+        creator.dbapi = dbapi
+        creator.threadsafety = 2
+        return creator
+
+    dbapi.Connection.has_ping = True
+    try:
+        pool = BalancedPooledDB(
+            [connect('host1'), connect('host2')], 0, 0, 1, 1,
+            balance='latency', retry_interval=60)
+        failing, working = pool.hosts
+        working.latency = 1  # prefer the failing host
+        db = pool.connection()
+        assert db._con._con.database == 'host1'
+        shared = failing.pool._shared_cache[0]
+        down.add('host1')  # the host dies while its connection is shared
+        shared.con._con.close()
+        db2 = pool.connection()
+        assert db2._con._con.database == 'host2'
+        assert failing.down()
+        # the dead connection is not shared or cached any more
+        assert shared.con._closed
+        assert not failing.pool._shared_cache
+        assert failing.pool._connections == 1  # still used by db
+        db.close()
+        assert not failing.pool._idle_cache
+        assert failing.outstanding == 0
+        assert failing.pool._connections == 0
+    finally:
+        dbapi.Connection.has_ping = False
+
+
+def test_all_hosts_failing(dbapi):  # noqa: F811
+    pool = BalancedPooledDB(
+        [{'database': 'error'}, {'database': 'error'}], creator=dbapi)
+    with pytest.raises(dbapi.OperationalError):
+        pool.connection()
+    assert all(host.down() for host in pool.hosts)
+    with pytest.raises(dbapi.OperationalError):
+        pool.connection()  # failing hosts are tried anyway
+    assert [host.failures for host in pool.hosts] == [2, 2]
+    pool.close()
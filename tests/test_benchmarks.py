@@ -0,0 +1,64 @@
+"""Test the DBUtils benchmarks.
+
+Note:
+This only checks that the benchmarks can be run and produce results,
+it does not check the performance of DBUtils.
+"""
+
+import json
+
+import pytest
+
+from benchmarks.__main__ import main
+from benchmarks.fake_db import FakeDB
+from benchmarks.pool_benchmarks import PG_POOLS, POOLS
+
+
+def test_fake_db():
+    db = FakeDB()
+    con = db.connect()
+    cursor = con.cursor()
+    cursor.execute('select test')
+    assert cursor.fetchone() == 'test'
+    db.restart(1)
+    assert db.down()
+    with pytest.raises(db.OperationalError):
+        cursor.execute('select test')
+    with pytest.raises(db.OperationalError):
+        db.connect()
+
+
+def test_run_benchmarks(tmp_path):
+    output = tmp_path / 'results.json'
+    main(['--iterations', '10', '--duration', '0.01', '--threads', '1,2',
+          '--rows', '100', '--chunksize', '10',
+          '--downtime', '0.01', '--output', str(output)])
+    results = json.loads(output.read_text())
+    pools = {*POOLS, *PG_POOLS}
+    assert set(results['checkout']) == pools
+    assert set(results['throughput']) == pools
+    for name in pools:
+        assert results['checkout'][name]['p99_us'] > 0
+        assert [r['threads'] for r in results['throughput'][name]] == [1, 2]
+    assert results['execute']['steady_cursor_us'] > 0
+    assert set(results['proxy']) == pools
+    for proxy in results['proxy'].values():
+        assert proxy['proxy_us'] > 0
+        assert proxy['bytes_per_checkout'] >= 0
+    executemany = results['executemany']
+    assert executemany['rows'] == 100
+    for mode in ('list', 'chunked'):
+        assert executemany[mode]['rows_per_second'] > 0
+    for rows_per_second in results['fetch'].values():
+        assert rows_per_second > 0
+    for storm in results['storm'].values():
+        assert storm['recovered_threads'] == 2
+
+
+def test_unknown_names(capsys):
+    with pytest.raises(SystemExit):
+        main(['checkout', 'unknown'])
+    assert 'unknown benchmark: unknown' in capsys.readouterr().err
+    with pytest.raises(SystemExit):
+        main(['--pools', 'unknown'])
+    assert 'unknown pool: unknown' in capsys.readouterr().err
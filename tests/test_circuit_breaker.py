@@ -0,0 +1,140 @@
+"""Test the CircuitBreaker module.
+
+Copyright and credit info:
+
+* This test is based on the tests of the PooledDB module
+"""
+
+from threading import Event, Thread
+from time import monotonic
+
+import pytest
+
+from dbutils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def fail():
+    raise ValueError('no connection')
+
+
+def test_closed():
+    breaker = CircuitBreaker()
+    assert breaker.state == 'closed'
+    assert breaker.call(lambda x, y=0: x + y, 1, y=2) == 3
+    assert breaker.stats() == {
+        'state': 'closed', 'failures': 0, 'opened': 0, 'rejected': 0}
+
+
+def test_threshold():
+    breaker = CircuitBreaker(threshold=3, backoff=10)
+    for failures in range(1, 3):
+        with pytest.raises(ValueError, match='no connection'):
+            breaker.call(fail)
+        assert breaker.state == 'closed'
+        assert breaker.stats()['failures'] == failures
+    breaker.call(object)  # success resets the failures
+    assert breaker.stats()['failures'] == 0
+    for _i in range(3):
+        with pytest.raises(ValueError, match='no connection'):
+            breaker.call(fail)
+    assert breaker.state == 'open'
+    calls = []
+    for _i in range(5):
+        with pytest.raises(CircuitOpenError):
+            breaker.call(calls.append, 1)
+    assert calls == []
+    stats = breaker.stats()
+    assert stats == {
+        'state': 'open', 'failures': 3, 'opened': 1, 'rejected': 5}
+
+
+def test_probe_succeeds():
+    breaker = CircuitBreaker(threshold=1, backoff=0)
+    with pytest.raises(ValueError, match='no connection'):
+        breaker.call(fail)
+    assert breaker.state == 'half-open'
+    assert breaker.call(object) is not None
+    assert breaker.state == 'closed'
+    assert breaker.stats()['failures'] == 0
+
+
+def test_probe_fails():
+    breaker = CircuitBreaker(threshold=1, backoff=0)
+    with pytest.raises(ValueError, match='no connection'):
+        breaker.call(fail)
+    assert breaker.state == 'half-open'
+    with pytest.raises(ValueError, match='no connection'):
+        breaker.call(fail)
+    assert breaker.stats()['opened'] == 2
+    assert breaker.state == 'half-open'
+    breaker.call(object)
+    assert breaker.state == 'closed'
+
+
+def test_probe_interrupted():
+    breaker = CircuitBreaker(threshold=1, backoff=0)
+    with pytest.raises(ValueError, match='no connection'):
+        breaker.call(fail)
+
+    def interrupt():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        breaker.call(interrupt)
+    assert not breaker._probing
+    assert breaker.stats()['opened'] == 1
+    assert breaker.call(object) is not None
+    assert breaker.state == 'closed'
+
+
+def test_only_one_probe():
+    breaker = CircuitBreaker(threshold=1, backoff=0)
+    with pytest.raises(ValueError, match='no connection'):
+        breaker.call(fail)
+    probing, done = Event(), Event()
+
+    def probe():
+        probing.set()
+        done.wait(1)
+        return 'probe'
+
+    results = []
+    thread = Thread(target=lambda: results.append(breaker.call(probe)))
+    thread.start()
+    assert probing.wait(1)
+    assert breaker.state == 'half-open'
+    with pytest.raises(CircuitOpenError):
+        breaker.call(object)
+    done.set()
+    thread.join()
+    assert results == ['probe']
+    assert breaker.state == 'closed'
+    assert breaker.stats()['rejected'] == 1
+
+
+def test_backoff():
+    breaker = CircuitBreaker(threshold=1, backoff=1, max_backoff=4)
+    for backoff in (1, 2, 4, 4, 4):
+        start = monotonic()
+        with pytest.raises(ValueError, match='no connection'):
+            breaker.call(fail)
+        delay = breaker._open_until - start
+        # the jitter spreads the backoff between one half and the full time
+        assert backoff / 2 - 0.1 <= delay <= backoff + 0.1
+        assert breaker.state == 'open'
+        breaker._open_until = monotonic()  # skip the backoff time
+    breaker.call(object)
+    start = monotonic()
+    with pytest.raises(ValueError, match='no connection'):
+        breaker.call(fail)
+    assert breaker._open_until - start <= 1.1  # backoff has been reset
+
+
+def test_reset():
+    breaker = CircuitBreaker(threshold=1, backoff=10)
+    with pytest.raises(ValueError, match='no connection'):
+        breaker.call(fail)
+    assert breaker.state == 'open'
+    breaker.reset()
+    assert breaker.state == 'closed'
+    assert breaker.call(object) is not None
@@ -12,9 +12,11 @@ Copyright and credit info:
 
 from queue import Empty, Queue
 from threading import Thread
+from time import monotonic
 
 import pytest
 
+from dbutils.circuit_breaker import CircuitBreaker
 from dbutils.persistent_db import NotSupportedError, PersistentDB, local
 
 from .mock_db import dbapi  # noqa: F401
@@ -260,3 +262,110 @@ def test_context_manager(dbapi):  # noqa: F811
             cursor.execute('select test')
             r = cursor.fetchone()
         assert r == 'test'
+
+
+def test_max_lifetime_and_idle_timeout(dbapi):  # noqa: F811
+    persist = PersistentDB(dbapi, max_lifetime=10, idle_timeout=5)
+    db = persist.connection()
+    raw_con = db._con
+    assert persist.connection() is db
+    assert db._con is raw_con
+    db._created -= 20  # this connection has expired now
+    assert persist.connection() is db
+    assert db._con is not raw_con
+    assert not raw_con.valid
+    raw_con = db._con
+    db._last_used -= 10  # this connection has been idle for too long
+    db.begin()
+    assert persist.connection() is db
+    assert db._con is raw_con  # not reopened inside a transaction
+    db.rollback()
+    assert persist.connection() is db
+    assert db._con is not raw_con
+    assert not raw_con.valid
+
+
+def test_stats(dbapi):  # noqa: F811
+    persist = PersistentDB(dbapi)
+    stats = persist.stats()
+    assert stats['checkouts'] == stats['created'] == 0
+    db = persist.connection()
+    assert persist.connection() is db
+    stats = persist.stats()
+    assert stats['checkouts'] == 2
+    assert stats['created'] == 1
+    assert stats['waits'] == 0
+    assert sum(n for _bound, n in stats['create_histogram']) == 1
+    db._con.close()
+    db.cursor().execute('select test')
+    assert persist.stats()['failovers'] == 1
+
+
+def test_ping_interval(dbapi):  # noqa: F811
+    con_cls = dbapi.Connection
+    con_cls.has_ping = True
+    con_cls.num_pings = 0
+    try:
+        persist = PersistentDB(dbapi, ping_interval=10)
+        db = persist.connection()
+        assert db._ping_interval == 10
+        assert con_cls.num_pings == 0  # just opened, so not pinged
+        db.cursor().execute('select test')
+        assert persist.connection() is db
+        assert con_cls.num_pings == 0  # recently used, so not pinged
+        db._last_used -= 20
+        assert persist.connection() is db
+        assert con_cls.num_pings == 1
+    finally:
+        con_cls.has_ping = False
+        con_cls.num_pings = 0
+
+
+def test_breaker(dbapi):  # noqa: F811
+    calls = []
+
+    def creator():
+        calls.append(len(calls))
+        if len(calls) > 1:
+            raise dbapi.OperationalError
+        return dbapi.connect()
+
+    persist = PersistentDB(creator, breaker=True)
+    breaker = persist.breaker
+    assert isinstance(breaker, CircuitBreaker)
+    assert PersistentDB(dbapi).breaker is None
+    db = persist.connection()
+    assert db._breaker is breaker
+    db._con.close()
+    for _i in range(5):
+        with pytest.raises(dbapi.InternalError):
+            db.cursor()
+    # the circuit has been opened after three failed attempts
+    assert len(calls) == 4
+    stats = breaker.stats()
+    assert stats['state'] == 'open'
+    assert stats['rejected'] == 2
+    breaker._open_until = monotonic()  # skip the backoff time
+    calls.clear()
+    db.cursor().execute('select test')  # the probe succeeds
+    assert len(calls) == 1
+    assert breaker.state == 'closed'
+
+
+def test_statement_cache(dbapi):  # noqa: F811
+    persist = PersistentDB(dbapi, statement_cache_size=10)
+    db = persist.connection()
+    cursor = db.prepare('select test')
+    cursor.close()
+    assert persist.connection().prepare('select test') is cursor
+    stats = persist.stats()
+    assert stats['statement_hits'] == stats['statement_misses'] == 1
+
+
+def test_cursor_cache(dbapi):  # noqa: F811
+    persist = PersistentDB(dbapi, cursor_cache_size=2)
+    db = persist.connection()
+    cursor = db.cursor()
+    raw = cursor._cursor
+    cursor.close()
+    assert persist.connection().cursor()._cursor is raw
@@ -0,0 +1,108 @@
+"""Test the PoolStats module.
+
+Copyright and credit info:
+
+* This test is based on the tests of the PooledDB module
+"""
+
+from math import inf
+from threading import Thread
+
+from dbutils.pool_stats import (
+    BUCKETS,
+    COUNTERS,
+    RETIRE_AT,
+    PoolStats,
+    PoolStatsRecord,
+    sum_stats,
+)
+
+
+def test_record():
+    record = PoolStatsRecord()
+    assert record.thread is None
+    stats = record.as_dict()
+    assert all(stats[name] == 0 for name in COUNTERS)
+    assert stats['wait_histogram'] == [(bound, 0) for bound in BUCKETS]
+    assert stats['create_histogram'] == [(bound, 0) for bound in BUCKETS]
+    assert BUCKETS[-1] == inf
+    record.add_wait(0.00005)
+    record.add_wait(0.003, timeout=True)
+    record.add_wait(100)
+    record.add_created(0.02)
+    stats = record.as_dict()
+    assert stats['waits'] == 3
+    assert stats['timeouts'] == 1
+    assert stats['wait_time'] == 100.00305
+    assert stats['created'] == 1
+    assert stats['create_time'] == 0.02
+    histogram = dict(stats['wait_histogram'])
+    assert histogram[0.0001] == 1
+    assert histogram[0.005] == 1
+    assert histogram[inf] == 1
+    assert sum(histogram.values()) == 3
+    histogram = dict(stats['create_histogram'])
+    assert histogram[0.025] == 1
+    assert sum(histogram.values()) == 1
+    other = PoolStatsRecord()
+    other.checkouts = 5
+    other.add_wait(0.003)
+    record.merge(other)
+    stats = record.as_dict()
+    assert stats['checkouts'] == 5
+    assert stats['waits'] == 4
+    assert dict(stats['wait_histogram'])[0.005] == 2
+
+
+def test_threads():
+    stats = PoolStats()
+    record = stats.record()
+    assert stats.record() is record
+    record.checkouts += 1
+
+    def run():
+        other = stats.record()
+        assert other is not record
+        other.checkouts += 2
+        other.add_created(0.01)
+
+    threads = [Thread(target=run) for _i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(stats._records) == 4
+    snapshot = stats.snapshot()
+    assert snapshot['checkouts'] == 7
+    assert snapshot['created'] == 3
+    # the records of the ended threads have been merged
+    assert stats._records == [record]
+    assert stats._retired.checkouts == 6
+    assert stats.snapshot() == snapshot
+
+
+def test_many_threads():
+    stats = PoolStats()
+
+    def run():
+        stats.record().checkouts += 1
+
+    for _i in range(2000):
+        thread = Thread(target=run)
+        thread.start()
+        thread.join()
+    # the records of ended threads are merged without taking snapshots
+    assert len(stats._records) < RETIRE_AT
+    assert stats.snapshot()['checkouts'] == 2000
+
+
+def test_sum_stats():
+    stats = PoolStats()
+    stats.record().add_created(0.02)
+    stats = stats.snapshot()
+    stats['idle'] = 2
+    total = sum_stats([stats, stats, stats])
+    assert total['created'] == 3
+    assert total['idle'] == 6
+    assert dict(total['create_histogram'])[0.025] == 3
+    assert sum_stats([]) == {}
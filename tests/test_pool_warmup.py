@@ -0,0 +1,113 @@
+"""Test the PoolWarmup module.
+
+Copyright and credit info:
+
+* This test is based on the tests of the PooledDB module
+"""
+
+from threading import Barrier, BrokenBarrierError, Event
+
+import pytest
+
+from dbutils.pool_warmup import WARMUP_MODES, warm_up
+
+
+def test_modes():
+    assert WARMUP_MODES == ('serial', 'parallel', 'background')
+    with pytest.raises(ValueError, match='warmup'):
+        warm_up(object, print, 1, 'lazy')
+
+
+@pytest.mark.parametrize('mode', WARMUP_MODES)
+def test_no_connections(mode):
+    cons = []
+    ready = warm_up(object, cons.append, 0, mode)
+    assert ready.is_set()
+    assert cons == []
+
+
+def test_serial():
+    barrier = Barrier(2, timeout=0.1)
+
+    def connect():
+        barrier.wait()
+        return object()
+
+    cons = []
+    with pytest.raises(BrokenBarrierError):
+        warm_up(connect, cons.append, 2, 'serial')
+    assert cons == []
+    cons = []
+    ready = warm_up(object, cons.append, 3, 'serial')
+    assert ready.is_set()
+    assert len(cons) == 3
+
+
+def test_parallel():
+    barrier = Barrier(3, timeout=1)
+
+    def connect():
+        barrier.wait()  # would break if connections were opened serially
+        return object()
+
+    cons = []
+    ready = warm_up(connect, cons.append, 3)
+    assert ready.is_set()
+    assert len(cons) == 3
+    assert len(set(map(id, cons))) == 3
+
+
+def test_parallel_bounded():
+    barrier = Barrier(3, timeout=0.1)
+
+    def connect():
+        barrier.wait()  # would break if less than three were opened
+        return object()
+
+    cons = []
+    with pytest.raises(BrokenBarrierError):
+        warm_up(connect, cons.append, 3, max_workers=2)
+    assert cons == []
+
+
+def test_parallel_error():
+    calls = []
+
+    def connect():
+        calls.append(None)
+        if len(calls) == 2:
+            raise RuntimeError
+        return object()
+
+    cons = []
+    with pytest.raises(RuntimeError):
+        warm_up(connect, cons.append, 4)
+    assert len(calls) == 4
+    assert len(cons) == 3
+
+
+def test_background():
+    proceed = Event()
+
+    def connect():
+        proceed.wait(1)
+        return object()
+
+    cons = []
+    ready = warm_up(connect, cons.append, 3, 'background')
+    assert not ready.is_set()
+    assert cons == []
+    proceed.set()
+    assert ready.wait(1)
+    assert len(cons) == 3
+
+
+def test_background_error():
+
+    def connect():
+        raise RuntimeError
+
+    cons = []
+    ready = warm_up(connect, cons.append, 3, 'background')
+    assert ready.wait(1)
+    assert cons == []
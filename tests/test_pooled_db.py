@@ -11,14 +11,20 @@ Copyright and credit info:
 """
 
 from queue import Empty, Queue
-from threading import Thread
+from random import Random
+from threading import Barrier, Event, Thread, current_thread, get_ident
+from time import monotonic, sleep
+from weakref import ref
 
 import pytest
 
+from dbutils.circuit_breaker import CircuitBreaker, CircuitOpenError
 from dbutils.pooled_db import (
     InvalidConnectionError,
     NotSupportedError,
     PooledDB,
+    PooledDBConnectionProxy,
+    SharedDBCache,
     SharedDBConnection,
     TooManyConnectionsError,
 )
@@ -118,7 +124,7 @@ def test_create_connection(dbapi, threadsafety):  # noqa: F811, PLR0915
     assert db_con.open_cursors == 0
     assert db_con.num_queries == 1
     assert db._usage == 2
-    assert db_con.session == ['rollback', 'sessiontest']
+    assert db_con.session == ['sessiontest']
     pool = PooledDB(dbapi, 1, 1, 1)
     assert len(pool._idle_cache) == 1
     if shareable:
@@ -615,11 +621,9 @@ def test_many_shared(dbapi, threadsafety):  # noqa: F811
         cache[3] = cache[8] = cache[33] = None
         cache[12] = cache[17] = cache[34] = None
         assert len(pool._shared_cache) == 5
-        assert pool._shared_cache[0].shared == 7
-        assert pool._shared_cache[1].shared == 7
-        assert pool._shared_cache[2].shared == 5
-        assert pool._shared_cache[3].shared == 4
-        assert pool._shared_cache[4].shared == 6
+        shared = sorted(con.shared for con in pool._shared_cache)
+        assert shared == [4, 5, 6, 7, 7]
+        assert pool._shared_cache[0].shared == 4
         for db in cache:
             if db:
                 db.cursor().callproc('test4')
@@ -672,7 +676,7 @@ def test_rollback(dbapi, threadsafety):  # noqa: F811
     db.close()
     assert session == [
         'doit1', 'commit', 'dont1', 'rollback',
-        'doit2', 'commit', 'rollback']
+        'doit2', 'commit']  # no rollback needed after the commit
 
 
 @pytest.mark.parametrize("threadsafety", [1, 2])
@@ -884,7 +888,7 @@ def test_maxconnections(dbapi, threadsafety):  # noqa: F811, PLR0915
     if shareable:
         assert len(pool._shared_cache) == 0
     session = db._con._con.session
-    assert session == ['rollback']
+    assert session == []  # no rollback needed since nothing was executed
     del db
     thread.join(0.1)
     assert not thread.is_alive()
@@ -895,7 +899,7 @@ def test_maxconnections(dbapi, threadsafety):  # noqa: F811, PLR0915
     db = pool.connection(False)
     assert pool._connections == 1
     assert len(pool._idle_cache) == 0
-    assert session == ['rollback', 'rollback', 'thread', 'rollback']
+    assert session == ['thread', 'rollback']
     assert db
     del db
 
@@ -1193,11 +1197,11 @@ def test_reset_transaction(dbapi):  # noqa: F811
     db.begin()
     con = db._con
     assert con._transaction
-    assert con._con.session == ['rollback']
+    assert con._con.session == []
     db.close()
     assert pool.connection()._con is con
     assert not con._transaction
-    assert con._con.session == ['rollback'] * 3
+    assert con._con.session == ['rollback']
     pool = PooledDB(dbapi, 1, 1, 0, reset=False)
     db = pool.connection()
     db.begin()
@@ -1210,6 +1214,35 @@ def test_reset_transaction(dbapi):  # noqa: F811
     assert con._con.session == ['rollback']
 
 
+@pytest.mark.parametrize("threadsafety", [1, 2])
+def test_proxy_methods(dbapi, threadsafety):  # noqa: F811
+    dbapi.threadsafety = threadsafety
+    pool = PooledDB(dbapi, 1, 1, 1)
+    con = pool._idle_cache[0]._con
+    db = pool.connection()
+    with pytest.raises(AttributeError):  # the proxy has slots
+        db.foo = 'bar'
+    assert ref(db)() is db  # but weak references are supported
+    # the DB-API 2 methods are bound explicitly
+    for name in ('cursor', 'begin', 'commit', 'rollback'):
+        method = getattr(db, name)
+        assert method.__func__ is getattr(PooledDBConnectionProxy, name)
+    cursor = db.cursor()
+    cursor.execute('select test')
+    assert cursor.fetchone() == 'test'
+    cursor.close()
+    db.commit()
+    db.rollback()
+    assert con.session == ['commit', 'rollback']
+    assert db.threadsafety() == threadsafety  # proxied
+    db.close()
+    for name in ('cursor', 'begin', 'commit', 'rollback'):
+        with pytest.raises(InvalidConnectionError):
+            getattr(db, name)()
+    with pytest.raises(InvalidConnectionError):
+        db.threadsafety()
+
+
 def test_context_manager(dbapi):  # noqa: F811
     pool = PooledDB(dbapi, 1, 1, 1)
     con = pool._idle_cache[0]._con
@@ -1283,3 +1316,833 @@ def test_shared_db_connection_compare(dbapi):  # noqa: F811
     assert con1 != con2
     assert not con1 < con2
     assert con1 > con2
+
+
+def test_open_connections_in_parallel(dbapi):  # noqa: F811
+    barrier = Barrier(2, timeout=1)
+
+    def creator():
+        barrier.wait()  # would break if connections were opened serially
+        return dbapi.connect()
+
+    creator.dbapi = dbapi
+    pool = PooledDB(creator, 0, 0, 0, 2)
+    queue = Queue(2)
+
+    def connection():
+        queue.put(pool.connection(), timeout=1)
+
+    threads = [Thread(target=connection) for _i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(1)
+    db1 = queue.get(timeout=1)
+    db2 = queue.get(timeout=1)
+    assert db1._con is not db2._con
+    assert pool._connections == 2
+
+
+def test_reserve_slot_while_opening(dbapi):  # noqa: F811
+    opening, proceed = Event(), Event()
+
+    def creator(database=None):
+        if database == 'slow':
+            opening.set()
+            proceed.wait(1)
+        return dbapi.connect(database)
+
+    creator.dbapi = dbapi
+    pool = PooledDB(creator, 0, 1, 0, 1, False, None, None, True, None, 1,
+                    'slow')
+    queue = Queue(1)
+    thread = Thread(target=lambda: queue.put(pool.connection(False)))
+    thread.start()
+    assert opening.wait(1)
+    assert pool._connections == 1
+    with pytest.raises(TooManyConnectionsError):
+        pool.connection(False)
+    proceed.set()
+    thread.join(1)
+    db = queue.get(timeout=1)
+    assert pool._connections == 1
+    db.close()
+    assert pool._connections == 0
+    pool = PooledDB(dbapi, 0, 1, 0, 1, False, None, None, True, None, 1,
+                    'error')
+    with pytest.raises(dbapi.OperationalError):
+        pool.connection()
+    assert pool._connections == 0
+    pool = PooledDB(dbapi, 0, 1, 1, 1, False, None, None, True, None, 1,
+                    'error')
+    with pytest.raises(dbapi.OperationalError):
+        pool.connection()
+    assert pool._connections == 0
+    assert pool._pending_shared == 0
+    assert len(pool._shared_cache) == 0
+
+
+@pytest.mark.parametrize("checkout_order", ['fifo', 'lifo'])
+def test_checkout_order(dbapi, checkout_order):  # noqa: F811
+    pool = PooledDB(dbapi, 3, checkout_order=checkout_order)
+    cons = list(pool._idle_cache)
+    db = pool.connection(False)
+    if checkout_order == 'fifo':
+        assert db._con is cons[0]
+    else:
+        assert db._con is cons[2]
+    db.close()
+    db = pool.connection(False)
+    if checkout_order == 'fifo':
+        assert db._con is cons[1]
+    else:
+        assert db._con is cons[2]
+    db.close()
+    assert len(pool._idle_cache) == 3
+
+
+def test_invalid_checkout_order(dbapi):  # noqa: F811
+    with pytest.raises(ValueError, match="'checkout_order' must be"):
+        PooledDB(dbapi, checkout_order='random')
+
+
+def test_shared_db_cache(dbapi):  # noqa: F811
+    cache = SharedDBCache()
+    assert not cache
+    assert cache.least_shared() is None
+    cons = [SharedDBConnection(dbapi.connect()) for _i in range(50)]
+    rand = Random(42)  # noqa: S311
+    for con in cons:
+        con.con._transaction = False
+        cache.add(con)
+    assert len(cache) == 50
+    for _i in range(500):
+        con = rand.choice(cons)
+        action = rand.random()
+        if con not in cache:
+            cache.add(con)
+        elif action < 0.4:
+            cache.share(con)
+        elif action < 0.7 and con.shared > 1:
+            cache.unshare(con)
+        elif action < 0.8:
+            con.con._transaction = not con.con._transaction
+        elif action < 0.9:
+            cache.remove(con)
+            assert con not in cache
+        heap = list(cache)
+        for index, con in enumerate(heap):
+            assert con.index == index
+            if index:
+                parent = heap[(index - 1) // 2]
+                assert (parent.shared, parent.order) <= (
+                    con.shared, con.order)
+        expected = min(
+            (con for con in heap if not con.con._transaction),
+            key=lambda con: (con.shared, con.order), default=None)
+        assert cache.least_shared() is expected
+    with pytest.raises(ValueError, match="not in the cache"):
+        cache.remove(SharedDBConnection(dbapi.connect()))
+    while cache:
+        assert cache.pop().index is None
+
+
+@pytest.mark.parametrize("maxshared", [0, 1])
+def test_fair_waiter_queue(dbapi, maxshared):  # noqa: F811
+    pool = PooledDB(dbapi, 0, 0, maxshared, 1, True)
+    db = pool.connection(False)
+    con = db._con
+    order = []
+
+    def connection(i):
+        db = pool.connection(False)
+        order.append((i, db._con))
+        db.close()
+
+    threads = []
+    for i in range(5):
+        thread = Thread(target=connection, args=(i,))
+        thread.start()
+        threads.append(thread)
+        for _j in range(100):
+            if len(pool._waiters[0]) > i:
+                break
+            sleep(0.01)
+        assert len(pool._waiters[0]) == i + 1
+    assert not order
+    db.close()
+    for thread in threads:
+        thread.join(1)
+    assert [i for i, _con in order] == list(range(5))
+    assert all(c is con for _i, c in order)
+    assert not pool._waiters[0]
+    assert pool._connections == 0
+    assert len(pool._idle_cache) == 1
+
+
+def test_shared_waiter_does_not_block_dedicated(dbapi):  # noqa: F811
+    pool = PooledDB(dbapi, 0, 0, 1, 2, True)
+    db1 = pool.connection()
+    db1.begin()
+    db2 = pool.connection(False)
+    queue = Queue(2)
+    Thread(target=lambda: queue.put(pool.connection())).start()
+    for _i in range(100):
+        if pool._waiters[1]:
+            break
+        sleep(0.01)
+    assert len(pool._waiters[1]) == 1
+    Thread(target=lambda: queue.put(pool.connection(False))).start()
+    for _i in range(100):
+        if pool._waiters[0]:
+            break
+        sleep(0.01)
+    assert len(pool._waiters[0]) == 1
+    con2 = db2._con
+    db2.close()
+    db = queue.get(timeout=1)
+    assert db._con is con2
+    assert not hasattr(db, '_shared_con')
+    assert len(pool._waiters[1]) == 1
+    db1.commit()
+    db1.close()
+    db = queue.get(timeout=1)
+    assert hasattr(db, '_shared_con')
+    assert not pool._waiters[1]
+
+
+@pytest.mark.parametrize("maxshared", [0, 1])
+def test_checkout_timeout(dbapi, maxshared):  # noqa: F811
+    pool = PooledDB(dbapi, 0, 0, maxshared, 1, True)
+    db = pool.connection(False)
+    with pytest.raises(TooManyConnectionsError):
+        pool.connection(timeout=0.05)
+    with pytest.raises(TooManyConnectionsError):
+        pool.dedicated_connection(timeout=0)
+    assert not pool._waiters[0]
+    assert not pool._waiters[1]
+    pool = PooledDB(dbapi, 0, 0, maxshared, 1, True, checkout_timeout=0.05)
+    db = pool.connection(False)
+    with pytest.raises(TooManyConnectionsError):
+        pool.connection()
+    queue = Queue(1)
+    Thread(target=lambda: queue.put(pool.connection(timeout=1))).start()
+    sleep(0.01)
+    con = db._con
+    db.close()
+    db = queue.get(timeout=1)
+    assert db._con is con
+
+
+def test_maxwaiters(dbapi):  # noqa: F811
+    pool = PooledDB(dbapi, 0, 0, 0, 1, True, maxwaiters=1)
+    db = pool.connection()
+    queue = Queue(1)
+    Thread(target=lambda: queue.put(pool.connection(timeout=1))).start()
+    for _i in range(100):
+        if pool._waiters[0]:
+            break
+        sleep(0.01)
+    assert len(pool._waiters[0]) == 1
+    with pytest.raises(TooManyConnectionsError):
+        pool.connection()
+    db.close()
+    assert queue.get(timeout=1)
+
+
+def test_maintain(dbapi):  # noqa: F811
+    con_cls = dbapi.Connection
+    con_cls.has_ping = True
+    con_cls.num_pings = 0
+    try:
+        pool = PooledDB(dbapi, 3, maxusage=2)
+        assert pool._maintenance is None
+        cons = list(pool._idle_cache)
+        raw_cons = [con._con for con in cons]
+        raw_cons[0].close()  # this one is broken now
+        db = pool.connection(False)
+        assert db._con is cons[0]
+        db.cursor().execute('select test')
+        db.cursor().execute('select test')
+        db.close()  # this one has reached its usage limit now
+        assert con_cls.num_pings == 1
+        pool.maintain()
+        assert con_cls.num_pings == 3
+        assert list(pool._idle_cache) == [cons[1], cons[2], cons[0]]
+        assert cons[0]._con is not raw_cons[0]
+        assert cons[0]._con.valid
+        assert cons[0]._usage == 0
+        assert cons[1]._con is raw_cons[1]
+        assert cons[2]._con is raw_cons[2]
+        cache = [pool.connection(False) for _i in range(3)]
+        assert not pool._idle_cache
+        pool.maintain()
+        assert len(pool._idle_cache) == 3
+        assert not any(con in cons for con in pool._idle_cache)
+        assert cache
+        del cache
+        assert len(pool._idle_cache) == 6
+    finally:
+        con_cls.has_ping = False
+        con_cls.num_pings = 0
+
+
+def test_maintain_with_database_down(dbapi):  # noqa: F811
+    database = ['ok']
+
+    def creator():
+        return dbapi.connect(database[0])
+
+    creator.dbapi = dbapi
+    pool = PooledDB(creator, 2, maxusage=1)
+    db = pool.connection(False)
+    db.cursor().execute('select test')
+    db.close()
+    database[0] = 'error'
+    pool.maintain()
+    assert len(pool._idle_cache) == 1
+    database[0] = 'ok'
+    pool.maintain()
+    assert len(pool._idle_cache) == 2
+
+
+def test_maintain_with_maxconnections(dbapi):  # noqa: F811
+    pool = PooledDB(dbapi, 2, 5, 0, 5, True)
+    cache = [pool.connection() for _i in range(5)]
+    opened = []
+    connect = pool.steady_connection
+
+    def steady_connection():
+        con = connect()
+        opened.append(con)
+        return con
+
+    pool.steady_connection = steady_connection
+    pool.maintain()  # must not try to refill the pool
+    assert not opened
+    assert not pool._idle_cache
+    assert pool._connections == 5
+    cache.pop().close()
+    pool.maintain()
+    assert not opened
+    assert len(pool._idle_cache) == 1
+    pool._connections += 1  # a connection is checked out concurrently
+    assert not pool._add_idle(connect())
+    assert len(pool._idle_cache) == 1
+    pool._connections -= 1
+    assert cache
+
+
+def test_maintain_counts_checked_connections(dbapi):  # noqa: F811
+    pool = PooledDB(dbapi, 2, 2, 0, 2, True, maintenance_interval=1)
+    cons = list(pool._idle_cache)
+    for con in cons:
+        con._last_used -= 2  # these need to be checked
+    checking = []
+
+    def refresh(_con):
+        checking.append(pool._connections)
+        # another connection is returned in the meantime
+        pool._idle_cache.append(pool.steady_connection())
+        return True
+
+    pool._refresh = refresh
+    pool._maxcached = 3
+    pool.maintain()
+    # the connections have been counted while being checked
+    assert checking == [2, 2]
+    assert pool._connections == 0
+    # the checked connections have been put back up to maxcached
+    assert len(pool._idle_cache) == 3
+    assert pool._idle_cache[0] is cons[0]
+    assert cons[1]._closed
+    pool.close()
+
+
+def test_maintenance_thread(dbapi):  # noqa: F811
+    pool = PooledDB(dbapi, 2, maintenance_interval=0.01)
+    thread = pool._maintenance
+    assert thread.is_alive()
+    assert thread.daemon
+    cache = [pool.connection(False) for _i in range(2)]
+    for _i in range(100):
+        if len(pool._idle_cache) == 2:
+            break
+        sleep(0.01)
+    assert len(pool._idle_cache) == 2
+    assert cache
+    pool.close()
+    thread.join(1)
+    assert not thread.is_alive()
+    pool = PooledDB(dbapi, 2, maintenance_interval=0.01)
+    thread = pool._maintenance
+    assert thread.is_alive()
+    del pool
+    thread.join(1)
+    assert not thread.is_alive()
+
+
+def test_max_lifetime(dbapi):  # noqa: F811
+    pool = PooledDB(dbapi, 2, max_lifetime=10)
+    cons = list(pool._idle_cache)
+    raw_cons = [con._con for con in cons]
+    cons[0]._created -= 20  # this one has expired now
+    cons[1]._created -= 5
+    db1 = pool.connection(False)
+    db2 = pool.connection(False)
+    assert db1._con is cons[0]
+    assert db2._con is cons[1]
+    assert db1._con._con is not raw_cons[0]
+    assert db2._con._con is raw_cons[1]
+    assert not raw_cons[0].valid
+    db1.close()
+    db2.close()
+    cons[1]._created -= 20
+    pool.maintain()
+    assert list(pool._idle_cache) == cons
+    assert cons[1]._con is not raw_cons[1]
+    assert not raw_cons[1].valid
+
+
+def test_idle_timeout(dbapi):  # noqa: F811
+    pool = PooledDB(dbapi, 2, idle_timeout=10)
+    db = [pool.connection(False) for _i in range(4)]
+    cons = [d._con for d in db]
+    for d in db:
+        d.close()
+    assert list(pool._idle_cache) == cons
+    raw_cons = [con._con for con in cons]
+    for con in cons[:3]:
+        con._last_used -= 20  # these ones have expired now
+    pool.maintain()
+    # surplus connections are closed, but mincached are kept
+    assert list(pool._idle_cache) == cons[2:]
+    assert not raw_cons[0].valid
+    assert not raw_cons[1].valid
+    assert raw_cons[3].valid
+    db = pool.connection(False)
+    assert db._con is cons[2]
+    assert db._con._con is not raw_cons[2]
+    assert not raw_cons[2].valid
+
+
+def test_stats(dbapi):  # noqa: F811
+    pool = PooledDB(dbapi, 1, 2, 1, 2, blocking=True)
+    stats = pool.stats()
+    assert stats['created'] == 1
+    assert stats['idle'] == 1
+    assert stats['shared'] == 0
+    assert stats['used'] == 0
+    assert stats['waits'] == 0
+    checkouts, rollbacks = stats['checkouts'], stats['rollbacks']
+    skipped_rollbacks = stats['skipped_rollbacks']
+    db1 = pool.connection()
+    db2 = pool.connection(False)
+    stats = pool.stats()
+    assert stats['checkouts'] == checkouts + 2
+    assert stats['created'] == 2
+    assert stats['idle'] == 0
+    assert stats['shared'] == 1
+    assert stats['used'] == 2
+    with pytest.raises(TooManyConnectionsError):
+        pool.connection(False, timeout=0)
+    stats = pool.stats()
+    assert stats['waits'] == 1
+    assert stats['timeouts'] == 1
+    assert stats['checkouts'] == checkouts + 2
+    db2.cursor().execute('select test')
+    Thread(target=lambda: (sleep(0.05), db2.close())).start()
+    db3 = pool.connection(False, timeout=1)
+    stats = pool.stats()
+    assert stats['waits'] == 2
+    assert stats['timeouts'] == 1
+    assert 0.04 < stats['wait_time'] < 1
+    assert sum(n for _bound, n in stats['wait_histogram']) == 2
+    assert sum(n for _bound, n in stats['create_histogram']) == 2
+    assert stats['rollbacks'] == rollbacks + 1
+    db3._con._con.close()
+    db3.cursor().execute('select test')
+    assert pool.stats()['failovers'] == 1
+    db1.close()
+    db3.close()
+    stats = pool.stats()
+    assert stats['idle'] == 2
+    assert stats['shared'] == 0
+    assert stats['used'] == 0
+    assert stats['rollbacks'] == rollbacks + 2
+    assert stats['skipped_rollbacks'] == skipped_rollbacks + 1
+    assert stats['pings'] == 0
+    dbapi.Connection.has_ping = True
+    try:
+        pool = PooledDB(dbapi, 1)
+        pings = pool.stats()['pings']
+        pool.connection().close()
+        assert pool.stats()['pings'] == pings + 1
+    finally:
+        dbapi.Connection.has_ping = False
+
+
+def test_reset_outside_lock(dbapi):  # noqa: F811
+    pool = PooledDB(dbapi, 1)
+    db = pool.connection()
+    raw_con = db._con._con
+    raw_con.session.clear()
+    db.cursor().execute('select test')
+    rollback = raw_con.rollback
+    locked = []
+
+    def check_lock():
+        acquired = pool._lock.acquire(timeout=1)
+        if acquired:
+            pool._lock.release()
+        locked.append(not acquired)
+
+    def rollback_and_check_lock():
+        thread = Thread(target=check_lock)
+        thread.start()
+        thread.join()
+        rollback()
+
+    raw_con.rollback = rollback_and_check_lock
+    db.close()
+    assert locked == [False]
+    assert raw_con.session == ['rollback']
+    assert len(pool._idle_cache) == 1
+
+
+def test_reset_worker(dbapi):  # noqa: F811
+    pool = PooledDB(
+        dbapi, 1, maxconnections=1, blocking=True, reset_worker=True)
+    worker = pool._reset_worker
+    assert worker.is_alive()
+    assert worker.daemon
+    db = pool.connection()
+    raw_con = db._con._con
+    raw_con.session.clear()
+    db.cursor().execute('select test')
+    rollback = raw_con.rollback
+    resetting, reset = Event(), Event()
+
+    def slow_rollback():
+        resetting.set()
+        reset.wait(1)
+        rollback()
+
+    raw_con.rollback = slow_rollback
+    db.close()  # returns immediately
+    assert resetting.wait(1)
+    assert not pool._idle_cache
+    assert pool._connections == 1
+    assert raw_con.session == []
+    reset.set()
+    db = pool.connection(timeout=1)  # waits until the reset is done
+    assert db._con._con is raw_con
+    assert raw_con.session == ['rollback']
+    db.close()
+    pool.close()
+    worker.join(1)
+    assert not worker.is_alive()
+    assert pool._reset_worker is None
+    assert not worker.put(None)
+
+
+def test_reset_worker_after_close(dbapi):  # noqa: F811
+    pool = PooledDB(
+        dbapi, 0, maxconnections=1, blocking=True, reset_worker=True)
+    worker = pool._reset_worker
+    db = pool.connection()
+    pool.close()
+    worker.join(1)
+    assert not worker.is_alive()
+    db.close()  # the connection is reset without the worker
+    assert pool._connections == 0
+    db = pool.connection(timeout=1)
+    db.close()
+
+
+def test_ping_interval(dbapi):  # noqa: F811
+    con_cls = dbapi.Connection
+    con_cls.has_ping = True
+    con_cls.num_pings = 0
+    try:
+        pool = PooledDB(dbapi, 1, ping_interval=10)
+        con = pool._idle_cache[0]
+        assert con._ping_interval == 10
+        db = pool.connection()
+        db.cursor().execute('select test')
+        db.close()
+        db = pool.connection()
+        assert con_cls.num_pings == 0  # recently used, so not pinged
+        db.close()
+        con._last_used -= 20
+        db = pool.connection()
+        assert con_cls.num_pings == 1
+        db.close()
+    finally:
+        con_cls.has_ping = False
+        con_cls.num_pings = 0
+
+
+def test_warmup_in_parallel(dbapi):  # noqa: F811
+    barrier = Barrier(3, timeout=1)
+
+    def creator():
+        barrier.wait()  # would break if connections were opened serially
+        return dbapi.connect()
+
+    creator.dbapi = dbapi
+    pool = PooledDB(creator, 3)
+    assert pool.ready.is_set()
+    assert len(pool._idle_cache) == 3
+    assert pool._connections == 0
+    stats = pool.stats()
+    assert stats['created'] == 3
+    assert stats['checkouts'] == 0
+    with pytest.raises(ValueError, match='warmup'):
+        PooledDB(dbapi, 1, warmup='lazy')
+
+
+def test_warmup_in_background(dbapi):  # noqa: F811
+    proceed = Event()
+
+    def creator():
+        proceed.wait(1)
+        return dbapi.connect()
+
+    creator.dbapi = dbapi
+    pool = PooledDB(creator, 3, 3, 0, 3, warmup='background')
+    assert not pool.ready.is_set()
+    assert not pool._idle_cache
+    proceed.set()
+    assert pool.ready.wait(1)
+    assert len(pool._idle_cache) == 3
+    db = pool.connection()
+    assert len(pool._idle_cache) == 2
+    db.close()
+
+
+def test_warmup_failing(dbapi):  # noqa: F811
+    cons = []
+
+    def creator():
+        if len(cons) == 1:
+            cons.append(None)
+            raise dbapi.OperationalError
+        con = dbapi.connect()
+        cons.append(con)
+        return con
+
+    creator.dbapi = dbapi
+    for warmup, num_opened in (('serial', 1), ('parallel', 2)):
+        cons.clear()
+        with pytest.raises(dbapi.OperationalError):
+            PooledDB(creator, 3, maintenance_interval=60, warmup=warmup)
+        opened = [con for con in cons if con]
+        assert len(opened) == num_opened
+        # the connections opened so far have been closed
+        assert not any(con.valid for con in opened)
+
+
+def test_warmup_respects_maxconnections(dbapi):  # noqa: F811
+    pool = PooledDB(dbapi, 0, 0, 0, 2)
+    db1 = pool.connection()
+    db2 = pool.connection()
+    con = pool.steady_connection()
+    pool._add_idle(con)
+    assert not pool._idle_cache
+    assert con._closed
+    db1.close()
+    con = pool.steady_connection()
+    pool._add_idle(con)  # the returned connection is already idle
+    assert len(pool._idle_cache) == 1
+    assert con._closed
+    db2.close()
+    assert len(pool._idle_cache) == 2
+
+
+def test_affinity(dbapi):  # noqa: F811
+    pool = PooledDB(dbapi, 0, 0, 0, 2, affinity=True)
+    db = pool.connection()
+    con = db._con
+    db.close()
+    assert pool._parked == {get_ident(): (ref(current_thread()), con)}
+    assert not pool._idle_cache
+    assert pool._connections == 1
+    stats = pool.stats()
+    assert stats['idle'] == 1
+    assert stats['used'] == 0
+    db = pool.connection()
+    assert db._con is con
+    assert not pool._parked
+    stats = pool.stats()
+    assert stats['affinity_hits'] == 1
+    assert stats['checkouts'] == 2
+    assert stats['idle'] == 0
+    assert stats['used'] == 1
+    db2 = pool.connection()
+    con2 = db2._con
+    assert con2 is not con
+    db2.close()
+    assert pool._parked[get_ident()][1] is con2
+    db.close()  # this thread already has a kept connection
+    assert pool._idle_cache[0] is con
+    pool.close()
+    assert not pool._parked
+    assert pool._connections == 0
+    assert con._closed
+    assert con2._closed
+
+
+def test_affinity_with_other_threads(dbapi):  # noqa: F811
+    pool = PooledDB(dbapi, 0, 0, 0, 2, affinity=True)
+    db = pool.connection()
+    queue = Queue(1)
+
+    def connection():
+        db = pool.connection()
+        queue.put(db._con)
+        db.close()
+
+    thread = Thread(target=connection)
+    thread.start()
+    thread.join(1)
+    con = queue.get(timeout=1)
+    assert con is not db._con  # a free slot was used
+    assert [item[1] for item in pool._parked.values()] == [con]
+    assert pool._connections == 2
+    thread = Thread(target=connection)
+    thread.start()
+    thread.join(1)
+    assert queue.get(timeout=1) is con
+    assert pool._connections == 2
+    db2 = pool.connection()  # no free slot is left
+    assert db2._con is con
+    assert not pool._parked
+    assert pool._connections == 2
+    with pytest.raises(TooManyConnectionsError):
+        pool.connection()
+
+
+def test_affinity_with_ended_threads(dbapi):  # noqa: F811
+    pool = PooledDB(dbapi, 0, 5, affinity=True)
+    for _round in range(5):
+        barrier = Barrier(20)
+
+        def connection(barrier=barrier):
+            db = pool.connection()
+            barrier.wait(1)
+            db.close()
+
+        threads = [Thread(target=connection) for _i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(1)
+        # the idle and kept connections are limited by maxcached
+        assert len(pool._parked) + len(pool._idle_cache) <= 5
+    pool.maintain()  # release the connections kept for ended threads
+    assert not pool._parked
+    assert pool._connections == 0
+    assert len(pool._idle_cache) == 5
+    raw = [con._con for con in pool._idle_cache]
+    assert all(con.valid for con in raw)
+    assert sum(con.open_cursors for con in raw) == 0
+    db = pool.connection()
+    assert pool._connections == 1
+    db.close()
+    assert list(pool._parked) == [get_ident()]
+    assert len(pool._idle_cache) == 4
+
+
+def test_affinity_with_waiting_threads(dbapi):  # noqa: F811
+    pool = PooledDB(dbapi, 0, 0, 0, 1, True, affinity=True)
+    db = pool.connection()
+    con = db._con
+    queue = Queue(1)
+    thread = Thread(target=lambda: queue.put(pool.connection()))
+    thread.start()
+    for _i in range(100):
+        if pool._waiters[0]:
+            break
+        sleep(0.01)
+    assert pool._waiters[0]
+    db.close()  # the connection is not kept, but handed over
+    assert not pool._parked
+    thread.join(1)
+    db = queue.get(timeout=1)
+    assert db._con is con
+    assert pool._connections == 1
+
+
+def test_breaker(dbapi):  # noqa: F811
+    down = []
+
+    def creator():
+        if down:
+            raise dbapi.OperationalError
+        return dbapi.connect()
+
+    assert PooledDB(dbapi).breaker is None
+    breaker = CircuitBreaker(threshold=2, backoff=10)
+    pool = PooledDB(creator, 1, breaker=breaker)
+    assert pool.breaker is breaker
+    db = pool.connection(False)
+    assert db._con._breaker is breaker
+    down.append(True)
+    db._con._con.close()
+    for _i in range(2):
+        with pytest.raises(dbapi.InternalError):
+            db.cursor()
+    assert breaker.state == 'open'
+    # new connections fail fast while the circuit is open
+    with pytest.raises(CircuitOpenError):
+        pool.connection()
+    with pytest.raises(dbapi.InternalError):
+        db.cursor()
+    assert breaker.stats()['rejected'] == 2
+    down.clear()
+    breaker._open_until = monotonic()  # skip the backoff time
+    db2 = pool.connection()  # the probe succeeds
+    assert breaker.state == 'closed'
+    db.cursor().execute('select test')
+    db2.close()
+    db.close()
+
+
+
+def test_statement_cache(dbapi):  # noqa: F811
+    pool = PooledDB(dbapi, 1, 1, statement_cache_size=10)
+    db = pool.connection(False)
+    assert db._con._statements.maxsize == 10
+    cursor = db.prepare('select test')
+    cursor.execute('select test')
+    assert cursor.fetchone() == 'test'
+    cursor.close()
+    db.close()
+    # the cache survives checkouts from the pool
+    db = pool.connection(False)
+    assert db.prepare('select test') is cursor
+    db.close()
+    stats = pool.stats()
+    assert stats['statement_hits'] == 1
+    assert stats['statement_misses'] == 1
+    assert PooledDB(dbapi).connection()._con._statements is None
+
+
+def test_cursor_cache(dbapi):  # noqa: F811
+    pool = PooledDB(dbapi, 1, 1, cursor_cache_size=2)
+    db = pool.connection(False)
+    con = db._con._con
+    cursor = db.cursor()
+    raw = cursor._cursor
+    cursor.close()
+    db.close()
+    assert con.open_cursors == 1
+    # the cache survives checkouts from the pool
+    db = pool.connection(False)
+    cursor = db.cursor()
+    assert cursor._cursor is raw
+    cursor.execute('select test')
+    assert cursor.fetchone() == 'test'
+    db.close()
+    assert PooledDB(dbapi).connection()._con._cursor_cache is None
@@ -12,6 +12,8 @@ Copyright and credit info:
 
 from queue import Empty, Queue
 from threading import Thread
+from time import sleep
+from weakref import ref
 
 import pg  # noqa: F401
 import pytest
@@ -19,6 +21,7 @@ import pytest
 from dbutils.pooled_pg import (
     InvalidConnectionError,
     PooledPg,
+    PooledPgConnection,
     TooManyConnectionsError,
 )
 from dbutils.steady_pg import SteadyPgConnection
@@ -305,6 +308,29 @@ def test_reset_transaction():
     assert con.num_queries == 0
 
 
+def test_proxy_methods():
+    pool = PooledPg(1, 1, 1)
+    db = pool.connection()
+    with pytest.raises(AttributeError):  # the proxy has slots
+        db.foo = 'bar'
+    assert ref(db)() is db  # but weak references are supported
+    # the methods for queries and transactions are bound explicitly
+    for name in ('query', 'begin', 'end', 'commit', 'rollback'):
+        method = getattr(db, name)
+        assert method.__func__ is getattr(PooledPgConnection, name)
+    db.begin()
+    assert db.query('select test') == 'test'
+    db.commit()
+    assert db._con._con.session == ['begin', 'commit']
+    assert db.num_queries == 1  # proxied
+    db.close()
+    for name in ('begin', 'end', 'commit', 'rollback'):
+        with pytest.raises(InvalidConnectionError):
+            getattr(db, name)()
+    with pytest.raises(InvalidConnectionError):
+        db.query('select test')
+
+
 def test_context_manager():
     pool = PooledPg(1, 1, 1)
     with pool.connection() as db:
@@ -319,3 +345,258 @@ def test_context_manager():
         assert db_con.num_queries == 2
         with pytest.raises(TooManyConnectionsError):
             pool.connection()
+
+
+@pytest.mark.parametrize("checkout_order", ['fifo', 'lifo'])
+def test_checkout_order(checkout_order):
+    pool = PooledPg(3, checkout_order=checkout_order)
+    cache = [pool.connection() for _i in range(3)]
+    cons = [db._con for db in cache]
+    for db in cache:
+        db.close()
+    db = pool.connection()
+    if checkout_order == 'fifo':
+        assert db._con is cons[0]
+    else:
+        assert db._con is cons[2]
+    db.close()
+    db = pool.connection()
+    if checkout_order == 'fifo':
+        assert db._con is cons[1]
+    else:
+        assert db._con is cons[2]
+    db.close()
+    assert pool._cache.qsize() == 3
+
+
+def test_invalid_checkout_order():
+    with pytest.raises(ValueError, match="'checkout_order' must be"):
+        PooledPg(checkout_order='random')
+
+
+def test_fair_waiter_queue():
+    pool = PooledPg(0, 0, 1, True)
+    db = pool.connection()
+    con = db._con
+    order = []
+
+    def connection(i):
+        db = pool.connection()
+        order.append((i, db._con))
+        db.close()
+
+    threads = []
+    for i in range(5):
+        thread = Thread(target=connection, args=(i,))
+        thread.start()
+        threads.append(thread)
+        for _j in range(100):
+            if len(pool._waiters) > i:
+                break
+            sleep(0.01)
+        assert len(pool._waiters) == i + 1
+    assert not order
+    db.close()
+    for thread in threads:
+        thread.join(1)
+    assert [i for i, _con in order] == list(range(5))
+    assert all(c is con for _i, c in order)
+    assert not pool._waiters
+    assert pool._connections == 0
+    assert pool._cache.qsize() == 1
+
+
+def test_checkout_timeout():
+    pool = PooledPg(0, 0, 1, True)
+    db = pool.connection()
+    with pytest.raises(TooManyConnectionsError):
+        pool.connection(timeout=0.05)
+    with pytest.raises(TooManyConnectionsError):
+        pool.connection(timeout=0)
+    assert not pool._waiters
+    pool = PooledPg(0, 0, 1, True, checkout_timeout=0.05)
+    db = pool.connection()
+    with pytest.raises(TooManyConnectionsError):
+        pool.connection()
+    queue = Queue(1)
+    Thread(target=lambda: queue.put(pool.connection(timeout=1))).start()
+    sleep(0.01)
+    con = db._con
+    db.close()
+    db = queue.get(timeout=1)
+    assert db._con is con
+
+
+def test_maxwaiters():
+    pool = PooledPg(0, 0, 1, True, maxwaiters=1)
+    db = pool.connection()
+    queue = Queue(1)
+    Thread(target=lambda: queue.put(pool.connection(timeout=1))).start()
+    for _i in range(100):
+        if pool._waiters:
+            break
+        sleep(0.01)
+    assert len(pool._waiters) == 1
+    with pytest.raises(TooManyConnectionsError):
+        pool.connection()
+    db.close()
+    assert queue.get(timeout=1)
+
+
+def test_maintain():
+    pool = PooledPg(3, maxusage=2)
+    assert pool._maintenance is None
+    cache = [pool.connection() for _i in range(3)]
+    cons = [db._con for db in cache]
+    raw_cons = [con._con for con in cons]
+    raw_cons[0].status = False  # this one is broken now
+    cache[1].query('select test')
+    cache[1].query('select test')  # this one has reached its usage limit
+    for db in cache:
+        db.close()
+    assert [con._con.num_queries for con in cons] == [0, 2, 0]
+    pool.maintain()
+    assert list(pool._cache.queue) == cons
+    assert cons[0]._con.db.status
+    assert cons[1]._usage == 0
+    assert [con._con.num_queries for con in cons] == [1, 0, 1]
+    cache = [pool.connection() for _i in range(3)]
+    assert not pool._cache.qsize()
+    pool.maintain()
+    assert pool._cache.qsize() == 3
+    assert not any(con in cons for con in pool._cache.queue)
+    for db in cache:
+        db.close()
+    assert pool._cache.qsize() == 6
+
+
+def test_maintain_with_maxconnections():
+    pool = PooledPg(2, 5, 5, True)
+    cache = [pool.connection() for _i in range(5)]
+    pool.maintain()  # must not open more connections
+    assert not pool._cache.qsize()
+    assert pool._connections == 5
+    cache.pop().close()
+    pool.maintain()
+    assert pool._cache.qsize() == 1
+    assert pool._connections == 4
+    assert cache
+
+
+def test_maintain_counts_checked_connections():
+    pool = PooledPg(2, 2, 2, True, maintenance_interval=1)
+    cons = list(pool._cache.queue)
+    for con in cons:
+        con._last_used -= 2  # these need to be checked
+    checking = []
+
+    def refresh(_con):
+        checking.append(pool._connections)
+        return True
+
+    pool._refresh = refresh
+    pool.maintain()
+    # the connections have been counted while being checked
+    assert checking == [2, 2]
+    assert list(pool._cache.queue) == cons
+    assert pool._connections == 0
+    pool.close()
+
+
+def test_maintenance_thread():
+    pool = PooledPg(2, maintenance_interval=0.01)
+    thread = pool._maintenance
+    assert thread.is_alive()
+    assert thread.daemon
+    cache = [pool.connection() for _i in range(2)]
+    for _i in range(100):
+        if pool._cache.qsize() == 2:
+            break
+        sleep(0.01)
+    assert pool._cache.qsize() == 2
+    assert cache
+    pool.close()
+    thread.join(1)
+    assert not thread.is_alive()
+    pool = PooledPg(2, maintenance_interval=0.01)
+    thread = pool._maintenance
+    assert thread.is_alive()
+    del pool
+    thread.join(1)
+    assert not thread.is_alive()
+
+
+def test_max_lifetime():
+    pool = PooledPg(2, max_lifetime=10)
+    cons = list(pool._cache.queue)
+    raw_cons = [con._con for con in cons]
+    cons[0]._created -= 20  # this one has expired now
+    cons[1]._created -= 5
+    db1 = pool.connection()
+    db2 = pool.connection()
+    assert db1._con is cons[0]
+    assert db2._con is cons[1]
+    assert db1._con._created > cons[1]._created
+    assert db2._con._con is raw_cons[1]
+    db1.close()
+    db2.close()
+    cons[1]._created -= 20
+    created = cons[1]._created
+    pool.maintain()
+    assert list(pool._cache.queue) == cons
+    assert cons[1]._created > created
+
+
+def test_idle_timeout():
+    pool = PooledPg(2, idle_timeout=10)
+    db = [pool.connection() for _i in range(4)]
+    cons = [d._con for d in db]
+    for d in db:
+        d.close()
+    assert list(pool._cache.queue) == cons
+    for con in cons[:3]:
+        con._last_used -= 20  # these ones have expired now
+    pool.maintain()
+    # surplus connections are closed, but mincached are kept
+    assert list(pool._cache.queue) == cons[2:]
+    assert cons[0]._closed
+    assert cons[1]._closed
+    assert not cons[3]._closed
+    last_used = cons[2]._last_used
+    db = pool.connection()
+    assert db._con is cons[2]
+    assert db._con._last_used > last_used
+
+
+def test_stats():
+    pool = PooledPg(1, 2, 2, blocking=True, reset=1)
+    stats = pool.stats()
+    assert stats['created'] == 1
+    assert stats['idle'] == 1
+    assert stats['used'] == 0
+    assert 'shared' not in stats
+    checkouts, rollbacks = stats['checkouts'], stats['rollbacks']
+    db1 = pool.connection()
+    db2 = pool.connection()
+    stats = pool.stats()
+    assert stats['checkouts'] == checkouts + 2
+    assert stats['created'] == 2
+    assert stats['idle'] == 0
+    assert stats['used'] == 2
+    with pytest.raises(TooManyConnectionsError):
+        pool.connection(timeout=0)
+    stats = pool.stats()
+    assert stats['waits'] == 1
+    assert stats['timeouts'] == 1
+    db2.close()
+    assert pool.stats()['rollbacks'] == rollbacks + 1
+    db1.db.status = False
+    db1.query('select test')
+    assert pool.stats()['failovers'] == 1
+    db1.close()
+    pool.maintain()
+    stats = pool.stats()
+    assert stats['idle'] == 2
+    assert stats['used'] == 0
+    assert stats['pings'] == 2
+    assert stats['rollbacks'] == rollbacks + 2
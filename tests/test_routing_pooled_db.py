@@ -0,0 +1,143 @@
+"""Test the RoutingPooledDB module.
+
+Note:
+We don't test performance here, so the test does not predicate
+whether RoutingPooledDB actually will help in improving performance or not.
+We also assume that the underlying PooledDB pools are tested.
+
+Copyright and credit info:
+
+* This test is based on the tests of the PooledDB module
+"""
+
+from queue import Queue
+from threading import Thread
+
+import pytest
+
+from dbutils.pooled_db import PooledDB
+from dbutils.routing_pooled_db import (
+    RoutingPooledDB,
+    RoutingPooledDBConnection,
+)
+
+from .mock_db import dbapi  # noqa: F401
+
+
+def database(db):
+    """Get the name of the database of a routed connection."""
+    return db._con._con._con.database
+
+
+@pytest.fixture
+def pools(dbapi):  # noqa: F811
+    return (PooledDB(dbapi, database='primary'),
+            PooledDB(dbapi, database='replica'))
+
+
+def test_version():
+    from dbutils import __version__, routing_pooled_db
+    assert routing_pooled_db.__version__ == __version__
+    assert RoutingPooledDB.version == __version__
+
+
+def test_read_write_split(pools):
+    pool = RoutingPooledDB(*pools)
+    assert pool.primary is pools[0]
+    assert pool.replicas is pools[1]
+    db = pool.connection()
+    assert isinstance(db, RoutingPooledDBConnection)
+    assert db.primary
+    assert database(db) == 'primary'
+    cursor = db.cursor()
+    cursor.execute('select test')
+    assert cursor.fetchone() == 'test'
+    db.close()
+    with pool.connection(readonly=True) as db:
+        assert not db.primary
+        assert database(db) == 'replica'
+    db = pool.dedicated_connection(readonly=True)
+    assert database(db) == 'replica'
+    db.close()
+    stats = pool.stats()
+    assert stats['primary']['checkouts'] == 1
+    assert stats['replicas']['checkouts'] == 2
+    assert stats['reads_on_primary'] == 0
+
+
+def test_begin_pins_to_primary(pools):
+    pool = RoutingPooledDB(*pools)
+    db = pool.connection(readonly=True)
+    replica_con = db._con._con
+    assert database(db) == 'replica'
+    db.begin()
+    assert db.primary
+    assert database(db) == 'primary'
+    assert db._con._con._transaction
+    assert pools[1]._idle_cache[0] is replica_con
+    reader = pool.connection(readonly=True)
+    assert reader.primary
+    assert reader._con is db._con  # sees the changes of the transaction
+    steady_con = db._con._con
+    steady_con.begin = None  # must not be called again
+    assert reader.begin() is None  # the transaction is already ongoing
+    del steady_con.begin
+    assert reader._con is db._con
+    assert db._con._con._transaction
+    reader.close()  # does not return the connection
+    assert db._con is not None
+    assert not pools[0]._idle_cache
+    db.commit()
+    reader = pool.connection(readonly=True)
+    assert not reader.primary
+    reader.close()
+    db.close()
+    assert len(pools[0]._idle_cache) == 1
+    assert pool.stats()['reads_on_primary'] == 1
+
+
+def test_read_your_writes(pools):
+    pool = RoutingPooledDB(*pools, read_your_writes=60)
+    db = pool.connection(readonly=True)
+    assert not db.primary  # nothing written yet
+    db.close()
+    pool.connection().close()
+    db = pool.connection(readonly=True)
+    assert db.primary  # within the window
+    db.close()
+    queue = Queue(1)
+
+    def read():
+        queue.put(pool.connection(readonly=True).primary)
+
+    thread = Thread(target=read)
+    thread.start()
+    thread.join(1)
+    assert queue.get(timeout=1) is False  # other threads use the replicas
+    pool._thread_state()[1] -= 60
+    db = pool.connection(readonly=True)
+    assert not db.primary  # window has passed
+    db.close()
+
+
+def test_replicas_not_available(dbapi):  # noqa: F811
+    pool = RoutingPooledDB(
+        PooledDB(dbapi, database='primary'),
+        PooledDB(dbapi, database='error'))
+    db = pool.connection(readonly=True)
+    assert db.primary
+    assert database(db) == 'primary'
+    db.close()
+    assert pool.stats()['reads_on_primary'] == 1
+
+    def read():
+        for _i in range(100):
+            pool.connection(readonly=True).close()
+
+    threads = [Thread(target=read) for _i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert pool.stats()['reads_on_primary'] == 501
+    pool.close()
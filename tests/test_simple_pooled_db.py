@@ -12,7 +12,9 @@ Copyright and credit info:
 """
 
 from queue import Empty, Queue
-from threading import Thread
+from threading import Event, Thread
+from time import sleep
+from weakref import ref
 
 import pytest
 
@@ -85,6 +87,22 @@ def test_close_connection(threadsafety):
     del cursor1
 
 
+@pytest.mark.parametrize("threadsafety", [1, 2])
+def test_proxy_methods(threadsafety):
+    db_pool = my_db_pool(threadsafety, 1)
+    db = db_pool.connection()
+    with pytest.raises(AttributeError):  # the proxy has slots
+        db.foo = 'bar'
+    assert ref(db)() is db  # but weak references are supported
+    cursor = db.cursor()
+    assert db.open_cursors == 1
+    cursor.close()
+    db.commit()
+    db.rollback()
+    assert db.session == ['commit', 'rollback']
+    db.close()
+
+
 @pytest.mark.parametrize("threadsafety", [1, 2, 3])
 def test_two_connections(threadsafety):
     db_pool = my_db_pool(threadsafety, 2)
@@ -139,3 +157,55 @@ def test_threadsafety_2(threadsafety):
     assert db2.open_cursors == 50
     assert cursors
     del cursors
+
+
+def test_checkout_timeout():
+    dbapi_threadsafety = dbapi.threadsafety
+    dbapi.threadsafety = 1
+    try:
+        dbpool = simple_pooled_db.PooledDB(
+            dbapi, 1, checkout_timeout=0.05, maxwaiters=1)
+    finally:
+        dbapi.threadsafety = dbapi_threadsafety
+    db = dbpool.connection()
+    with pytest.raises(simple_pooled_db.TooManyConnectionsError):
+        dbpool.connection()
+    with pytest.raises(simple_pooled_db.TooManyConnectionsError):
+        dbpool.connection(timeout=0)
+    queue = Queue(1)
+    Thread(target=lambda: queue.put(dbpool.connection(timeout=1))).start()
+    for _i in range(100):
+        if dbpool._waiters:
+            break
+        sleep(0.01)
+    assert dbpool._waiters == 1
+    with pytest.raises(simple_pooled_db.TooManyConnectionsError):
+        dbpool.connection(timeout=1)
+    db.close()
+    assert queue.get(timeout=1)
+    assert dbpool._waiters == 0
+
+
+@pytest.mark.parametrize("threadsafety", [1, 2])
+def test_warmup_in_background(threadsafety):
+    dbapi_threadsafety, dbapi_connect = dbapi.threadsafety, dbapi.connect
+    proceed = Event()
+
+    def connect(*args, **kwargs):
+        proceed.wait(1)
+        return dbapi_connect(*args, **kwargs)
+
+    dbapi.threadsafety, dbapi.connect = threadsafety, connect
+    try:
+        dbpool = simple_pooled_db.PooledDB(
+            dbapi, 2, checkout_timeout=0.05, warmup='background')
+    finally:
+        dbapi.threadsafety, dbapi.connect = dbapi_threadsafety, dbapi_connect
+    assert not dbpool.ready.is_set()
+    with pytest.raises(simple_pooled_db.TooManyConnectionsError):
+        dbpool.connection()
+    proceed.set()
+    assert dbpool.ready.wait(1)
+    db1 = dbpool.connection()
+    db2 = dbpool.connection()
+    assert db1._con is not db2._con
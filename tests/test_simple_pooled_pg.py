@@ -12,6 +12,7 @@ Copyright and credit info:
 
 from queue import Empty, Queue
 from threading import Thread
+from weakref import ref
 
 import pg  # noqa: F401
 import pytest
@@ -45,6 +46,17 @@ def test_create_connection():
     assert db.num_queries == 1
 
 
+def test_proxy_methods():
+    db_pool = my_db_pool(1)
+    db = db_pool.connection()
+    with pytest.raises(AttributeError):  # the proxy has slots
+        db.foo = 'bar'
+    assert ref(db)() is db  # but weak references are supported
+    assert db.query('select test') == 'test'
+    assert db.num_queries == 1
+    db.close()
+
+
 def test_close_connection():
     db_pool = my_db_pool(1)
     db = db_pool.connection()
@@ -106,3 +118,16 @@ def test_threads():
     db3 = queue.get(timeout=1)
     assert db1 != db3
     assert db1._con != db3._con
+
+
+def test_warmup_in_background():
+    db_pool = simple_pooled_pg.PooledPg(
+        2, 'SimplePooledPgTestDB', 'SimplePooledPgTestUser',
+        warmup='background')
+    assert db_pool.ready.wait(1)
+    db1 = db_pool.connection()
+    db2 = db_pool.connection()
+    assert db1._con is not db2._con
+    assert db_pool._queue.empty()
+    with pytest.raises(ValueError, match='warmup'):
+        simple_pooled_pg.PooledPg(1, warmup='lazy')
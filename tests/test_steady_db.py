@@ -11,7 +11,12 @@ Copyright and credit info:
 
 import pytest
 
-from dbutils.steady_db import SteadyDBConnection, SteadyDBCursor
+from dbutils.steady_db import (
+    InvalidCursorError,
+    SteadyDBConnection,
+    SteadyDBCursor,
+    SteadyDBStatementCache,
+)
 from dbutils.steady_db import connect as steady_db_connect
 
 from . import mock_db as dbapi
@@ -289,6 +294,250 @@ def test_cursor_context_handler():
     assert db._con.open_cursors == 0
 
 
+def test_cursor_tough_methods():
+    db = steady_db_connect(
+        dbapi, 0, None, None, None, True,
+        'SteadyDBTestDB', user='SteadyDBTestUser')
+    cursor = db.cursor()
+    # other attributes are set on the underlying cursor
+    cursor.foo = 'bar'
+    assert cursor._cursor.foo == 'bar'
+    assert cursor.foo == 'bar'
+    # the tough methods are bound without creating a closure every time
+    for name in ('execute', 'executemany', 'callproc'):
+        method = getattr(cursor, name)
+        assert method.__func__ is getattr(SteadyDBCursor, name)
+    cursor.execute('select test')
+    assert cursor.fetchone() == 'test'
+    db._con.close()
+    cursor.execute('select test2')  # failover with the bound method
+    assert cursor.fetchone() == 'test2'
+    assert db._con.valid
+    cursor._cursor = None
+    with pytest.raises(InvalidCursorError):
+        cursor.execute('select test')
+    with pytest.raises(InvalidCursorError):
+        cursor.foo = 'baz'
+
+
+def test_prepare_without_cache():
+    db = steady_db_connect(dbapi, 0, None, None, None, True)
+    assert db._statements is None
+    cursor = db.prepare('select test')
+    assert isinstance(cursor, SteadyDBCursor)
+    assert db._con.open_cursors == 1
+    cursor.execute('select test')
+    assert cursor.fetchone() == 'test'
+    cursor.close()
+    assert db._con.open_cursors == 0
+    assert db.prepare('select test') is not cursor
+
+
+def test_prepare_with_driver_support():
+    prepared = []
+    dbapi.Cursor.prepare = lambda _self, operation: prepared.append(operation)
+    try:
+        db = steady_db_connect(dbapi, 0, None, None, None, True)
+        db._statements = SteadyDBStatementCache(10)
+        cursor = db.prepare('select test')
+        assert prepared == ['select test']
+        cursor.close()
+        assert db.prepare('select test') is cursor
+        assert prepared == ['select test']  # prepared only once
+    finally:
+        del dbapi.Cursor.prepare
+
+
+def test_statement_cache():
+    db = steady_db_connect(dbapi, 0, None, None, None, True)
+    cache = db._statements = SteadyDBStatementCache(2)
+    cursor = db.prepare('select a')
+    cursor.execute('select a')
+    assert cursor.fetchone() == 'a'
+    cursor.close()
+    assert len(cache) == 1
+    assert db._con.open_cursors == 1  # kept open in the cache
+    assert db.prepare('select a') is cursor
+    assert len(cache) == 0  # taken out of the cache while in use
+    other = db.prepare('select a')  # in use, so prepare another one
+    assert other is not cursor
+    assert db._con.open_cursors == 2
+    cursor.close()
+    other.close()  # there is already an idle cursor for the operation
+    assert db._con.open_cursors == 1
+    cursor_b = db.prepare('select b')
+    cursor_c = db.prepare('select c')
+    cursor_b.close()
+    cursor_c.close()  # evicts the least recently used cursor
+    assert list(cache._cursors) == ['select b', 'select c']
+    assert db._con.open_cursors == 2
+    assert db.prepare('select b') is cursor_b
+    assert cache.stats() == {
+        'size': 1, 'maxsize': 2, 'hits': 2, 'misses': 4, 'evictions': 1,
+        'hit_rate': 2 / 6}
+    # reopening the connection clears the cache
+    con = db._con
+    con.close()
+    db.cursor().close()
+    assert db._con is not con
+    assert len(cache) == 0
+    assert cache.generation  # cursors in use are invalidated
+    cursor_b.close()  # prepared on the old connection, so really closed
+    assert len(cache) == 0
+    assert db.prepare('select c') is not cursor_c
+
+
+def test_cursor_cache():
+    db = steady_db_connect(dbapi, 0, None, None, None, True)
+    db.cursor().close()
+    assert db._con.open_cursors == 0  # no cursor cache by default
+    db._new_cursor_cache(2)
+    cursor = db.cursor()
+    raw = cursor._cursor
+    cursor.setinputsizes([1])
+    cursor.setoutputsize(2)
+    cursor.arraysize = 10
+    cursor.close()
+    assert db._con.open_cursors == 1  # kept open in the cache
+    cursor.close()  # closing twice does not put it into the cache again
+    assert len(db._cursor_cache) == 1
+    # the closed cursor cannot be used any more
+    with pytest.raises(InvalidCursorError):
+        cursor.execute('select test')
+    with pytest.raises(InvalidCursorError):
+        cursor.fetchone()
+    with pytest.raises(InvalidCursorError):
+        cursor.arraysize = 5
+    cursor2 = db.cursor()
+    assert cursor2 is not cursor
+    assert cursor2._cursor is raw  # but its driver cursor is reused
+    assert len(db._cursor_cache) == 0
+    # the sizes and attributes of the closed cursor have been reset
+    assert cursor2._inputsizes == []
+    assert cursor2._outputsizes == {}
+    assert raw.arraysize == 1
+    cursor2.execute('select test')
+    assert cursor2.fetchone() == 'test'
+    assert raw.inputsizes == []
+    cursors = [db.cursor() for _i in range(3)]
+    assert raw not in [c._cursor for c in cursors]
+    assert db._con.open_cursors == 4
+    for c in (cursor2, *cursors):
+        c.close()
+    assert len(db._cursor_cache) == 2  # the others have been closed
+    assert db._con.open_cursors == 2
+    named = db.cursor('named')  # special cursors are not reused
+    assert named._cursor not in db._cursor_cache
+    named.close()
+    assert db._con.open_cursors == 2
+    # reopening the connection drops the cache
+    con = db._con
+    con.close()
+    cursor = db.cursor()
+    cursor.execute('select test')  # reopens the connection
+    assert db._con is not con
+    assert len(db._cursor_cache) == 0
+    cursor.close()  # opened on the old connection, so really closed
+    assert len(db._cursor_cache) == 0
+    cursor = db.cursor()
+    raw = cursor._cursor
+    cursor.close()
+    assert db.cursor()._cursor is raw
+    db._new_cursor_cache(0)
+    assert db._cursor_cache is None
+    # a cursor reopened by the failover is not put into the cache
+    cursor = db.cursor()
+    db._new_cursor_cache(2)
+    cursor = db.cursor()
+    cursor._cursor.valid = False
+    cursor.execute('select test')
+    assert cursor.fetchone() == 'test'
+    assert len(db._cursor_cache) == 0
+    raw = cursor._cursor
+    cursor.close()
+    assert db.cursor()._cursor is raw
+
+
+def lose_connection(con, row=5):
+    """Generate ten rows and close the connection before the given row."""
+    for n in range(10):
+        if n == row:
+            con.close()
+        yield n
+
+
+def test_executemany_chunks():
+    db = steady_db_connect(dbapi, 0, None, None, None, True)
+    cursor = db.cursor()
+    assert cursor.executemany_stats is None
+    assert cursor.executemany('insert', [1, 2]) is None
+    assert db._con.rows == [1, 2]
+    assert cursor.executemany_stats is None
+    db._con.rows = []
+    cursor.setinputsizes([1])
+    assert cursor.executemany(
+        'insert', (n for n in range(10)), chunksize=2) is None
+    assert db._con.rows == list(range(10))
+    assert db._con.num_uses == 6
+    stats = cursor.executemany_stats
+    assert stats['rows'] == 10
+    assert stats['chunks'] == 5
+    assert stats['seconds'] >= 0
+    assert stats['rows_per_second'] >= 0
+    # the input sizes have been set for all chunks
+    assert cursor._cursor.inputsizes == [1]
+    assert cursor._inputsizes == []
+    cursor.executemany('insert', iter(()), chunksize=2)
+    stats = cursor.executemany_stats
+    assert stats['rows'] == stats['chunks'] == 0
+
+
+def test_executemany_chunks_with_lost_connection():
+    db = steady_db_connect(dbapi, 0, None, None, None, True)
+    cursor = db.cursor()
+    con = db._con
+    # the connection is lost in the third chunk
+    with pytest.raises(dbapi.InternalError):
+        cursor.executemany('insert', lose_connection(con), chunksize=2)
+    # the chunks are not executed again, since the first ones are lost
+    assert db._con is not con
+    assert db._con.rows == []
+    assert cursor.executemany_stats is None
+    con = db._con
+    # the connection is lost in the first chunk
+    cursor.executemany('insert', lose_connection(con, 1), chunksize=2)
+    # this chunk can be executed again, since nothing is lost
+    assert db._con is not con
+    assert db._con.rows == list(range(10))
+    assert cursor.executemany_stats['chunks'] == 5
+
+
+def test_executemany_chunks_with_autocommit():
+    db = steady_db_connect(dbapi, 0, None, None, None, True)
+    cursor = db.cursor()
+    con = db._con
+    cursor.executemany(
+        'insert', lose_connection(con), chunksize=2, autocommit=True)
+    # only the third chunk has been executed again on the new connection
+    assert db._con is not con
+    assert db._con.rows == [4, 5, 6, 7, 8, 9]
+    assert db._con.num_uses == 3
+    assert cursor.executemany_stats['rows'] == 10
+
+
+def test_executemany_chunks_in_transaction():
+    db = steady_db_connect(dbapi, 0, None, None, None, True)
+    cursor = db.cursor()
+    db.begin()
+    con = db._con
+    with pytest.raises(dbapi.InternalError):
+        cursor.executemany(
+            'insert', lose_connection(con, 1), chunksize=2, autocommit=True)
+    # the chunks are not executed again in a transaction
+    assert db._con is not con
+    assert db._con.rows == []
+
+
 def test_cursor_as_iterator_provided():
     db = steady_db_connect(
         dbapi, 0, None, None, None, True,
@@ -321,6 +570,46 @@ def test_cursor_as_iterator_created():
     assert db._con.open_cursors == 0
 
 
+def test_cursor_as_iterator_buffered(monkeypatch):
+    db = steady_db_connect(dbapi, 0, None, None, None, True)
+    cursor = db.cursor()
+    _cursor = cursor._cursor
+    cursor.execute('rows 10')
+    assert list(cursor) == list(range(10))
+    assert _cursor.num_fetches == 11  # fetched with fetchone()
+    cursor.arraysize = 4  # set on the underlying cursor
+    assert _cursor.arraysize == 4
+    _cursor.num_fetches = 0
+    cursor.execute('rows 10')
+    assert list(cursor) == list(range(10))
+    assert _cursor.num_fetches == 4  # fetched with fetchmany()
+    monkeypatch.delattr(dbapi.Cursor, 'fetchmany')
+    cursor.execute('rows 10')
+    assert list(cursor) == list(range(10))
+    cursor.close()
+
+
+def test_cursor_stream():
+    db = steady_db_connect(dbapi, 0, None, None, None, True)
+    cursor = db.cursor()
+    _cursor = cursor._cursor
+    cursor.execute('rows 10')
+    rows = cursor.stream(3)
+    assert _cursor.num_fetches == 0  # rows are fetched lazily
+    assert next(rows) == 0
+    assert _cursor.num_fetches == 1
+    assert list(rows) == list(range(1, 10))
+    assert _cursor.num_fetches == 5
+    cursor.execute('rows 2500')
+    assert sum(1 for _row in cursor.stream()) == 2500
+    cursor.execute('select test')
+    assert list(cursor.stream()) == ['test']
+    cursor.close()
+    cursor._cursor = None
+    with pytest.raises(InvalidCursorError):
+        cursor.stream()
+
+
 def test_connection_creator_function():
     db1 = steady_db_connect(
         dbapi, 0, None, None, None, True,
@@ -724,3 +1013,103 @@ def test_rollback_error():
     db.rollback()
     assert db._con.session == ['rollback']
     assert db._con.valid
+
+
+def test_connection_expired():
+    db = steady_db_connect(dbapi, database='ok')
+    assert 0 <= db._jitter < 1
+    assert db._created == db._last_used
+    assert not db._expired()
+    assert not db._expired(10, 10)
+    created = db._created
+    db._jitter = 0
+    assert not db._expired(10, now=created + 9.5)
+    assert db._expired(10, now=created + 10.5)
+    assert not db._expired(idle_timeout=10, now=created + 9.5)
+    assert db._expired(idle_timeout=10, now=created + 10.5)
+    db._jitter = 0.9
+    assert db._expired(10, now=created + 9.5)
+    assert db._expired(idle_timeout=10, now=created + 9.5)
+    cursor = db.cursor()
+    cursor.execute('select test')
+    assert db._created == created
+    assert db._last_used >= created
+    db._last_used = created + 5
+    assert db._expired(10, 10, now=created + 9.5)
+    assert not db._expired(idle_timeout=10, now=created + 9.5)
+    created = db._created = created - 100
+    db._close()
+    db._store(db._create())
+    assert db._created > created
+
+
+def test_reset_clean_connection():
+    db = steady_db_connect(dbapi, database='ok')
+    con = db._con
+    assert not db._dirty
+    assert not db._reset(force=True)
+    assert con.session == []
+    db.ping = lambda: None
+    db._ping_check(7)  # pinging does not make the connection dirty
+    assert not db._dirty
+    cursor = db.cursor()
+    # the driver's cursor might be used in a way that opens a transaction
+    assert db._dirty
+    assert db._reset(force=True)
+    assert not db._dirty
+    assert con.session == ['rollback']
+    cursor.execute('select test')
+    assert db._dirty
+    assert db._reset(force=True)
+    assert not db._dirty
+    assert con.session == ['rollback'] * 2
+    cursor.execute('select test')
+    assert not db._reset()
+    db.commit()
+    assert not db._dirty
+    assert not db._reset(force=True)
+    db.begin()
+    assert db._reset(force=True)
+    assert con.session == ['rollback'] * 2 + ['commit', 'rollback']
+    db.prepare('select test').close()
+    assert db._dirty
+    db.rollback()
+    with pytest.raises(dbapi.ProgrammingError):
+        cursor.execute('error')
+    assert db._dirty
+    db = steady_db_connect(dbapi, setsession=['set test'], database='ok')
+    assert db._dirty  # the session preparation might have opened a transaction
+    assert db._reset(force=True)
+
+
+def test_connection_ping_interval():
+    con_cls = dbapi.Connection
+    con_cls.has_ping = True
+    con_cls.num_pings = 0
+    try:
+        db = steady_db_connect(dbapi, ping=7)
+        assert db._ping_interval == 0
+        cursor = db.cursor()
+        assert con_cls.num_pings == 1
+        cursor.execute('select test')
+        assert con_cls.num_pings == 2
+        db._ping_interval = 10
+        cursor.execute('select test')
+        db.cursor()
+        assert db._ping_check() is None
+        assert con_cls.num_pings == 2  # recently used, so not pinged
+        db._last_used -= 20
+        assert db._ping_check() is True
+        assert con_cls.num_pings == 3
+        con = db._con
+        con.valid = False  # the connection is broken now
+        # pings do not count as use, so the connection is pinged again
+        assert db._ping_check() is True  # and reopened
+        assert con_cls.num_pings == 4
+        assert db._con is not con
+        assert db._con.valid
+        assert db._ping_check() is None  # recently reopened
+        assert con_cls.num_pings == 4
+    finally:
+        con_cls.has_ping = False
+        con_cls.num_pings = 0
@@ -204,6 +204,19 @@ def test_connection_context_handler():
     assert db._con.session == ['begin', 'commit', 'begin', 'rollback']
 
 
+def test_connection_tough_methods():
+    db = SteadyPgConnection(
+        0, None, 1, 'SteadyPgTestDB', user='SteadyPgTestUser')
+    # the tough methods are bound without creating a closure every time
+    for name in ('query', 'get', 'insert', 'update', 'delete'):
+        method = getattr(db, name)
+        assert method.__func__ is getattr(SteadyPgConnection, name)
+    assert db.query('select test') == 'test'
+    db.db.status = False
+    assert db.query('select test') == 'test'  # failover
+    assert db.db.status
+
+
 def test_connection_maxusage():
     db = SteadyPgConnection(10)
     for i in range(100):
@@ -327,3 +340,32 @@ def test_end(closeable):
     assert db.num_queries == 1
     assert db.begin('select sql:rollback') == 'sql:rollback'
     assert db.num_queries == 2
+
+
+def test_connection_expired():
+    db = SteadyPgConnection()
+    assert 0 <= db._jitter < 1
+    assert db._created == db._last_used
+    assert not db._expired()
+    assert not db._expired(10, 10)
+    created = db._created
+    db._jitter = 0
+    assert not db._expired(10, now=created + 9.5)
+    assert db._expired(10, now=created + 10.5)
+    assert not db._expired(idle_timeout=10, now=created + 9.5)
+    assert db._expired(idle_timeout=10, now=created + 10.5)
+    db._jitter = 0.9
+    assert db._expired(10, now=created + 9.5)
+    assert db._expired(idle_timeout=10, now=created + 9.5)
+    db.query('select test')
+    assert db._created == created
+    assert db._last_used >= created
+    db._last_used = created + 5
+    assert db._expired(10, 10, now=created + 9.5)
+    assert not db._expired(idle_timeout=10, now=created + 9.5)
+    created = db._created = created - 100
+    db.reopen()
+    assert db._created > created
+    created = db._created = created - 100
+    db.reset()
+    assert db._created > created
@@ -0,0 +1,144 @@
+"""Test the StripedPooledDB module.
+
+Note:
+We don't test performance here, so the test does not predicate
+whether StripedPooledDB actually will help in improving performance or not.
+We also assume that the underlying PooledDB stripes are tested.
+
+Copyright and credit info:
+
+* This test is based on the tests of the PooledDB module
+"""
+
+from queue import Queue
+from threading import Thread
+
+import pytest
+
+from dbutils.circuit_breaker import CircuitBreaker
+from dbutils.pooled_db import PooledDB, TooManyConnectionsError
+from dbutils.striped_pooled_db import StripedPooledDB, divide
+
+from .mock_db import dbapi  # noqa: F401
+
+
+def test_version():
+    from dbutils import __version__, striped_pooled_db
+    assert striped_pooled_db.__version__ == __version__
+    assert StripedPooledDB.version == __version__
+
+
+def test_divide():
+    assert divide(0, 3) == [0, 0, 0]
+    assert divide(2, 3) == [1, 1, 0]
+    assert divide(7, 3) == [3, 2, 2]
+    assert divide(9, 3) == [3, 3, 3]
+
+
+def test_stripes(dbapi):  # noqa: F811
+    pool = StripedPooledDB(dbapi, 2, 4, 0, 6)
+    stripes = pool.stripes
+    assert len(stripes) == 4
+    assert all(isinstance(stripe, PooledDB) for stripe in stripes)
+    assert [len(stripe._idle_cache) for stripe in stripes] == [1, 1, 0, 0]
+    assert [stripe._maxcached for stripe in stripes] == [1, 1, 1, 1]
+    assert [stripe._maxconnections for stripe in stripes] == [2, 2, 1, 1]
+    assert pool.ready.is_set()
+    pool = StripedPooledDB(dbapi, 0, 0, 0, 2, stripes=8)
+    assert len(pool.stripes) == 2
+    pool = StripedPooledDB(dbapi, stripes=8)
+    assert len(pool.stripes) == 8
+    assert all(not stripe._maxconnections for stripe in pool.stripes)
+    pool = StripedPooledDB(dbapi, stripes=0)
+    assert len(pool.stripes) == 1
+
+
+def test_keyword_parameters(dbapi):  # noqa: F811
+    pool = StripedPooledDB(
+        dbapi, 0, 0, 0, 4, True, checkout_order='lifo',
+        database='StripedPooledDBTestDB', stripes=2)
+    for stripe in pool.stripes:
+        assert stripe._blocking
+        assert stripe._lifo
+    db = pool.connection()
+    assert db._con._con.database == 'StripedPooledDBTestDB'
+
+
+def test_steal_connections(dbapi):  # noqa: F811
+    pool = StripedPooledDB(dbapi, 0, 0, 0, 2, stripes=2)
+    own, other = pool._order()
+    assert {own, other} == set(pool.stripes)
+    db1 = pool.connection()
+    assert own._connections == 1
+    db2 = pool.connection()  # own stripe is full
+    assert other._connections == 1
+    with pytest.raises(TooManyConnectionsError):
+        pool.connection()
+    con = db2._con
+    db2.close()
+    assert other._idle_cache[0] is con
+    db2 = pool.connection()
+    assert db2._con is con
+    db1.close()
+    db2.close()
+    assert own._connections == other._connections == 0
+
+
+def test_prefer_idle_connections(dbapi):  # noqa: F811
+    pool = StripedPooledDB(dbapi, 0, 0, 0, 4, stripes=2)
+    own = pool._order()[0]
+    queue = Queue(1)
+
+    def connection():
+        db = pool.connection()
+        queue.put(db._con)
+        db.close()
+
+    thread = Thread(target=connection)  # uses the other stripe
+    thread.start()
+    thread.join(1)
+    con = queue.get(timeout=1)
+    assert not own._idle_cache
+    db = pool.connection()
+    assert db._con is con
+    assert own._connections == 0
+    stats = pool.stats()
+    assert stats['created'] == 1
+    assert stats['checkouts'] == 2
+    assert stats['used'] == 1
+    assert sum(n for _bound, n in stats['create_histogram']) == 1
+    db.close()
+    pool.close()
+    assert not any(stripe._idle_cache for stripe in pool.stripes)
+
+
+def test_maxconnections_with_many_threads(dbapi):  # noqa: F811
+    pool = StripedPooledDB(dbapi, 0, 0, 0, 4, True, stripes=4)
+    errors = []
+
+    def work():
+        try:
+            for _i in range(50):
+                db = pool.connection()
+                db.cursor().execute('select test')
+                db.close()
+        except Exception as error:
+            errors.append(error)
+
+    threads = [Thread(target=work) for _i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert not errors
+    stats = pool.stats()
+    assert stats['checkouts'] == 400
+    assert stats['created'] <= 4
+    assert stats['used'] == 0
+
+
+def test_breaker_shared_by_stripes(dbapi):  # noqa: F811
+    pool = StripedPooledDB(dbapi, 0, stripes=2, breaker=True)
+    breakers = {stripe.breaker for stripe in pool.stripes}
+    assert len(breakers) == 1
+    assert isinstance(breakers.pop(), CircuitBreaker)